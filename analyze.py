@@ -0,0 +1,258 @@
+"""
+A bulk position analyzer.
+
+Positions are read from files or stdin, searched with a strategy across a
+pool of worker processes and written to stdout as JSON lines, each as soon
+as it is found (or in input order with --ordered). A position is either a
+Stonehenge board drawn like StonehengeState.__str__, with boards separated
+by blank lines, or a compact encoding (see codec) on a line of its own,
+written as 'h:<hex>' for Stonehenge, 's:<hex>' for Subtract Square or
+'m:<hex>' for Subtract Square with several piles.
+Lines starting with '#' are skipped.
+
+With --solved, positions solved exactly are kept in a SolvedCache, so that
+later runs answer them without searching.
+
+Example:
+    python analyze.py positions.txt --strategy md --depth 4 --workers 8
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from functools import partial
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+from codec import encode_state, decode_stonehenge, decode_subtract_square, \
+    decode_multi_subtract_square
+from game_interface import usable_strategies, strategy_games, \
+    game_of_state
+from solved_cache import SolvedCache, solved_strategy
+from stonehenge import StonehengeState, parse_board
+from strategy import accepts_option, search_with_stats
+
+COMPACT_LINE = re.compile(r'^([hsm]):([0-9a-fA-F]+)$')
+# The strategy options the command line can set.
+BUDGET_OPTIONS = ['depth', 'time_limit', 'memory_limit']
+# The SolvedCache of this worker process, by path.
+_SOLVED = {}
+
+
+def read_board(board: List[str], p1_starts: bool) -> Any:
+    """
+    Return the encoding of the Stonehenge board drawn in the lines of board,
+    or the ValueError met reading it.
+    """
+    try:
+        return encode_state(parse_board('\n'.join(board),
+                                        p1_starts=p1_starts))
+    except ValueError as error:
+        return error
+
+
+def read_positions(lines: Iterable[str], p1_starts: bool = True) \
+        -> Iterator[Tuple[str, Any]]:
+    """
+    Yield the (game key, encoding) of every position in lines, in order. A
+    position that cannot be read is yielded with the ValueError met reading
+    it in place of its encoding.
+
+    >>> text = ['s:25', '', str(StonehengeState(True, 1))]
+    >>> [(game, data.hex()) for game, data in read_positions(text)]
+    [('s', '25'), ('h', '09000000')]
+    >>> game, data = next(read_positions(['h:fff']))
+    >>> game, isinstance(data, ValueError)
+    ('h', True)
+    """
+    board = []
+    for line in lines:
+        line = line.rstrip('\n')
+        if line.startswith('#'):
+            continue
+        compact = COMPACT_LINE.match(line.strip())
+        if (compact or not line.strip()) and board:
+            yield 'h', read_board(board, p1_starts)
+            board = []
+        if compact:
+            try:
+                data = bytes.fromhex(compact.group(2))
+            except ValueError as error:
+                data = error
+            yield compact.group(1), data
+        elif line.strip():
+            board.append(line)
+    if board:
+        yield 'h', read_board(board, p1_starts)
+
+
+def make_game(game: str, data: bytes) -> Any:
+    """
+    Return a game of type game whose current state is encoded in data.
+    """
+    if game == 'h':
+        state = decode_stonehenge(data)
+    elif game == 'm':
+        state = decode_multi_subtract_square(data)
+    else:
+        state = decode_subtract_square(data)
+    return game_of_state(game, state)
+
+
+def open_solved(path: str) -> SolvedCache:
+    """
+    Return the SolvedCache at path of this process, opening it if needed.
+    """
+    if path not in _SOLVED:
+        _SOLVED[path] = SolvedCache(path)
+    return _SOLVED[path]
+
+
+def analyze_position(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return the analysis of the position of job by its strategy and options,
+    answered from and added to the SolvedCache at job['solved'] if given.
+    """
+    result = {'index': job['index'], 'game': job['game'],
+              'position': job['data'].hex()}
+    start = time.perf_counter()
+    try:
+        if job['game'] not in strategy_games[job['strategy']]:
+            raise ValueError("'{}' cannot play '{}'".format(job['strategy'],
+                                                          job['game']))
+        game = make_game(job['game'], job['data'])
+        if game.is_over(game.current_state):
+            result.update(move=None, value=None, nodes=0)
+        else:
+            strategy = usable_strategies[job['strategy']]
+            options = {name: value for name, value in job['options'].items()
+                       if value is not None and accepts_option(strategy, name)}
+            solved = None
+            if job.get('solved') and accepts_option(strategy, 'stats'):
+                solved = open_solved(job['solved'])
+                strategy = solved_strategy(strategy, solved)
+            move, stats = search_with_stats(partial(strategy, **options),
+                                            game)
+            if solved is not None:
+                # Worker processes are not told when the run ends.
+                solved.flush()
+            result.update(move=move,
+                          value=None if stats is None else stats.value,
+                          nodes=0 if stats is None else
+                          stats.nodes + stats.terminal)
+    except Exception as error:  # pylint: disable=broad-except
+        result['error'] = '{}: {}'.format(type(error).__name__, error)
+    result['time'] = time.perf_counter() - start
+    return result
+
+
+def analyze(positions: Iterable[Tuple[str, bytes]], strategy: str,
+            options: Dict[str, Any] = None, workers: int = None,
+            ordered: bool = False, window: int = None,
+            solved: str = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the analysis of every position across a pool of workers processes,
+    as each completes or, if ordered, in the order of positions, using the
+    SolvedCache at path solved if given.
+
+    At most window positions (by default four per worker) are read ahead of
+    the results, so that positions can be streamed from a large file. A
+    position given as an error in place of its encoding (see
+    read_positions) is reported as that error without being searched.
+    """
+    options = options or {}
+    window = window or 4 * (workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        done = {}
+        submitted = emitted = 0
+        source = iter(positions)
+        exhausted = False
+        while pending or not exhausted:
+            unread = []
+            while not exhausted and \
+                    len(pending) + len(done) + len(unread) < window:
+                try:
+                    game, data = next(source)
+                except StopIteration:
+                    exhausted = True
+                    break
+                if isinstance(data, Exception):
+                    unread.append({'index': submitted, 'game': game,
+                                   'error': '{}: {}'.format(
+                                       type(data).__name__, data)})
+                else:
+                    pending.add(pool.submit(analyze_position, {
+                        'index': submitted, 'game': game, 'data': data,
+                        'strategy': strategy, 'options': options,
+                        'solved': solved}))
+                submitted += 1
+            finished = set()
+            if pending:
+                finished, pending = wait(pending,
+                                         return_when=FIRST_COMPLETED)
+            for result in unread + [future.result() for future in finished]:
+                if not ordered:
+                    emitted += 1
+                    yield result
+                    continue
+                done[result['index']] = result
+                while emitted in done:
+                    yield done.pop(emitted)
+                    emitted += 1
+
+
+def main(argv: List[str] = None) -> None:
+    """
+    Analyze positions from the command line, writing one JSON line per
+    position to stdout.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('inputs', nargs='*', default=['-'],
+                        help="files of positions ('-' for stdin)")
+    parser.add_argument('--strategy', default='mi',
+                        choices=[key for key in usable_strategies
+                                 if key != 'i'])
+    parser.add_argument('--depth', type=int,
+                        help='how many moves ahead depth-limited strategies '
+                             'look')
+    parser.add_argument('--time-limit', type=float, metavar='SECONDS',
+                        help='how long depth-limited strategies deepen their '
+                             'search of each position')
+    parser.add_argument('--memory-limit', type=int, metavar='BYTES',
+                        help='the memory a search may use before it falls '
+                             'back to a depth-limited search')
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--ordered', action='store_true',
+                        help='write results in input order')
+    parser.add_argument('--solved', metavar='PATH',
+                        help='answer from and add to the solved positions '
+                             'in the database at PATH')
+    parser.add_argument('--p2-starts', action='store_true',
+                        help='break ties in who moves next on boards in '
+                             "Player 2's favour")
+    args = parser.parse_args(argv)
+
+    def lines() -> Iterator[str]:
+        """
+        Yield the lines of every input, with a blank line between inputs.
+        """
+        for path in args.inputs:
+            if path == '-':
+                yield from sys.stdin
+            else:
+                with open(path) as positions:
+                    yield from positions
+            yield ''
+
+    options = {name: getattr(args, name) for name in BUDGET_OPTIONS}
+    for result in analyze(read_positions(lines(), not args.p2_starts),
+                          args.strategy, options, args.workers,
+                          args.ordered, solved=args.solved):
+        sys.stdout.write(json.dumps(result) + '\n')
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Unittests for the bulk position analyzer.
+"""
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from analyze import analyze, main, make_game, read_positions
+from codec import encode_state
+from stonehenge import StonehengeState
+from stonehenge_batch_unittest_basic import random_positions
+from strategy import depth_limited_minimax_strategy
+
+
+class AnalyzeUnitTests(unittest.TestCase):
+    def test_ordered_results_match_strategy(self):
+        """
+        Test that ordered analysis across workers gives every position's
+        move in input order, as the strategy picks it in this process.
+        """
+        positions = [('h', encode_state(state))
+                     for state in random_positions(2, 12, 5)]
+        positions.append(('s', bytes.fromhex('ac02')))
+        results = list(analyze(positions, 'md', {'depth': 2}, workers=2,
+                               ordered=True, window=3))
+        self.assertEqual([r['index'] for r in results],
+                         list(range(len(positions))))
+        for (game, data), result in zip(positions, results):
+            self.assertNotIn('error', result)
+            position = make_game(game, data)
+            if position.is_over(position.current_state):
+                self.assertIsNone(result['move'])
+            else:
+                self.assertEqual(result['move'],
+                                 depth_limited_minimax_strategy(position, 2))
+
+    def test_bad_position_reported(self):
+        """
+        Test that a position that cannot be decoded is reported as an error
+        without stopping the analysis.
+        """
+        text = ['h:ff', 's:25']
+        results = list(analyze(read_positions(text), 'ro', workers=1,
+                               ordered=True))
+        self.assertIn('error', results[0])
+        self.assertEqual(results[1]['move'], 16)
+
+    def test_unreadable_positions_reported(self):
+        """
+        Test that a line that is not hex and a board that cannot be parsed
+        are reported as errors in their place, among positions analyzed as
+        usual.
+        """
+        board = str(StonehengeState(True, 1)).splitlines()
+        text = ['s:25', 'h:fff', ''] + board[:-2] + ['', 's:19'] + \
+            [''] + board
+        for ordered in [True, False]:
+            results = sorted(analyze(read_positions(text), 'ro', workers=1,
+                                     ordered=ordered),
+                             key=lambda result: result['index'])
+            self.assertEqual([r['index'] for r in results], list(range(5)))
+            self.assertEqual([r['game'] for r in results],
+                             ['s', 'h', 'h', 's', 'h'])
+            self.assertEqual(['error' in r for r in results],
+                             [False, True, True, False, False])
+            self.assertTrue(results[1]['error'].startswith('ValueError'))
+            self.assertIsNotNone(results[3]['move'])
+            self.assertIsNotNone(results[4]['move'])
+
+    def test_time_limit(self):
+        """
+        Test that --time-limit bounds the search of a position too big to
+        search to the end.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'positions.txt')
+            with open(path, 'w') as positions:
+                positions.write('h:{}\n'.format(
+                    encode_state(StonehengeState(True, 4)).hex()))
+            output = io.StringIO()
+            with redirect_stdout(output):
+                main([path, '--strategy', 'md', '--time-limit', '0.3',
+                      '--workers', '1'])
+        result = json.loads(output.getvalue())
+        self.assertIsNotNone(result['move'])
+        self.assertLess(result['time'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
@@ -0,0 +1,254 @@
+"""
+Micro- and macro-benchmarks for the game engines and strategies.
+
+Every benchmark runs on a fixed set of positions:
+    - the Stonehenge board STONEHENGE_MINIMAX_BOARD of minimax_unittest_basic
+    - a few Subtract Square totals
+    - seeded random mid-game Stonehenge boards of every side length
+
+Micro-benchmarks time make_move, get_possible_moves, help_complete_ley_mark
+and rough_outcome; macro-benchmarks time every non-interactive strategy in
+usable_strategies on the positions small enough to search of the games it
+plays. Results are
+reported as ops/sec, nodes/sec (strategies only) and peak memory, and can be
+saved as JSON and compared against a stored baseline.
+
+Example:
+    python benchmark.py --save baseline.json
+    python benchmark.py --baseline baseline.json
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+from game_interface import usable_strategies, strategy_games, \
+    game_of_state
+from minimax_unittest_basic import STONEHENGE_MINIMAX_BOARD
+from stonehenge import StonehengeState, parse_board
+from subtract_square_state import SubtractSquareState
+from strategy import search_with_stats
+
+SUBTRACT_SQUARE_TOTALS = [4, 18, 30]
+# Positions with more empty cells than this are too big for the strategies.
+SEARCHABLE_CELLS = 7
+
+
+class Position:
+    """
+    A named benchmark position.
+
+    name - the name the position is reported under
+    game - the key of the game in playable_games
+    state - the state of the position
+    searchable - whether the strategies are benchmarked on this position
+    """
+    name: str
+    game: str
+    state: Any
+    searchable: bool
+
+    def __init__(self, name: str, game: str, state: Any,
+                 searchable: bool) -> None:
+        """
+        Create a new Position.
+        """
+        self.name = name
+        self.game = game
+        self.state = state
+        self.searchable = searchable
+
+    def make_game(self) -> Any:
+        """
+        Return a game of this position's kind whose current state is this
+        position.
+        """
+        return game_of_state(self.game, self.state)
+
+
+def random_mid_game(side_length: int, rng: random.Random,
+                    empty_cells: int = None) -> StonehengeState:
+    """
+    Return a random Stonehenge position that is not over, with empty_cells
+    empty cells (half of the cells by default).
+
+    On boards too small for any such position, more cells are left empty.
+    """
+    total = len(''.join(StonehengeState(True, side_length).lines))
+    if empty_cells is None:
+        empty_cells = (total + 1) // 2
+    while True:
+        for _ in range(100):
+            state = StonehengeState(rng.random() < 0.5, side_length)
+            while len(state.get_possible_moves()) > empty_cells:
+                state = state.make_move(
+                    rng.choice(state.get_possible_moves()))
+            if state.get_possible_moves():
+                return state
+        empty_cells += 1
+
+
+def fixed_positions(seed: int = 0) -> List[Position]:
+    """
+    Return the benchmark positions.
+    """
+    positions = [Position('stonehenge-minimax-board', 'h',
+                          parse_board(STONEHENGE_MINIMAX_BOARD), True)]
+    for total in SUBTRACT_SQUARE_TOTALS:
+        positions.append(Position('subtract-square-{}'.format(total), 's',
+                                  SubtractSquareState(True, total), True))
+    rng = random.Random(seed)
+    for side in range(1, 6):
+        state = random_mid_game(side, rng)
+        positions.append(Position('stonehenge-{}-mid-game'.format(side), 'h',
+                                  state, len(state.get_possible_moves())
+                                  <= SEARCHABLE_CELLS))
+        if len(state.get_possible_moves()) > SEARCHABLE_CELLS:
+            positions.append(Position(
+                'stonehenge-{}-endgame'.format(side), 'h',
+                random_mid_game(side, rng, SEARCHABLE_CELLS), True))
+    return positions
+
+
+def measure(operation: Callable[[], Any], min_time: float,
+            repeat: int) -> Tuple[float, int]:
+    """
+    Return the best ops/sec of operation over repeat rounds of at least
+    min_time seconds each, and the peak memory of one call in bytes.
+    """
+    best = 0.0
+    for _ in range(repeat):
+        calls = 0
+        start = time.perf_counter()
+        elapsed = 0.0
+        while elapsed < min_time or calls == 0:
+            operation()
+            calls += 1
+            elapsed = time.perf_counter() - start
+        best = max(best, calls / elapsed)
+    tracemalloc.start()
+    try:
+        operation()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def micro_operations(position: Position) -> Dict[str, Callable[[], Any]]:
+    """
+    Return the engine operations to benchmark on position.
+    """
+    state = position.state
+    moves = state.get_possible_moves()
+    operations = {
+        'make_move': lambda: [state.make_move(move) for move in moves],
+        'get_possible_moves': state.get_possible_moves,
+        'rough_outcome': state.rough_outcome}
+    if position.game == 'h':
+        lines = state.lines
+        operations['help_complete_ley_mark'] = \
+            lambda: state.help_complete_ley_mark(lines)
+    return operations
+
+
+def run_benchmarks(min_time: float = 0.2, repeat: int = 3, seed: int = 0,
+                   selected: str = '') -> Dict[str, Dict[str, float]]:
+    """
+    Run every benchmark whose name contains selected and return the results
+    keyed by benchmark name.
+    """
+    results = {}
+    for position in fixed_positions(seed):
+        for name, operation in micro_operations(position).items():
+            key = '{}/{}'.format(name, position.name)
+            if selected in key:
+                ops, peak = measure(operation, min_time, repeat)
+                results[key] = {'ops_per_sec': ops, 'peak_bytes': peak}
+        if not position.searchable:
+            continue
+        for strategy_key, strategy in usable_strategies.items():
+            key = 'strategy-{}/{}'.format(strategy_key, position.name)
+            if strategy_key == 'i' or selected not in key or \
+                    position.game not in strategy_games[strategy_key]:
+                continue
+            game = position.make_game()
+            ops, peak = measure(lambda: strategy(game), min_time, repeat)
+            results[key] = {'ops_per_sec': ops, 'peak_bytes': peak}
+            stats = search_with_stats(strategy, game)[1]
+            if stats is not None:
+                nodes = stats.nodes + stats.terminal
+                results[key].update({'nodes': nodes,
+                                     'nodes_per_sec': ops * nodes})
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]],
+            baseline: Dict[str, Dict[str, float]],
+            threshold: float) -> List[Tuple[str, float, bool]]:
+    """
+    Return (name, speed-up, regressed) for every benchmark in both results
+    and baseline, where regressed means the speed-up fell below
+    1 - threshold.
+
+    >>> compare({'a': {'ops_per_sec': 50.0}}, {'a': {'ops_per_sec': 100.0}},
+    ...         0.1)
+    [('a', 0.5, True)]
+    """
+    rows = []
+    for name in sorted(set(results) & set(baseline)):
+        ratio = results[name]['ops_per_sec'] / baseline[name]['ops_per_sec']
+        rows.append((name, ratio, ratio < 1 - threshold))
+    return rows
+
+
+def main(argv: List[str] = None) -> int:
+    """
+    Run the benchmarks from the command line, returning 1 if any benchmark
+    regressed against the baseline.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--save', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='compare against this JSON file')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='slow-down that counts as a regression')
+    parser.add_argument('--min-time', type=float, default=0.2)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--select', default='',
+                        help='only run benchmarks whose name contains this')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.min_time, args.repeat, args.seed,
+                             args.select)
+    for name, result in results.items():
+        line = '{:55} {:14,.1f} ops/s {:12,} B peak'.format(
+            name, result['ops_per_sec'], result['peak_bytes'])
+        if 'nodes_per_sec' in result:
+            line += ' {:14,.0f} nodes/s'.format(result['nodes_per_sec'])
+        print(line)
+
+    if args.save:
+        with open(args.save, 'w') as output:
+            json.dump({'python': sys.version, 'platform': platform.platform(),
+                       'results': results}, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as stored:
+            baseline = json.load(stored)['results']
+        regressed = False
+        print()
+        for name, ratio, slower in compare(results, baseline,
+                                           args.threshold):
+            print('{:55} {:6.2f}x{}'.format(name, ratio,
+                                            '  REGRESSION' if slower else ''))
+            regressed = regressed or slower
+        return 1 if regressed else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
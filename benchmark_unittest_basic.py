@@ -0,0 +1,66 @@
+"""
+Unittests for the benchmark suite.
+"""
+import unittest
+
+from benchmark import SEARCHABLE_CELLS, compare, fixed_positions, \
+    run_benchmarks
+from game_interface import game_size_options, strategy_games, \
+    usable_strategies
+
+
+class BenchmarkUnitTests(unittest.TestCase):
+    def test_fixed_positions(self):
+        """
+        Test that the positions are the same for a seed, are not over, are
+        small enough to search when marked so, and make games of their own
+        size.
+        """
+        positions = fixed_positions(3)
+        self.assertEqual([repr(p.state) for p in positions],
+                         [repr(p.state) for p in fixed_positions(3)])
+        self.assertEqual(len({p.name for p in positions}), len(positions))
+        for position in positions:
+            game = position.make_game()
+            self.assertIs(game.current_state, position.state)
+            self.assertFalse(game.is_over(position.state), position.name)
+            option = game_size_options[position.game]
+            self.assertEqual(getattr(game.current_state, option),
+                             getattr(position.state, option))
+            if position.searchable and position.game == 'h':
+                self.assertLessEqual(
+                    len(position.state.get_possible_moves()),
+                    SEARCHABLE_CELLS, position.name)
+
+    def test_run_benchmarks(self):
+        """
+        Test that every non-interactive strategy is benchmarked on the
+        positions of each game it plays, and only on those.
+        """
+        for name in ['stonehenge-1-mid-game', 'subtract-square-4']:
+            results = run_benchmarks(0, 1, selected=name)
+            game = 'h' if name.startswith('stonehenge') else 's'
+            expected = {'strategy-{}/{}'.format(key, name)
+                        for key in usable_strategies
+                        if key != 'i' and game in strategy_games[key]}
+            self.assertEqual({key for key in results
+                              if key.startswith('strategy-')}, expected)
+            self.assertIn('make_move/{}'.format(name), results)
+            for result in results.values():
+                self.assertGreater(result['ops_per_sec'], 0)
+        self.assertIn('strategy-g/subtract-square-4', expected)
+
+    def test_compare(self):
+        """
+        Test that only benchmarks slower than the threshold regress.
+        """
+        results = {'a': {'ops_per_sec': 95.0}, 'b': {'ops_per_sec': 50.0},
+                   'c': {'ops_per_sec': 10.0}}
+        baseline = {'a': {'ops_per_sec': 100.0},
+                    'b': {'ops_per_sec': 100.0}}
+        self.assertEqual(compare(results, baseline, 0.1),
+                         [('a', 0.95, False), ('b', 0.5, True)])
+
+
+if __name__ == "__main__":
+    unittest.main()
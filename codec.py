@@ -0,0 +1,331 @@
+"""
+A compact binary codec for game states.
+
+A StonehengeState is one header byte (bits 0-2: side length, bit 3: whether
+it is Player 1's turn) followed by 2 bits per cell and then 2 bits per
+ley-line, four codes to a byte starting from the low bits. Codes are those
+of stonehenge_batch: EMPTY, P1 or P2. The ley-line markers are stored too
+because who claimed a ley-line first cannot always be told from the cells.
+Every record of a side length has the same size, record_size(side_length).
+
+A SubtractSquareState is a varint (7 bits per byte, low bits first, high bit
+set on every byte but the last) of current_total * 2 + p1_turn. A
+MultiSubtractSquareState is a 0 byte, which no other encoding starts with
+but that of an empty single pile, then a varint of the number of piles * 2 +
+p1_turn and a varint per pile.
+
+The batch functions encode and decode many positions between NumPy arrays
+and bytes without creating a Python object per position.
+"""
+from typing import Any, Tuple, Union
+import numpy as np
+from stonehenge import StonehengeState
+from stonehenge_batch import EMPTY, MARKERS, incidence_matrix, encode_states, \
+    decode_state
+from multi_subtract_square import MultiSubtractSquareState
+from subtract_square_state import SubtractSquareState
+
+Buffer = Union[bytes, bytearray, memoryview]
+# Varints of 64-bit totals never need more bytes than this.
+MAX_VARINT_BYTES = 10
+
+
+def cell_count(side_length: int) -> int:
+    """
+    Return the number of cells of a board with side_length.
+
+    >>> [cell_count(side) for side in range(1, 6)]
+    [3, 7, 12, 18, 25]
+    """
+    return incidence_matrix(side_length).shape[0]
+
+
+def record_size(side_length: int) -> int:
+    """
+    Return the number of bytes of an encoded StonehengeState with
+    side_length.
+
+    >>> [record_size(side) for side in range(1, 6)]
+    [4, 5, 7, 10, 12]
+    """
+    codes = cell_count(side_length) + 3 * (side_length + 1)
+    return 1 + (codes + 3) // 4
+
+
+def encode_stonehenge(state: StonehengeState) -> bytes:
+    """
+    Return the encoding of state.
+
+    >>> encode_stonehenge(StonehengeState(True, 1).make_move('A')).hex()
+    '01414400'
+    """
+    codes = {MARKERS[1]: 1, MARKERS[2]: 2}
+    packed = 0
+    shift = 0
+    for mark in list(''.join(state.lines)) + state.ley_line:
+        packed |= codes.get(mark, EMPTY) << shift
+        shift += 2
+    header = state.side_length | (8 if state.p1_turn else 0)
+    return bytes([header]) + packed.to_bytes(
+        record_size(state.side_length) - 1, 'little')
+
+
+def decode_stonehenge(data: Buffer) -> StonehengeState:
+    """
+    Return the StonehengeState that data encodes.
+
+    >>> a = StonehengeState(False, 3).make_move('F')
+    >>> repr(decode_stonehenge(encode_stonehenge(a))) == repr(a)
+    True
+    """
+    data = bytes(data)
+    side_length, p1_turn = read_header(data[0])
+    if len(data) != record_size(side_length):
+        raise ValueError('A side length {} record has {} bytes, not {}'.format(
+            side_length, record_size(side_length), len(data)))
+    packed = int.from_bytes(data[1:], 'little')
+    cells = cell_count(side_length)
+    codes = [(packed >> (2 * i)) & 3
+             for i in range(cells + 3 * (side_length + 1))]
+    return decode_state(np.array(codes[:cells]), np.array(codes[cells:]),
+                        p1_turn, side_length)
+
+
+def read_header(header: int) -> Tuple[int, bool]:
+    """
+    Return the (side length, p1_turn) a Stonehenge header byte holds.
+
+    >>> read_header(0b1011)
+    (3, True)
+    """
+    side_length = header & 7
+    if not 1 <= side_length <= 5 or header >> 4:
+        raise ValueError('{:#04x} is not a Stonehenge header'.format(header))
+    return side_length, bool(header & 8)
+
+
+def encode_stonehenge_batch(boards: np.ndarray, leys: np.ndarray,
+                            p1_turn: np.ndarray, side_length: int) -> bytes:
+    """
+    Return the encodings of a batch (see stonehenge_batch) of positions with
+    side_length, one record after another.
+
+    >>> a = StonehengeState(True, 1).make_move('A')
+    >>> encode_stonehenge_batch(*encode_states([a]), 1) == \\
+    ...     encode_stonehenge(a)
+    True
+    """
+    codes = np.concatenate([boards, leys], axis=1).astype(np.uint8)
+    size = record_size(side_length)
+    padded = np.zeros((len(codes), 4 * (size - 1)), dtype=np.uint8)
+    padded[:, :codes.shape[1]] = codes
+    quads = padded.reshape(len(codes), size - 1, 4)
+    payload = (quads[:, :, 0] | quads[:, :, 1] << 2 | quads[:, :, 2] << 4
+               | quads[:, :, 3] << 6)
+    header = (side_length | np.where(p1_turn, 8, 0)).astype(np.uint8)
+    return np.concatenate([header[:, None], payload], axis=1).tobytes()
+
+
+def decode_stonehenge_batch(data: Buffer, side_length: int) \
+        -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Return the (boards, leys, p1_turn) batch of the records of positions
+    with side_length in data. data is read in place, without copying.
+
+    >>> a = StonehengeState(False, 2).make_move('C')
+    >>> boards, leys, p1_turn = decode_stonehenge_batch(
+    ...     encode_stonehenge(a) * 2, 2)
+    >>> boards.shape, leys.shape, p1_turn.tolist()
+    ((2, 7), (2, 9), [True, True])
+    """
+    size = record_size(side_length)
+    records = np.frombuffer(data, dtype=np.uint8)
+    if len(records) % size:
+        raise ValueError('{} bytes is not a whole number of {}-byte '
+                         'records'.format(len(records), size))
+    records = records.reshape(-1, size)
+    headers = records[:, 0]
+    if np.any(headers & 0xf7 != side_length):
+        raise ValueError('Not every record has side length {}'.format(
+            side_length))
+    payload = records[:, 1:]
+    codes = np.stack([payload & 3, payload >> 2 & 3, payload >> 4 & 3,
+                      payload >> 6], axis=2).reshape(len(records), -1)
+    codes = codes.astype(np.int8)
+    cells = cell_count(side_length)
+    leys = 3 * (side_length + 1)
+    return (codes[:, :cells], codes[:, cells:cells + leys],
+            (headers & 8).astype(bool))
+
+
+def encode_stonehenge_states(states: Any) -> bytes:
+    """
+    Return the encodings of states, which all have the same side length.
+    """
+    states = list(states)
+    return encode_stonehenge_batch(*encode_states(states),
+                                   states[0].side_length)
+
+
+def encode_varint(value: int) -> bytes:
+    """
+    Return the varint encoding of the non-negative value.
+
+    >>> encode_varint(300).hex()
+    'ac02'
+    """
+    if value < 0:
+        raise ValueError('Cannot encode the negative value {}'.format(value))
+    out = bytearray()
+    while value >= 0x80:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def decode_varint(data: Buffer, offset: int = 0) -> Tuple[int, int]:
+    """
+    Return the value of the varint at offset in data and the offset just
+    past it.
+
+    >>> decode_varint(bytes.fromhex('ac02'))
+    (300, 2)
+    """
+    value = 0
+    shift = 0
+    while True:
+        if offset >= len(data):
+            raise ValueError('Truncated varint')
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        shift += 7
+        if byte < 0x80:
+            return value, offset
+
+
+def encode_subtract_square(state: SubtractSquareState) -> bytes:
+    """
+    Return the encoding of state.
+
+    >>> encode_subtract_square(SubtractSquareState(True, 18)).hex()
+    '25'
+    """
+    return encode_varint(state.current_total * 2 + bool(state.p1_turn))
+
+
+def decode_subtract_square(data: Buffer) -> SubtractSquareState:
+    """
+    Return the SubtractSquareState that data encodes.
+
+    >>> decode_subtract_square(bytes.fromhex('25'))
+    P1's Turn: True - Total: 18
+    """
+    value, end = decode_varint(data)
+    if end != len(data):
+        raise ValueError('Trailing bytes after a varint')
+    return SubtractSquareState(bool(value & 1), value >> 1)
+
+
+def encode_multi_subtract_square(state: MultiSubtractSquareState) -> bytes:
+    """
+    Return the encoding of state.
+
+    >>> encode_multi_subtract_square(
+    ...     MultiSubtractSquareState(False, [3, 200])).hex()
+    '000403c801'
+    """
+    return b'\x00' + encode_varint(len(state.piles) * 2 +
+                                   bool(state.p1_turn)) + \
+        b''.join(encode_varint(size) for size in state.piles)
+
+
+def decode_multi_subtract_square(data: Buffer) -> MultiSubtractSquareState:
+    """
+    Return the MultiSubtractSquareState that data encodes.
+
+    >>> decode_multi_subtract_square(bytes.fromhex('000403c801'))
+    P1's Turn: False - Piles: (3, 200)
+    """
+    if not len(data) or data[0] != 0:
+        raise ValueError('Not an encoding of several piles')
+    value, offset = decode_varint(data, 1)
+    piles = []
+    for _ in range(value >> 1):
+        size, offset = decode_varint(data, offset)
+        piles.append(size)
+    if offset != len(data):
+        raise ValueError('Trailing bytes after the piles')
+    return MultiSubtractSquareState(bool(value & 1), piles)
+
+
+def encode_subtract_square_batch(totals: np.ndarray,
+                                 p1_turn: np.ndarray) -> bytes:
+    """
+    Return the encodings of the Subtract Square positions with totals and
+    p1_turn, one varint after another.
+
+    >>> encode_subtract_square_batch(np.array([18, 150]),
+    ...                              np.array([True, False])).hex()
+    '25ac02'
+    """
+    values = np.asarray(totals, dtype=np.uint64) * np.uint64(2) + \
+        np.asarray(p1_turn, dtype=np.uint64)
+    lengths = np.ones(len(values), dtype=np.int64)
+    for k in range(1, MAX_VARINT_BYTES):
+        lengths += values >= np.uint64(1) << np.uint64(7 * k)
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    out = np.zeros(int(ends[-1]) if len(ends) else 0, dtype=np.uint8)
+    for k in range(int(lengths.max()) if len(lengths) else 0):
+        rows = lengths > k
+        chunk = (values[rows] >> np.uint64(7 * k)) & np.uint64(0x7f)
+        more = np.where(lengths[rows] > k + 1, 0x80, 0).astype(np.uint64)
+        out[starts[rows] + k] = (chunk | more).astype(np.uint8)
+    return out.tobytes()
+
+
+def decode_subtract_square_batch(data: Buffer) \
+        -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return the (totals, p1_turn) arrays of the varints in data.
+
+    >>> totals, p1_turn = decode_subtract_square_batch(
+    ...     bytes.fromhex('25ac02'))
+    >>> totals.tolist(), p1_turn.tolist()
+    ([18, 150], [True, False])
+    """
+    raw = np.frombuffer(data, dtype=np.uint8)
+    if len(raw) and raw[-1] >= 0x80:
+        raise ValueError('Truncated varint')
+    last = raw < 0x80
+    ends = np.flatnonzero(last)
+    record = np.concatenate([[0], np.cumsum(last)[:-1]]).astype(np.int64) \
+        if len(raw) else np.zeros(0, dtype=np.int64)
+    starts = np.concatenate([[0], ends[:-1] + 1]).astype(np.int64)
+    position = np.arange(len(raw)) - starts[record]
+    values = np.zeros(len(ends), dtype=np.uint64)
+    np.add.at(values, record, (raw & 0x7f).astype(np.uint64)
+              << (np.uint64(7) * position.astype(np.uint64)))
+    return values >> np.uint64(1), (values & np.uint64(1)).astype(bool)
+
+
+def encode_state(state: Any) -> bytes:
+    """
+    Return the encoding of a StonehengeState, SubtractSquareState or
+    MultiSubtractSquareState, which is also a compact key that only equal
+    states share.
+    """
+    if isinstance(state, StonehengeState):
+        return encode_stonehenge(state)
+    if isinstance(state, MultiSubtractSquareState):
+        return encode_multi_subtract_square(state)
+    if isinstance(state, SubtractSquareState):
+        return encode_subtract_square(state)
+    raise TypeError('Cannot encode a {}'.format(type(state).__name__))
+
+
+if __name__ == "__main__":
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
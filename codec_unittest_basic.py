@@ -0,0 +1,81 @@
+"""
+Unittests for the compact binary codec of game states.
+"""
+import random
+import unittest
+
+import numpy as np
+
+import codec
+from stonehenge import StonehengeState
+from stonehenge_batch import encode_states
+from stonehenge_batch_unittest_basic import random_positions
+from subtract_square_state import SubtractSquareState
+
+
+class CodecUnitTests(unittest.TestCase):
+    def test_stonehenge_round_trip(self):
+        """
+        Test that every Stonehenge position decodes back to an equal state
+        from a record of the documented size.
+        """
+        for side in range(1, 6):
+            for state in random_positions(side, 10, side):
+                data = codec.encode_stonehenge(state)
+                self.assertEqual(len(data), codec.record_size(side))
+                decoded = codec.decode_stonehenge(data)
+                self.assertEqual(repr(decoded), repr(state))
+
+    def test_stonehenge_batch_matches_single(self):
+        """
+        Test that batch encoding gives the concatenated single encodings and
+        decodes back to the same arrays, read from a memoryview.
+        """
+        for side in range(1, 6):
+            positions = random_positions(side, 10, 10 + side)
+            data = codec.encode_stonehenge_states(positions)
+            self.assertEqual(data, b''.join(codec.encode_stonehenge(state)
+                                            for state in positions))
+            boards, leys, p1_turn = codec.decode_stonehenge_batch(
+                memoryview(data), side)
+            expected = encode_states(positions)
+            self.assertTrue(np.array_equal(boards, expected[0]))
+            self.assertTrue(np.array_equal(leys, expected[1]))
+            self.assertTrue(np.array_equal(p1_turn, expected[2]))
+
+    def test_stonehenge_rejects_wrong_side(self):
+        """
+        Test that decoding a batch with the wrong side length fails.
+        """
+        data = codec.encode_stonehenge(StonehengeState(True, 2))
+        with self.assertRaises(ValueError):
+            codec.decode_stonehenge_batch(data, 3)
+
+    def test_subtract_square_round_trip(self):
+        """
+        Test that Subtract Square totals of every varint length round trip,
+        singly and in batches.
+        """
+        rng = random.Random(3)
+        totals = [0, 1, 63, 64, 8191, 8192] + [rng.randrange(1 << 40)
+                                              for _ in range(100)]
+        p1_turn = [rng.random() < 0.5 for _ in totals]
+        states = [SubtractSquareState(turn, total)
+                  for turn, total in zip(p1_turn, totals)]
+        for state in states:
+            decoded = codec.decode_subtract_square(
+                codec.encode_subtract_square(state))
+            self.assertEqual(repr(decoded), repr(state))
+
+        data = codec.encode_subtract_square_batch(np.array(totals),
+                                                  np.array(p1_turn))
+        self.assertEqual(data, b''.join(codec.encode_subtract_square(state)
+                                        for state in states))
+        decoded_totals, decoded_turns = \
+            codec.decode_subtract_square_batch(data)
+        self.assertEqual(decoded_totals.tolist(), totals)
+        self.assertEqual(decoded_turns.tolist(), p1_turn)
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
@@ -0,0 +1,429 @@
+"""
+A solver that spreads a position's game tree over many worker processes,
+on one machine or several.
+
+The tree is split split_depth moves below the position: every distinct
+position there (by canonical position) is a work unit. A broker process,
+a multiprocessing manager listening on a TCP address, serves a WorkQueue of
+units and a queue of results. Workers connect to it, take units, solve them
+with solver.Solver and send back their values, renewing their lease on a
+unit every heartbeat seconds while they solve it. The broker notes the time
+each unit is taken, so a unit whose worker dies at any point, even before
+it could report anything, is not heard of for lease seconds and is queued
+again, up to retries times. Once every unit is solved, the values are
+combined by minimax over the top split_depth moves.
+
+Example:
+    python distributed_solver.py serve --game h --size 3 --split-depth 2 \\
+        --port 50000 --authkey secret --workers 4
+    python distributed_solver.py work --connect host:50000 --authkey secret
+"""
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from multiprocessing import Process
+from multiprocessing.managers import BaseManager
+from typing import Any, Dict, List, Tuple
+from analyze import make_game
+from game_interface import playable_games, game_size_options
+from solver import Solver
+from strategy import SearchStats, help_score_over
+from strategy_cache import canonical_position
+
+# How many positions a worker searches between checks of its heartbeat.
+HEARTBEAT_STEPS = 10000
+
+
+class WorkQueue:
+    """
+    The queue of work units of the broker, which keeps the time every unit
+    taken but not finished was last heard of.
+    """
+
+    def __init__(self) -> None:
+        """
+        Create a new, empty WorkQueue.
+        """
+        self._units = queue.Queue()
+        self._taken = {}
+        self._lock = threading.Lock()
+
+    def put(self, unit: Any) -> None:
+        """
+        Queue unit, an (id, game key, position) tuple or None to stop a
+        worker.
+        """
+        self._units.put(unit)
+
+    def take(self, timeout: float = None) -> Any:
+        """
+        Return the next unit, waiting up to timeout seconds (without limit
+        if None) before raising queue.Empty, and note that it was taken now.
+        """
+        unit = self._units.get(timeout=timeout)
+        if unit is not None:
+            with self._lock:
+                self._taken[unit[0]] = time.monotonic()
+        return unit
+
+    def renew(self, unit_id: int) -> None:
+        """
+        Note that the unit unit_id is still being solved.
+        """
+        with self._lock:
+            if unit_id in self._taken:
+                self._taken[unit_id] = time.monotonic()
+
+    def finish(self, unit_id: int) -> None:
+        """
+        Note that the value of the unit unit_id was sent.
+        """
+        with self._lock:
+            self._taken.pop(unit_id, None)
+
+    def expired(self, lease: float) -> List[int]:
+        """
+        Return the ids of the units not heard of for lease seconds, and stop
+        keeping their times.
+        """
+        now = time.monotonic()
+        with self._lock:
+            lost = [unit_id for unit_id, at in self._taken.items()
+                    if now - at >= lease]
+            for unit_id in lost:
+                del self._taken[unit_id]
+        return lost
+
+
+# The queues of the broker process.
+_JOBS = WorkQueue()
+_RESULTS = queue.Queue()
+
+
+def _jobs() -> WorkQueue:
+    """
+    Return the queue of work units of the broker.
+    """
+    return _JOBS
+
+
+def _results() -> queue.Queue:
+    """
+    Return the queue of solved work units of the broker.
+    """
+    return _RESULTS
+
+
+class Broker(BaseManager):
+    """
+    A connection to the process that serves the queues of work units and
+    results.
+    """
+
+
+Broker.register('jobs', callable=_jobs)
+Broker.register('results', callable=_results)
+
+
+def game_key(game: Any) -> str:
+    """
+    Return the key of game in playable_games.
+    """
+    return [key for key in playable_games
+            if isinstance(game, playable_games[key])][0]
+
+
+def work(address: Tuple[str, int], authkey: bytes, idle: float = None,
+         heartbeat: float = 10.0) -> int:
+    """
+    Solve the work units of the broker at address until it sends None,
+    shuts down, or has no unit for idle seconds (if given), renewing the
+    lease on each unit every heartbeat seconds, and return the number of
+    units solved.
+    """
+    broker = Broker(address, authkey)
+    solved = 0
+    try:
+        broker.connect()
+        jobs, results = broker.jobs(), broker.results()
+        while True:
+            try:
+                unit = jobs.take(idle)
+            except queue.Empty:
+                break
+            if unit is None:
+                break
+            unit_id, key, data = unit
+            solver = Solver(make_game(key, data))
+            renewed = time.monotonic()
+            while not solver.run(HEARTBEAT_STEPS):
+                if time.monotonic() - renewed >= heartbeat:
+                    jobs.renew(unit_id)
+                    renewed = time.monotonic()
+            # The value is sent before the unit is finished, so that a
+            # worker dying in between only has the unit solved twice.
+            results.put((unit_id, solver.result()[1], solver.stats.nodes,
+                         solver.stats.terminal))
+            jobs.finish(unit_id)
+            solved += 1
+    except (EOFError, ConnectionError):
+        pass
+    return solved
+
+
+class DistributedSolver:
+    """
+    The coordinator of a distributed solve of the current state of a game.
+
+    game - the game whose current state is solved
+    split_depth - how many moves below the current state work units start
+    lease - the seconds a work unit may go unheard of by its worker before it
+            is queued again
+    retries - how many times a work unit is queued again before the solve
+              fails
+    authkey - the key workers need to connect to the broker
+    units - the work units: (game key, canonical position) by number
+    values - the values of the solved work units, by number
+    requeued - the number of times a work unit was queued again
+    stats - the record of the search, with nodes and terminal summed over
+            the work units
+    """
+    game: Any
+    split_depth: int
+    lease: float
+    retries: int
+    authkey: bytes
+    units: Dict[int, Tuple[str, bytes]]
+    values: Dict[int, float]
+    requeued: int
+    stats: SearchStats
+
+    def __init__(self, game: Any, split_depth: int = 2, lease: float = 60.0,
+                 retries: int = 3, authkey: bytes = None) -> None:
+        """
+        Create a new DistributedSolver of game and split its tree into work
+        units.
+        """
+        if split_depth < 1:
+            raise ValueError('split_depth must be at least 1')
+        self.game = game
+        self.split_depth = split_depth
+        self.lease = lease
+        self.retries = retries
+        self.authkey = authkey if authkey is not None else os.urandom(16)
+        self.units = {}
+        self.values = {}
+        self.requeued = 0
+        self.stats = SearchStats()
+        self._ids = {}
+        self._split(game.current_state, 0)
+        self._broker = None
+        self._workers = []
+
+    def _split(self, state: Any, depth: int) -> None:
+        """
+        Add the work units depth moves below the current state of game
+        under state.
+        """
+        if self.game.is_over(state):
+            return
+        if depth == self.split_depth:
+            position = canonical_position(state)
+            if position not in self._ids:
+                self._ids[position] = len(self.units)
+                self.units[len(self.units)] = (game_key(self.game), position)
+            return
+        for move in state.get_possible_moves():
+            self._split(state.make_move(move), depth + 1)
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """
+        Return the address the broker listens on.
+        """
+        return self._broker.address
+
+    def start(self, host: str = '127.0.0.1', port: int = 0) -> None:
+        """
+        Start the broker on host and port and queue every work unit.
+        """
+        self._broker = Broker((host, port), self.authkey)
+        self._broker.start()
+        jobs = self._broker.jobs()
+        for unit_id, (key, position) in self.units.items():
+            jobs.put((unit_id, key, position))
+
+    def start_workers(self, count: int) -> None:
+        """
+        Start count worker processes on this machine.
+        """
+        for _ in range(count):
+            worker = Process(target=work, args=(self.address, self.authkey),
+                             daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def collect(self, poll: float = 0.1) -> None:
+        """
+        Wait for the value of every work unit, queueing again the units not
+        heard of for lease seconds. Raise RuntimeError if a unit was queued
+        again retries times without a value coming back.
+        """
+        jobs, results = self._broker.jobs(), self._broker.results()
+        start = time.perf_counter()
+        attempts = dict.fromkeys(self.units, 0)
+        while len(self.values) < len(self.units):
+            try:
+                unit_id, value, nodes, terminal = results.get(timeout=poll)
+                if unit_id not in self.values:
+                    self.values[unit_id] = value
+                    self.stats.nodes += nodes
+                    self.stats.terminal += terminal
+            except queue.Empty:
+                pass
+            for unit_id in jobs.expired(self.lease):
+                if unit_id in self.values:
+                    continue
+                if attempts[unit_id] == self.retries:
+                    raise RuntimeError('Work unit {} was lost {} times'.format(
+                        unit_id, attempts[unit_id] + 1))
+                key, position = self.units[unit_id]
+                jobs.put((unit_id, key, position))
+                attempts[unit_id] += 1
+                self.requeued += 1
+        self.stats.elapsed = time.perf_counter() - start
+
+    def result(self) -> Tuple[Any, float]:
+        """
+        Return the best move and its value for the player to move, from the
+        values of the work units.
+        """
+        state = self.game.current_state
+        moves = state.get_possible_moves()
+        self.stats.visit(0, len(moves))
+        scores = [-self._combine(state.make_move(move), 1) for move in moves]
+        value = max(scores)
+        self.stats.value, self.stats.exact = value, True
+        return moves[scores.index(value)], value
+
+    def _combine(self, state: Any, depth: int) -> float:
+        """
+        Return the value of state, depth moves below the current state of
+        game, for the player to move in it.
+        """
+        if self.game.is_over(state):
+            self.stats.visit(depth)
+            return help_score_over(self.game, state)
+        if depth == self.split_depth:
+            return self.values[self._ids[canonical_position(state)]]
+        moves = state.get_possible_moves()
+        self.stats.visit(depth, len(moves))
+        return max(-self._combine(state.make_move(move), depth + 1)
+                   for move in moves)
+
+    def close(self) -> None:
+        """
+        Stop the workers on this machine and shut the broker down, which
+        disconnects any others.
+        """
+        if self._broker is None:
+            return
+        jobs = self._broker.jobs()
+        for _ in self._workers:
+            jobs.put(None)
+        for worker in self._workers:
+            worker.join(5)
+            if worker.is_alive():
+                worker.terminate()
+        self._broker.shutdown()
+        self._broker = None
+
+
+def solve_distributed(game: Any, split_depth: int = 2, workers: int = None,
+                      **options: Any) -> Tuple[Any, float]:
+    """
+    Return the best move and its value for the current state of game,
+    solved by workers local worker processes (by default one per CPU)
+    through a broker on localhost. options are as for DistributedSolver.
+    """
+    solver = DistributedSolver(game, split_depth, **options)
+    try:
+        solver.start()
+        solver.start_workers(workers or os.cpu_count() or 1)
+        solver.collect()
+        return solver.result()
+    finally:
+        solver.close()
+
+
+def main(argv: List[str] = None) -> None:
+    """
+    Serve a distributed solve, or work for one, from the command line.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve = commands.add_parser('serve', help='split a position and '
+                                              'combine the values of its '
+                                              'work units')
+    serve.add_argument('--game', choices=list(playable_games), default='h')
+    serve.add_argument('--size', type=int,
+                       help='the side length or starting total of the game')
+    serve.add_argument('--first', choices=['p1', 'p2'], default='p1')
+    serve.add_argument('--position', metavar='HEX',
+                       help='the codec encoding of the position to solve, '
+                            'instead of the start of the game')
+    serve.add_argument('--split-depth', type=int, default=2)
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=0)
+    serve.add_argument('--workers', type=int, default=0,
+                       help='worker processes to start on this machine')
+    serve.add_argument('--lease', type=float, default=60.0,
+                       metavar='SECONDS',
+                       help='how long a work unit may go without a heartbeat '
+                            'before it is queued again')
+    serve.add_argument('--retries', type=int, default=3)
+    serve.add_argument('--authkey', required=True)
+    worker = commands.add_parser('work', help='solve work units')
+    worker.add_argument('--connect', required=True, metavar='HOST:PORT')
+    worker.add_argument('--authkey', required=True)
+    worker.add_argument('--heartbeat', type=float, default=10.0,
+                        metavar='SECONDS',
+                        help='how often to renew the lease on a work unit')
+    args = parser.parse_args(argv)
+
+    if args.command == 'work':
+        host, _, port = args.connect.rpartition(':')
+        print('Solved {} work units'.format(
+            work((host, int(port)), args.authkey.encode(),
+                 heartbeat=args.heartbeat)))
+        return
+    if args.position:
+        game = make_game(args.game, bytes.fromhex(args.position))
+    elif args.size is None:
+        parser.error('--size or --position is needed')
+    else:
+        game = playable_games[args.game](
+            args.first == 'p1', **{game_size_options[args.game]: args.size})
+    solver = DistributedSolver(game, args.split_depth, args.lease,
+                               args.retries, args.authkey.encode())
+    try:
+        solver.start(args.host, args.port)
+        print('Serving {} work units on {}'.format(len(solver.units),
+                                                   solver.address),
+              flush=True)
+        solver.start_workers(args.workers)
+        solver.collect()
+        move, value = solver.result()
+    finally:
+        solver.close()
+    print(json.dumps({'move': move, 'value': value,
+                      'units': len(solver.units),
+                      'requeued': solver.requeued,
+                      'stats': solver.stats.as_dict()}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Unittests for the distributed solver, run entirely on localhost.
+"""
+import os
+import threading
+import time
+import unittest
+from multiprocessing import Process
+from unittest.mock import patch
+
+import distributed_solver
+from distributed_solver import Broker, DistributedSolver, solve_distributed
+from game_interface import playable_games
+from solver import solve
+
+
+def take_and_die(address, authkey):
+    """
+    Take a work unit from the broker at address and die without a word.
+    """
+    broker = Broker(address, authkey)
+    broker.connect()
+    broker.jobs().take()
+    os._exit(1)
+
+
+class SlowSolver:
+    """
+    A stand-in for Solver that takes a second to solve any position.
+    """
+
+    def __init__(self, game):
+        self.calls = 0
+        self.stats = distributed_solver.SearchStats()
+
+    def run(self, steps=None):
+        time.sleep(0.05)
+        self.calls += 1
+        return self.calls == 20
+
+    def result(self):
+        return None, 1
+
+
+class DistributedSolverUnitTests(unittest.TestCase):
+    def test_agrees_with_solver(self):
+        """
+        Test that a distributed solve of a Stonehenge board finds the move
+        and value of a solve in one process.
+        """
+        game = playable_games['h'](False, side_length=2)
+        game.current_state = game.current_state.make_move('C')
+        self.assertEqual(solve_distributed(game, split_depth=2, workers=2),
+                         solve(game).result())
+
+    def test_lost_unit_is_retried(self):
+        """
+        Test that a work unit taken by a worker that dies before it can
+        report anything is queued again and solved by another worker.
+        """
+        game = playable_games['s'](True, current_total=30)
+        solver = DistributedSolver(game, split_depth=2, lease=0.5)
+        try:
+            solver.start()
+            dying = Process(target=take_and_die,
+                            args=(solver.address, solver.authkey))
+            dying.start()
+            dying.join()
+            solver.start_workers(2)
+            solver.collect()
+            self.assertEqual(solver.result(), solve(game).result())
+        finally:
+            solver.close()
+        self.assertEqual(solver.requeued, 1)
+        self.assertEqual(len(solver.values), len(solver.units))
+
+    def test_heartbeat_keeps_lease(self):
+        """
+        Test that a work unit that takes longer than the lease to solve is
+        not queued again while its worker keeps renewing the lease.
+        """
+        game = playable_games['s'](True, current_total=2)
+        solver = DistributedSolver(game, split_depth=1, lease=0.3,
+                                   retries=0)
+        try:
+            solver.start()
+            with patch.object(distributed_solver, 'Solver', SlowSolver):
+                worker = threading.Thread(target=distributed_solver.work,
+                                          args=(solver.address,
+                                                solver.authkey, 0.5, 0.05))
+                worker.start()
+                solver.collect()
+                worker.join()
+        finally:
+            solver.close()
+        self.assertEqual(solver.requeued, 0)
+        self.assertEqual(solver.values, {0: 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
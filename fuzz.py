@@ -0,0 +1,224 @@
+"""
+A seeded differential fuzzer between two Stonehenge engines.
+
+Random games are played through a reference engine (StonehengeState) and a
+candidate engine in lockstep. After every move both states must agree on
+their moves, ley-line markers, state_over, rough_outcome and __str__. The
+first divergence found is reported with its move sequence shrunk to one
+where no single move can be dropped without losing the divergence.
+
+Example:
+    python fuzz.py some_module:FastStonehengeState --games 100000 --seed 7
+"""
+import argparse
+import importlib
+import random
+import sys
+from typing import Any, Callable, List, Optional, Tuple
+from stonehenge import StonehengeState
+
+# The observations compared after every move, in the order they are checked.
+CHECKS = ['p1_turn', 'moves', 'ley_line', 'state_over', 'str',
+          'rough_outcome']
+
+
+class Divergence:
+    """
+    A position where two engines disagree.
+
+    side_length - the side length of the board
+    p1_starts - whether Player 1 made the first move
+    moves - the moves made from the starting state
+    check - the name of the first observation that differed
+    expected - the reference engine's value of check
+    actual - the candidate engine's value of check (or the error it raised)
+    """
+    side_length: int
+    p1_starts: bool
+    moves: List[str]
+    check: str
+    expected: Any
+    actual: Any
+
+    def __init__(self, side_length: int, p1_starts: bool, moves: List[str],
+                 check: str, expected: Any, actual: Any) -> None:
+        """
+        Create a new Divergence.
+        """
+        self.side_length = side_length
+        self.p1_starts = p1_starts
+        self.moves = moves
+        self.check = check
+        self.expected = expected
+        self.actual = actual
+
+    def __str__(self) -> str:
+        """
+        Return a report of this Divergence.
+        """
+        return ('side length {}, {} starts, moves {}: {} differs\n'
+                'expected: {!r}\nactual:   {!r}').format(
+                    self.side_length, 'p1' if self.p1_starts else 'p2',
+                    ' '.join(self.moves) or '(none)', self.check,
+                    self.expected, self.actual)
+
+
+def observe(state: Any, check: str) -> Any:
+    """
+    Return the observation named check of state.
+    """
+    if check == 'p1_turn':
+        return state.p1_turn
+    if check == 'moves':
+        return list(state.get_possible_moves())
+    if check == 'ley_line':
+        return list(state.ley_line)
+    if check == 'state_over':
+        return state.state_over()
+    if check == 'str':
+        return str(state)
+    return state.rough_outcome()
+
+
+def compare(reference: Any, candidate: Any,
+            checks: List[str]) -> Optional[Tuple[str, Any, Any]]:
+    """
+    Return (check, expected, actual) for the first of checks on which
+    reference and candidate differ, or None if they agree.
+    """
+    for check in checks:
+        expected = observe(reference, check)
+        try:
+            actual = observe(candidate, check)
+        except Exception as error:  # pylint: disable=broad-except
+            actual = error
+        if actual != expected:
+            return check, expected, actual
+    return None
+
+
+def replay(candidate: Callable[[bool, int], Any], side_length: int,
+           p1_starts: bool, moves: List[str], checks: List[str],
+           reference: Callable[[bool, int], Any] = StonehengeState) \
+        -> Optional[Divergence]:
+    """
+    Return the first Divergence met while making moves in both engines, or
+    None if they agree throughout. Moves that are illegal for the reference
+    engine count as agreement, so that shrinking never leaves the rules.
+    """
+    expected = reference(p1_starts, side_length)
+    try:
+        actual = candidate(p1_starts, side_length)
+    except Exception as error:  # pylint: disable=broad-except
+        return Divergence(side_length, p1_starts, [], 'init', expected, error)
+    for made in range(len(moves) + 1):
+        difference = compare(expected, actual, checks)
+        if difference is not None:
+            return Divergence(side_length, p1_starts, moves[:made],
+                              *difference)
+        if made == len(moves) or \
+                moves[made] not in expected.get_possible_moves():
+            return None
+        expected = expected.make_move(moves[made])
+        try:
+            actual = actual.make_move(moves[made])
+        except Exception as error:  # pylint: disable=broad-except
+            return Divergence(side_length, p1_starts, moves[:made + 1],
+                              'make_move', expected, error)
+    return None
+
+
+def shrink(candidate: Callable[[bool, int], Any], divergence: Divergence,
+           checks: List[str],
+           reference: Callable[[bool, int], Any] = StonehengeState) \
+        -> Divergence:
+    """
+    Return a Divergence like divergence whose moves cannot lose any single
+    move and still diverge.
+    """
+    shrunk = True
+    while shrunk:
+        shrunk = False
+        for i in range(len(divergence.moves)):
+            moves = divergence.moves[:i] + divergence.moves[i + 1:]
+            smaller = replay(candidate, divergence.side_length,
+                             divergence.p1_starts, moves, checks, reference)
+            if smaller is not None:
+                divergence = smaller
+                shrunk = True
+                break
+    return divergence
+
+
+def fuzz(candidate: Callable[[bool, int], Any], games: int = 1000,
+         seed: int = 0, sides: List[int] = None, checks: List[str] = None,
+         reference: Callable[[bool, int], Any] = StonehengeState,
+         progress: Callable[[int], None] = None) -> Optional[Divergence]:
+    """
+    Play games random games through reference and candidate in lockstep and
+    return the first (shrunk) Divergence, or None if they always agreed.
+
+    Game number i uses random.Random('<seed>:<i>'), so any game can be
+    replayed on its own. progress, if given, is called with the number of games
+    played every 1000 games.
+
+    >>> fuzz(StonehengeState, games=20, seed=1) is None
+    True
+    """
+    sides = sides or [1, 2, 3, 4, 5]
+    checks = checks or CHECKS
+    for number in range(games):
+        rng = random.Random('{}:{}'.format(seed, number))
+        side_length = rng.choice(sides)
+        p1_starts = rng.random() < 0.5
+        state = reference(p1_starts, side_length)
+        moves = []
+        while state.get_possible_moves():
+            moves.append(rng.choice(state.get_possible_moves()))
+            state = state.make_move(moves[-1])
+        divergence = replay(candidate, side_length, p1_starts, moves, checks,
+                            reference)
+        if divergence is not None:
+            return shrink(candidate, divergence, checks, reference)
+        if progress is not None and (number + 1) % 1000 == 0:
+            progress(number + 1)
+    return None
+
+
+def load_engine(path: str) -> Callable[[bool, int], Any]:
+    """
+    Return the engine named by path, written as 'module:attribute'.
+    """
+    module, _, name = path.partition(':')
+    return getattr(importlib.import_module(module), name)
+
+
+def main(argv: List[str] = None) -> int:
+    """
+    Fuzz a candidate engine from the command line, returning 1 if it
+    diverged from the reference engine.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('candidate', help='module:attribute of the engine')
+    parser.add_argument('--reference', default='stonehenge:StonehengeState')
+    parser.add_argument('--games', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--sides', type=int, nargs='+',
+                        default=[1, 2, 3, 4, 5])
+    parser.add_argument('--checks', nargs='+', choices=CHECKS,
+                        default=CHECKS)
+    args = parser.parse_args(argv)
+
+    divergence = fuzz(load_engine(args.candidate), args.games, args.seed,
+                      args.sides, args.checks, load_engine(args.reference),
+                      lambda played: print('{} games agree'.format(played),
+                                           file=sys.stderr))
+    if divergence is None:
+        print('No divergence in {} games'.format(args.games))
+        return 0
+    print(divergence)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
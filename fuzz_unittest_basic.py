@@ -0,0 +1,77 @@
+"""
+Unittests for the differential fuzzer between Stonehenge engines.
+"""
+import unittest
+
+from fuzz import CHECKS, fuzz, replay
+from stonehenge import StonehengeState
+
+
+class OffersClaimedCell(StonehengeState):
+    """
+    A Stonehenge engine with a seeded bug: once cell A is claimed, it is
+    still offered as a move.
+    """
+
+    def make_move(self, move):
+        state = super().make_move(move)
+        buggy = OffersClaimedCell(state.p1_turn, state.side_length)
+        buggy.lines, buggy.ley_line = state.lines, state.ley_line
+        return buggy
+
+    def get_possible_moves(self):
+        moves = super().get_possible_moves()
+        if moves and 'A' not in moves:
+            moves = moves + ['A']
+        return moves
+
+
+class CrashesOnCellG(StonehengeState):
+    """
+    A Stonehenge engine with a seeded bug: claiming cell G of a side-2
+    board raises an error.
+    """
+
+    def make_move(self, move):
+        if move == 'G' and self.side_length == 2:
+            raise IndexError('no cell G')
+        state = super().make_move(move)
+        buggy = CrashesOnCellG(state.p1_turn, state.side_length)
+        buggy.lines, buggy.ley_line = state.lines, state.ley_line
+        return buggy
+
+
+class FuzzUnitTests(unittest.TestCase):
+    def test_finds_invalid_move(self):
+        """
+        Test that the fuzzer finds a seeded invalid-move bug, shrunk to the
+        one move that shows it, the same way for the same seed.
+        """
+        divergence = fuzz(OffersClaimedCell, games=50, seed=3)
+        self.assertIsNotNone(divergence)
+        self.assertEqual(divergence.check, 'moves')
+        self.assertEqual(divergence.moves, ['A'])
+        self.assertNotIn('A', divergence.expected)
+        self.assertIn('A', divergence.actual)
+        self.assertEqual(str(fuzz(OffersClaimedCell, games=50, seed=3)),
+                         str(divergence))
+        again = replay(OffersClaimedCell, divergence.side_length,
+                       divergence.p1_starts, divergence.moves, CHECKS)
+        self.assertEqual(str(again), str(divergence))
+
+    def test_engine_errors_and_agreement(self):
+        """
+        Test that an engine raising an error is reported as a divergence of
+        make_move, and that a faithful engine never diverges. rough_outcome
+        is not checked, as it makes moves itself.
+        """
+        divergence = fuzz(CrashesOnCellG, games=50, seed=0, sides=[2],
+                          checks=CHECKS[:-1])
+        self.assertEqual(divergence.check, 'make_move')
+        self.assertEqual(divergence.moves, ['G'])
+        self.assertIsInstance(divergence.actual, IndexError)
+        self.assertIsNone(fuzz(StonehengeState, games=30, seed=5))
+
+
+if __name__ == "__main__":
+    unittest.main()
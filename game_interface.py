@@ -5,21 +5,104 @@ The minimax strategy cannot be used on Chopsticks unless you account for
 infinite loops.
 """
 
+import argparse
+import json
+import time
+from functools import partial
 from strategy import *
-from typing import Any, Callable
+from typing import Any, Callable, List, Optional, Tuple
 from subtract_square_game import SubtractSquareGame
 from stonehenge import StonehengeGame
+from multi_subtract_square import MultiSubtractSquareGame, grundy_strategy, \
+    load_grundy_numbers, save_grundy_numbers
+from game_log import GameLog, GameRecord
+from pondering import PonderingStrategy
+from solved_cache import SolvedCache, solved_strategy
+from time_control import TimeControl, Clock
 
 # 'h' should map to Stonehenge.
 playable_games = {'s': SubtractSquareGame,
-                  'h': StonehengeGame}
+                  'h': StonehengeGame,
+                  'm': MultiSubtractSquareGame}
+
+# The keyword each game takes for its size (starting total, side length or
+# pile sizes).
+game_size_options = {'s': 'current_total',
+                     'h': 'side_length',
+                     'm': 'piles'}
 
 # 'mr' should map to your recursive implementation of minimax while
 # 'mi' should map to your iterative implementation of minimax
 usable_strategies = {'i': interactive_strategy,
                      'ro': rough_outcome_strategy,
                      'mr': recursive_minimax_strategy,
-                     'mi': iterative_minimax_strategy}
+                     'mi': iterative_minimax_strategy,
+                     'md': depth_limited_minimax_strategy,
+                     'g': grundy_strategy}
+
+# The games each strategy can play.
+strategy_games = {'i': {'s', 'h', 'm'},
+                  'ro': {'s', 'h', 'm'},
+                  'mr': {'s', 'h', 'm'},
+                  'mi': {'s', 'h', 'm'},
+                  'md': {'s', 'h', 'm'},
+                  'g': {'s', 'm'}}
+
+# The strategy option each command-line flag sets.
+strategy_options = {'depth': 'depth',
+                    'time': 'time_limit',
+                    'threads': 'workers',
+                    'cache_size': 'cache_size'}
+
+
+def game_of_state(game: str, state: Any) -> Any:
+    """
+    Return a game of the key game whose current state is state, set up for
+    the size of state.
+
+    >>> state = StonehengeGame(True, 2).current_state.make_move('C')
+    >>> game_of_state('h', state).current_state is state
+    True
+    """
+    option = game_size_options[game]
+    position = playable_games[game](state.p1_turn,
+                                    **{option: getattr(state, option)})
+    position.current_state = state
+    return position
+
+
+def strategies_for(game: str) -> List[str]:
+    """
+    Return the keys of the strategies in usable_strategies that can play
+    the game of key game.
+
+    >>> strategies_for('h')
+    ['i', 'ro', 'mr', 'mi', 'md']
+    """
+    return [key for key in usable_strategies if game in strategy_games[key]]
+
+
+def configure_strategy(strategy: Callable, **options: Any) -> Callable:
+    """
+    Return strategy called with those of options that are not None and that
+    it accepts.
+
+    >>> configure_strategy(rough_outcome_strategy, depth=2) is \\
+    ...     rough_outcome_strategy
+    True
+    >>> configure_strategy(depth_limited_minimax_strategy, depth=2).keywords
+    {'depth': 2}
+    """
+    options = {name: value for name, value in options.items()
+               if value is not None and accepts_option(strategy, name)}
+    return partial(strategy, **options) if options else strategy
+
+
+def print_stats(player: str, stats: SearchStats) -> None:
+    """
+    Print the SearchStats of a move player's strategy searched for.
+    """
+    print("{} searched {}".format(player, stats))
 
 
 class GameInterface:
@@ -29,97 +112,333 @@ class GameInterface:
     """
 
     def __init__(self, game: Any, p1_strategy: Callable,
-                 p2_strategy: Callable[[Any], Any]) -> None:
+                 p2_strategy: Callable[[Any], Any], p1_starts: bool = None,
+                 quiet: bool = False, show_stats: bool = False,
+                 stats_hook: Callable[[str, SearchStats], None] = None,
+                 log: GameLog = None, time_control: TimeControl = None,
+                 **game_options: Any) -> None:
         """
         Initialize this GameInterface, setting its active game to game, and
         using the strategies p1_strategy for Player 1 and p2_strategy for
         Player 2.
 
+        Whether Player 1 moves first is asked for interactively unless
+        p1_starts is given. Any game_options (e.g. side_length or
+        current_total) are passed on to the game, so that the game does not
+        prompt for them either.
+
         :param game: The game to be played.
         :type game:
         :param p1_strategy: The strategy for Player 1.
         :type p1_strategy:
         :param p2_strategy: The strategy for Play 2.
         :type p2_strategy:
+        :param p1_starts: Whether Player 1 makes the first move.
+        :type p1_starts: bool
+        :param quiet: Whether to play without printing anything.
+        :type quiet: bool
+        :param show_stats: Whether to print the SearchStats of every move
+                           made by a strategy that collects them.
+        :type show_stats: bool
+        :param stats_hook: A function called with the player's name and the
+                           SearchStats of every move made by a strategy that
+                           collects them.
+        :type stats_hook: Callable[[str, SearchStats], None]
+        :param log: A GameLog every played game is appended to.
+        :type log: GameLog
+        :param time_control: The time each player has for their moves.
+                             Strategies that take a deadline are given the
+                             end of each move's budget; every player's time
+                             is tracked in self.clocks either way.
+        :type time_control: TimeControl
         """
-        first_player = input("Type y if player 1 is to make the first move: ")
-        is_p1_turn = False
-        if first_player.lower() == 'y':
-            is_p1_turn = True
+        if p1_starts is None:
+            first_player = input(
+                "Type y if player 1 is to make the first move: ")
+            p1_starts = first_player.lower() == 'y'
 
-        self.game = game(is_p1_turn)
+        self.game = game(p1_starts, **game_options)
+        self.log = log
+        self.clocks = {'p1': Clock(time_control), 'p2': Clock(time_control)}
         self.p1_strategy = p1_strategy
         self.p2_strategy = p2_strategy
+        self.quiet = quiet
+        self.stats_hook = stats_hook
+        if show_stats and stats_hook is None:
+            self.stats_hook = print_stats
 
-    def play(self) -> None:
+    def play(self) -> Tuple[Optional[str], list]:
         """
         Play the game.
+
+        Return the winner ('p1', 'p2', or None for a tie) and the list of
+        moves that were made.
         """
         current_state = self.game.current_state
+        first_state = current_state
+        moves_made = []
+        think_times = []
 
-        print(self.game.get_instructions())
-        print(current_state)
+        if not self.quiet:
+            print(self.game.get_instructions())
+            print(current_state)
 
         # Pick moves until the game is over
         while not self.game.is_over(current_state):
             move_to_make = None
 
             # Print out all of the valid moves
-            possible_moves = current_state.get_possible_moves()
-            print("The current available moves are:")
-            for move in possible_moves:
-                print(move)
+            if not self.quiet:
+                possible_moves = current_state.get_possible_moves()
+                print("The current available moves are:")
+                for move in possible_moves:
+                    print(move)
+
+            # Let the waiting player's strategy think on this turn too.
+            waiting_strategy = self.p1_strategy
+            if current_state.get_current_player_name() == 'p1':
+                waiting_strategy = self.p2_strategy
+            if hasattr(waiting_strategy, 'ponder'):
+                waiting_strategy.ponder(self.game)
 
             # Pick a (legal) move.
+            clock = self.clocks[current_state.get_current_player_name()]
+            deadline = clock.start()
             while not current_state.is_valid_move(move_to_make):
                 current_strategy = self.p2_strategy
                 if current_state.get_current_player_name() == 'p1':
                     current_strategy = self.p1_strategy
-                move_to_make = current_strategy(self.game)
+                if deadline.at is not None and \
+                        accepts_option(current_strategy, 'deadline'):
+                    current_strategy = partial(current_strategy,
+                                               deadline=deadline)
+                if self.stats_hook is None:
+                    move_to_make = current_strategy(self.game)
+                else:
+                    move_to_make, stats = search_with_stats(current_strategy,
+                                                            self.game)
+                    if stats is not None:
+                        self.stats_hook(
+                            current_state.get_current_player_name(), stats)
+
+            think_times.append(clock.stop())
 
             # Apply the move
             current_player_name = current_state.get_current_player_name()
             new_game_state = current_state.make_move(move_to_make)
             self.game.current_state = new_game_state
             current_state = self.game.current_state
+            moves_made.append(move_to_make)
 
-            print("{} made the move {}. The game's state is now:".format(
-                current_player_name, move_to_make))
-            print(current_state)
+            if not self.quiet:
+                print("{} made the move {}. The game's state is now:".format(
+                    current_player_name, move_to_make))
+                print(current_state)
+
+        for strategy in (self.p1_strategy, self.p2_strategy):
+            if hasattr(strategy, 'stop'):
+                strategy.stop()
 
         # Print out the winner of the game
+        winner = None
         if self.game.is_winner("p1"):
-            print("Player 1 is the winner!")
+            winner = 'p1'
         elif self.game.is_winner("p2"):
-            print("Player 2 is the winner!")
-        else:
-            print("It's a tie!")
+            winner = 'p2'
+
+        if not self.quiet:
+            if winner == 'p1':
+                print("Player 1 is the winner!")
+            elif winner == 'p2':
+                print("Player 2 is the winner!")
+            else:
+                print("It's a tie!")
+        if self.log is not None:
+            self.log.append(self.record(first_state, winner, moves_made,
+                                        think_times))
+        return winner, moves_made
+
+    def record(self, first_state: Any, winner: Optional[str],
+               moves_made: list, think_times: list) -> GameRecord:
+        """
+        Return the GameRecord of a game of this interface's game played from
+        first_state.
+        """
+        key = [key for key in playable_games
+               if type(self.game) is playable_games[key]][0]
+        return GameRecord(key, getattr(first_state, game_size_options[key]),
+                          first_state.p1_turn, moves_made, winner,
+                          think_times)
 
 
 if __name__ == '__main__':
-    games = ", ".join(["'{}': {}".format(key, playable_games[key].__name__) if
-                       playable_games[key] is not None else
-                       "'{}': None".format(key) for key in playable_games])
+    parser = argparse.ArgumentParser(
+        description="Play a two-player game. Anything not given as a flag "
+                    "is asked for interactively.")
+    parser.add_argument('--profile', metavar='OUTPUT',
+                        help="play a game without prompts under a profiler "
+                             "and write its collapsed stacks to OUTPUT")
+    parser.add_argument('--profiler', choices=['sample', 'trace'],
+                        default='sample')
+    parser.add_argument('--interval', type=float, default=0.001,
+                        help="seconds between samples of the sample profiler")
+    parser.add_argument('--game', choices=list(playable_games))
+    parser.add_argument('--p1', choices=list(usable_strategies))
+    parser.add_argument('--p2', choices=list(usable_strategies))
+    parser.add_argument('--first', choices=['p1', 'p2'])
+    parser.add_argument('--size', type=int,
+                        help="the side length or starting total of the game")
+    parser.add_argument('--piles', type=int, nargs='+', metavar='SIZE',
+                        help="the pile sizes of a game of 'm'")
+    parser.add_argument('--depth', type=int,
+                        help="how many moves ahead 'md' looks")
+    parser.add_argument('--time', type=float, metavar='SECONDS',
+                        help="deepen 'md' searches until a search ends after "
+                             "SECONDS")
+    parser.add_argument('--threads', type=int,
+                        help="worker processes that split the moves of "
+                             "'mr' and 'md' searches")
+    parser.add_argument('--cache-size', type=int, metavar='POSITIONS',
+                        help="positions whose scores 'mr' and 'md' "
+                             "searches cache")
+    parser.add_argument('--move-time', type=float, metavar='SECONDS',
+                        help="the most time a strategy may take per move")
+    parser.add_argument('--time-control', metavar='TOTAL[+INCREMENT]',
+                        help="each player's seconds for the game and the "
+                             "seconds added after each of their moves")
+    parser.add_argument('--ponder', action='store_true',
+                        help="let strategies search during the opponent's "
+                             "turn")
+    parser.add_argument('--json', action='store_true',
+                        help="play quietly and print the result as JSON")
+    parser.add_argument('--log', metavar='PATH',
+                        help="append the played game to the game log at PATH")
+    parser.add_argument('--solved', metavar='PATH',
+                        help="answer from and add to the solved positions "
+                             "in the database at PATH")
+    parser.add_argument('--grundy', metavar='PATH',
+                        help="use and add to the Grundy numbers of Subtract "
+                             "Square piles saved at PATH")
+    args = parser.parse_args()
+    for player in (args.p1, args.p2):
+        if None not in (args.game, player) and \
+                args.game not in strategy_games[player]:
+            parser.error("'{}' cannot play '{}'".format(player, args.game))
+
+    def game_size(game: str) -> Any:
+        """
+        Return the size given for a game of the key game, or None, refusing
+        a size given by the wrong flag.
+        """
+        if game == 'm':
+            if args.size is not None:
+                parser.error("--size cannot set up 'm', use --piles")
+            return args.piles
+        if args.piles is not None:
+            parser.error("--piles can only set up 'm'")
+        return args.size
+
+    if args.game is not None:
+        game_size(args.game)
+    options = {option: getattr(args, flag)
+               for flag, option in strategy_options.items()}
+
+    def make_strategy(key: str) -> Callable:
+        """
+        Return the strategy of key set up as the flags ask.
+        """
+        strategy = configure_strategy(usable_strategies[key], **options)
+        name = '{}:{}'.format(
+            key, sorted(getattr(strategy, 'keywords', {}).items()))
+        if solved is not None and key != 'i' and \
+                accepts_option(strategy, 'stats'):
+            strategy = solved_strategy(strategy, solved)
+        if args.ponder and key != 'i':
+            strategy = PonderingStrategy(strategy, name)
+        return strategy
+    solved = SolvedCache(args.solved) if args.solved else None
+    game_log = GameLog(args.log) if args.log else None
+    if args.grundy:
+        load_grundy_numbers(args.grundy)
+    time_control = None
+    if args.time_control:
+        time_control = TimeControl.parse(args.time_control, args.move_time)
+    elif args.move_time is not None:
+        time_control = TimeControl(per_move=args.move_time)
+
+    if args.profile:
+        if None in (args.game, args.p1, args.p2) or \
+                game_size(args.game) is None:
+            parser.error("--profile needs --game, --p1, --p2 and --size, "
+                         "or --piles for 'm'")
+        if 'i' in (args.p1, args.p2):
+            parser.error("--profile cannot play the interactive strategy")
+        from profiling import profile_call
+        interface = GameInterface(
+            playable_games[args.game],
+            make_strategy(args.p1), make_strategy(args.p2),
+            p1_starts=args.first != 'p2', quiet=True, log=game_log,
+            time_control=time_control,
+            **{game_size_options[args.game]: game_size(args.game)})
+        (winner, moves), profiler = profile_call(interface.play,
+                                                 args.profiler, args.interval)
+        profiler.write_collapsed(args.profile)
+        print("Winner: {}, moves: {}".format(winner, moves))
+        for function, share in profiler.engine_summary():
+            print("{:>24} {:6.1%}".format(function, share))
+    else:
+        games = ", ".join(["'{}': {}".format(key,
+                                             playable_games[key].__name__)
+                           if playable_games[key] is not None else
+                           "'{}': None".format(key) for key in playable_games])
 
-    strategies = ", ".join(["'{}': {}".format(key,
-                                              usable_strategies[key].__name__)
-                            if usable_strategies[key] is not None else
-                            "'{}': None".format(key)
-                            for key in usable_strategies])
+        chosen_game = args.game or ''
+        while chosen_game not in playable_games.keys():
+            chosen_game = input(
+                "Select the game you want to play ({}): ".format(games))
 
-    chosen_game = ''
-    while chosen_game not in playable_games.keys():
-        chosen_game = input(
-            "Select the game you want to play ({}): ".format(games))
+        strategies = ", ".join(["'{}': {}".format(
+            key, usable_strategies[key].__name__)
+                                if usable_strategies[key] is not None else
+                                "'{}': None".format(key)
+                                for key in strategies_for(chosen_game)])
 
-    p1 = ''
-    p2 = ''
+        p1 = args.p1 or ''
+        p2 = args.p2 or ''
 
-    while p1 not in usable_strategies.keys():
-        p1 = input("Select the strategy for Player 1 ({}): ".format(strategies))
+        while p1 not in strategies_for(chosen_game):
+            p1 = input("Select the strategy for Player 1 ({}): ".format(
+                strategies))
 
-    while p2 not in usable_strategies.keys():
-        p2 = input("Select the strategy for Player 2 ({}): ".format(strategies))
+        while p2 not in strategies_for(chosen_game):
+            p2 = input("Select the strategy for Player 2 ({}): ".format(
+                strategies))
 
-    GameInterface(playable_games[chosen_game], usable_strategies[p1],
-                  usable_strategies[p2]).play()
+        game_options = {}
+        size = game_size(chosen_game)
+        if size is not None:
+            game_options[game_size_options[chosen_game]] = size
+        interface = GameInterface(
+            playable_games[chosen_game],
+            make_strategy(p1), make_strategy(p2),
+            p1_starts=None if args.first is None else args.first == 'p1',
+            quiet=args.json, log=game_log, time_control=time_control,
+            **game_options)
+        first_state = interface.game.current_state
+        start = time.perf_counter()
+        winner, moves = interface.play()
+        if args.json:
+            print(json.dumps({
+                'game': chosen_game, 'p1': p1, 'p2': p2,
+                'size': getattr(first_state, game_size_options[chosen_game]),
+                'first': 'p1' if first_state.p1_turn else 'p2',
+                'winner': winner, 'moves': moves,
+                'clocks': {player: clock.as_dict()
+                           for player, clock in interface.clocks.items()},
+                'elapsed': time.perf_counter() - start}))
+    if game_log is not None:
+        game_log.close()
+    if solved is not None:
+        solved.close()
+    if args.grundy:
+        save_grundy_numbers(args.grundy)
@@ -0,0 +1,244 @@
+"""
+An append-only binary log of played games.
+
+A log file starts with MAGIC and is followed by one record per game:
+    length - 4 bytes, little-endian, of the body
+    body - the game key (1 byte), the size (varint), whether Player 1
+           started (1 byte), the number of moves (varint), the moves, the
+           winner (1 byte: 0 for a tie, 1 for Player 1, 2 for Player 2)
+           and one little-endian float32 think time per move, in seconds
+    crc - 4 bytes, little-endian, the CRC-32 of the body
+
+Stonehenge moves are one ASCII byte each and Subtract Square moves are
+varints. For Subtract Square with several piles, the size is the number of
+piles and then every pile's size, and a move is its pile and its square,
+all varints. Records are only ever appended, so a crash can at worst leave a
+truncated last record, which readers ignore.
+"""
+import mmap
+import os
+import struct
+import zlib
+from typing import Any, Iterator, List, Optional
+from codec import encode_varint, decode_varint
+
+MAGIC = b'GLOG\x01'
+WINNER_CODES = {None: 0, 'p1': 1, 'p2': 2}
+WINNERS = {code: winner for winner, code in WINNER_CODES.items()}
+# Games whose moves are single letters rather than numbers.
+LETTER_MOVE_GAMES = {'h'}
+# Games whose size is a tuple of pile sizes and whose moves are (pile,
+# square) pairs.
+PILE_GAMES = {'m'}
+
+
+class GameRecord:
+    """
+    One played game.
+
+    game - the key of the game in playable_games
+    size - the side length, starting total or pile sizes of the game
+    p1_starts - whether Player 1 made the first move
+    moves - the moves made, in order
+    winner - 'p1', 'p2', or None for a tie
+    think_times - the seconds each move took to choose
+    """
+    game: str
+    size: Any
+    p1_starts: bool
+    moves: list
+    winner: Optional[str]
+    think_times: List[float]
+
+    def __init__(self, game: str, size: Any, p1_starts: bool, moves: list,
+                 winner: Optional[str], think_times: List[float]) -> None:
+        """
+        Create a new GameRecord.
+        """
+        self.game = game
+        self.size = size
+        self.p1_starts = p1_starts
+        self.moves = moves
+        self.winner = winner
+        self.think_times = think_times
+
+    def __repr__(self) -> str:
+        """
+        Return a representation of this GameRecord.
+        """
+        return 'GameRecord({!r}, {}, {}, {!r}, {!r}, {})'.format(
+            self.game, self.size, self.p1_starts, self.moves, self.winner,
+            [round(t, 6) for t in self.think_times])
+
+    def to_bytes(self) -> bytes:
+        """
+        Return the body of this record.
+
+        >>> GameRecord('s', 5, True, [4, 1], 'p2', [0, 0]).to_bytes().hex()
+        '730501020401020000000000000000'
+        """
+        if len(self.think_times) != len(self.moves):
+            raise ValueError('Every move needs a think time')
+        body = bytearray(self.game.encode('ascii'))
+        if self.game in PILE_GAMES:
+            body += encode_varint(len(self.size))
+            for pile in self.size:
+                body += encode_varint(pile)
+        else:
+            body += encode_varint(self.size)
+        body.append(1 if self.p1_starts else 0)
+        body += encode_varint(len(self.moves))
+        for move in self.moves:
+            if self.game in LETTER_MOVE_GAMES:
+                body += move.encode('ascii')
+            elif self.game in PILE_GAMES:
+                body += encode_varint(move[0]) + encode_varint(move[1])
+            else:
+                body += encode_varint(move)
+        body.append(WINNER_CODES[self.winner])
+        body += struct.pack('<{}f'.format(len(self.moves)), *self.think_times)
+        return bytes(body)
+
+    @classmethod
+    def from_bytes(cls, body: Any) -> 'GameRecord':
+        """
+        Return the GameRecord whose body is body.
+
+        >>> record = GameRecord('h', 2, False, ['A', 'G'], 'p1', [0.5, 0.25])
+        >>> GameRecord.from_bytes(record.to_bytes())
+        GameRecord('h', 2, False, ['A', 'G'], 'p1', [0.5, 0.25])
+        >>> record = GameRecord('m', (3, 4), True, [(2, 4)], None, [0.5])
+        >>> GameRecord.from_bytes(record.to_bytes())
+        GameRecord('m', (3, 4), True, [(2, 4)], None, [0.5])
+        """
+        game = chr(body[0])
+        size, offset = decode_varint(body, 1)
+        if game in PILE_GAMES:
+            piles = []
+            for _ in range(size):
+                pile, offset = decode_varint(body, offset)
+                piles.append(pile)
+            size = tuple(piles)
+        p1_starts = body[offset] == 1
+        count, offset = decode_varint(body, offset + 1)
+        moves = []
+        for _ in range(count):
+            if game in LETTER_MOVE_GAMES:
+                moves.append(chr(body[offset]))
+                offset += 1
+            elif game in PILE_GAMES:
+                pile, offset = decode_varint(body, offset)
+                square, offset = decode_varint(body, offset)
+                moves.append((pile, square))
+            else:
+                move, offset = decode_varint(body, offset)
+                moves.append(move)
+        winner = WINNERS[body[offset]]
+        think_times = list(struct.unpack_from('<{}f'.format(count), body,
+                                              offset + 1))
+        return cls(game, size, p1_starts, moves, winner, think_times)
+
+
+class GameLog:
+    """
+    A game log open for appending.
+
+    path - the path of the log file
+    """
+    path: str
+
+    def __init__(self, path: str) -> None:
+        """
+        Open the log at path for appending, creating it if needed.
+        """
+        self.path = path
+        self._file = open(path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+            self._file.flush()
+
+    def append(self, record: GameRecord) -> None:
+        """
+        Append record to this log and flush it to the operating system.
+        """
+        body = record.to_bytes()
+        self._file.write(struct.pack('<I', len(body)) + body +
+                         struct.pack('<I', zlib.crc32(body)))
+        self._file.flush()
+
+    def close(self) -> None:
+        """
+        Close this log.
+        """
+        self._file.close()
+
+    def __enter__(self) -> 'GameLog':
+        """
+        Return this log.
+        """
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """
+        Close this log.
+        """
+        self.close()
+
+
+def read_log(path: str) -> Iterator[GameRecord]:
+    """
+    Yield every complete record of the log at path, in order, reading the
+    file through a memory map rather than loading it.
+    """
+    if os.path.getsize(path) <= len(MAGIC):
+        return
+    with open(path, 'rb') as log_file, \
+            mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError('{} is not a game log'.format(path))
+        view = memoryview(data)
+        try:
+            offset = len(MAGIC)
+            while offset + 4 <= len(data):
+                length = struct.unpack_from('<I', data, offset)[0]
+                end = offset + 4 + length + 4
+                if end > len(data):
+                    break
+                # The slice is released before the record is yielded, so
+                # that the map can be closed whenever iteration stops.
+                with view[offset + 4:offset + 4 + length] as body:
+                    if struct.unpack_from('<I', data, end - 4)[0] != \
+                            zlib.crc32(body):
+                        raise ValueError('Corrupt record at byte {} of '
+                                         '{}'.format(offset, path))
+                    record = GameRecord.from_bytes(body)
+                yield record
+                offset = end
+        finally:
+            view.release()
+
+
+def replay(record: GameRecord) -> Any:
+    """
+    Return the game of record with every move of record made, checking that
+    each move is legal and that the winner matches.
+    """
+    from game_interface import playable_games, game_size_options
+    game = playable_games[record.game](
+        record.p1_starts, **{game_size_options[record.game]: record.size})
+    for move in record.moves:
+        if not game.current_state.is_valid_move(move):
+            raise ValueError('{!r} is not a legal move in\n{}'.format(
+                move, game.current_state))
+        game.current_state = game.current_state.make_move(move)
+    winner = 'p1' if game.is_winner('p1') else \
+        'p2' if game.is_winner('p2') else None
+    if winner != record.winner:
+        raise ValueError('The game was won by {}, not {}'.format(
+            winner, record.winner))
+    return game
+
+
+if __name__ == "__main__":
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
@@ -0,0 +1,77 @@
+"""
+Unittests for the append-only game log.
+"""
+import os
+import tempfile
+import unittest
+
+from game_interface import playable_games, usable_strategies, GameInterface
+from game_log import GameLog, GameRecord, read_log, replay
+
+
+class GameLogUnitTests(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'games.log')
+
+    def test_played_games_replay(self):
+        """
+        Test that games played through GameInterface, including games of
+        several piles, are logged in order and replay to the logged winner.
+        """
+        with GameLog(self.path) as log:
+            results = []
+            for game, option, p1_starts, p2 in [
+                    ('h', {'side_length': 2}, True, 'mi'),
+                    ('s', {'current_total': 20}, False, 'mi'),
+                    ('m', {'piles': [3, 4]}, True, 'g')]:
+                results.append(GameInterface(
+                    playable_games[game], usable_strategies['ro'],
+                    usable_strategies[p2], p1_starts=p1_starts, quiet=True,
+                    log=log, **option).play())
+        records = list(read_log(self.path))
+        self.assertEqual([(r.game, r.size, r.p1_starts) for r in records],
+                         [('h', 2, True), ('s', 20, False),
+                          ('m', (3, 4), True)])
+        for record, (winner, moves) in zip(records, results):
+            self.assertEqual(record.moves, moves)
+            self.assertEqual(record.winner, winner)
+            self.assertEqual(len(record.think_times), len(moves))
+            replay(record)
+
+    def test_truncated_record_ignored(self):
+        """
+        Test that a partly written last record is skipped and that appending
+        to a log keeps its earlier records.
+        """
+        record = GameRecord('s', 5, True, [4, 1], 'p2', [0.5, 0.25])
+        with GameLog(self.path) as log:
+            log.append(record)
+        with GameLog(self.path) as log:
+            log.append(record)
+        with open(self.path, 'ab') as log_file:
+            log_file.write(b'\x10\x00\x00\x00s')
+        records = list(read_log(self.path))
+        self.assertEqual([repr(r) for r in records], [repr(record)] * 2)
+
+    def test_stop_reading_early(self):
+        """
+        Test that a log can be left part way through, by break or by closing
+        the generator, without an error.
+        """
+        with GameLog(self.path) as log:
+            for total in range(5, 8):
+                log.append(GameRecord('s', total, True, [1], 'p1', [0.5]))
+        for record in read_log(self.path):
+            break
+        self.assertEqual(record.size, 5)
+        records = read_log(self.path)
+        self.assertEqual(next(records).size, 5)
+        self.assertEqual(next(records).size, 6)
+        records.close()
+        self.assertEqual(len(list(read_log(self.path))), 3)
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
@@ -0,0 +1,424 @@
+"""
+An asyncio server that hosts many matches at once over TCP.
+
+Clients send one JSON object per line and get one JSON line back per
+request, with the request's "id" echoed if it had one. Requests:
+    {"op": "new", "game": "h", "size": 3, "p1": "human", "p2": "mi",
+     "first": "p1", "options": {"depth": 4}}
+        start a match; each player is "human" or a key of
+        usable_strategies other than 'i' that plays the game, and the size of a game of 'm' is
+        a list of pile sizes
+    {"op": "move", "match": 1, "move": "A"} - make a human player's move
+    {"op": "state", "match": 1} - get a match's state
+    {"op": "watch", "match": 1} - get the events of a match
+    {"op": "close", "match": 1} - end a match
+    {"op": "metrics"} - get the hit counts of the strategy cache
+Failed requests are answered with {"ok": false, "error": ...}. The
+connection that starts or watches a match is sent an
+{"event": "move", ...} line for every move made in it. A match is dropped
+once it is over with no one watching, or when the last connection watching
+it closes.
+
+Strategy calls run in a pool of worker processes, so a slow search in one
+match never holds up the others. With a StrategyCache, matches that reach
+the same position share one strategy call.
+
+Example:
+    python game_server.py --port 8765 --workers 4 --cache-size 100000
+"""
+import argparse
+import asyncio
+import json
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Awaitable, Dict, List, Optional
+from analyze import make_game
+from codec import encode_state
+from game_interface import playable_games, usable_strategies, \
+    game_size_options, strategy_games, configure_strategy
+from strategy_cache import StrategyCache
+
+HUMAN = 'human'
+# The strategy options clients may set. workers is left out because the
+# strategies already run in worker processes.
+SERVER_OPTIONS = ['depth', 'time_limit', 'cache_size']
+
+
+def choose_move(game: str, data: bytes, strategy: str,
+                options: Dict[str, Any]) -> Any:
+    """
+    Return the move strategy picks with options in the position of game
+    encoded in data. This runs in a worker process.
+    """
+    return configure_strategy(usable_strategies[strategy], **options)(
+        make_game(game, data))
+
+
+class Match:
+    """
+    A match hosted by a GameServer.
+
+    match_id - the number the match is known by
+    key - the key of the game in playable_games
+    game - the game being played
+    players - 'human' or a strategy key for 'p1' and 'p2'
+    options - the strategy options of the match
+    moves - the moves made so far
+    watchers - the writers of the connections sent the match's events
+    lock - held while a move is made
+    task - the task making the strategies' moves, if any
+    """
+    match_id: int
+    key: str
+    game: Any
+    players: Dict[str, str]
+    options: Dict[str, Any]
+    moves: list
+    watchers: set
+    lock: asyncio.Lock
+    task: Optional[asyncio.Task]
+
+    def __init__(self, match_id: int, key: str, game: Any,
+                 players: Dict[str, str], options: Dict[str, Any]) -> None:
+        """
+        Create a new Match with no moves made.
+        """
+        self.match_id = match_id
+        self.key = key
+        self.game = game
+        self.players = players
+        self.options = options
+        self.moves = []
+        self.watchers = set()
+        self.lock = asyncio.Lock()
+        self.task = None
+
+    def to_move(self) -> str:
+        """
+        Return the name of the player whose turn it is.
+        """
+        return self.game.current_state.get_current_player_name()
+
+    def is_over(self) -> bool:
+        """
+        Return whether this match is over.
+        """
+        return self.game.is_over(self.game.current_state)
+
+    def winner(self) -> Optional[str]:
+        """
+        Return the winner of this match, or None if there is none (yet).
+        """
+        if not self.is_over():
+            return None
+        if self.game.is_winner('p1'):
+            return 'p1'
+        return 'p2' if self.game.is_winner('p2') else None
+
+    def describe(self) -> Dict[str, Any]:
+        """
+        Return the state of this match as a JSON-serializable dictionary.
+        """
+        state = self.game.current_state
+        over = self.is_over()
+        return {'match': self.match_id, 'game': self.key,
+                'players': self.players, 'board': str(state),
+                'position': encode_state(state).hex(), 'moves': self.moves,
+                'to_move': None if over else self.to_move(),
+                'legal': [] if over else state.get_possible_moves(),
+                'over': over, 'winner': self.winner()}
+
+
+class GameServer:
+    """
+    A server of many concurrent matches.
+
+    matches - the matches being played, by number
+    executor - where strategy calls run
+    cache - the cache of strategy moves, or None
+    """
+    matches: Dict[int, Match]
+    executor: Executor
+    cache: Optional[StrategyCache]
+
+    def __init__(self, executor: Executor = None, workers: int = None,
+                 cache: StrategyCache = None) -> None:
+        """
+        Create a new GameServer whose strategies run in executor, or in a
+        new pool of workers processes, with their moves kept in cache.
+        """
+        self.matches = {}
+        self.cache = cache
+        self._own_executor = executor is None
+        self.executor = executor or ProcessPoolExecutor(max_workers=workers)
+        self._next_id = 1
+
+    async def start(self, host: str = '127.0.0.1',
+                    port: int = 0) -> asyncio.AbstractServer:
+        """
+        Return a listening asyncio server for this GameServer.
+        """
+        return await asyncio.start_server(self.handle, host, port)
+
+    def close(self) -> None:
+        """
+        Cancel every running strategy task and shut down the executor if
+        this server created it.
+        """
+        for match in self.matches.values():
+            if match.task is not None:
+                match.task.cancel()
+        if self._own_executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def handle(self, reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter) -> None:
+        """
+        Answer the requests of one connection until it closes.
+        """
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                request = {}
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        request = {}
+                        raise ValueError('A request must be a JSON object')
+                    response = await self.dispatch(request, writer)
+                except (KeyError, TypeError, ValueError) as error:
+                    response = {'ok': False, 'error': str(error)}
+                except Exception as error:  # pylint: disable=broad-except
+                    response = {'ok': False, 'error': '{}: {}'.format(
+                        type(error).__name__, error)}
+                if 'id' in request:
+                    response['id'] = request['id']
+                await self.send(writer, response)
+        except ConnectionError:
+            pass
+        finally:
+            for match in list(self.matches.values()):
+                if writer in match.watchers:
+                    match.watchers.discard(writer)
+                    if not match.watchers:
+                        self.reap(match)
+            writer.close()
+
+    def reap(self, match: Match) -> None:
+        """
+        Stop the strategies of match and drop it.
+        """
+        if match.task is not None and \
+                match.task is not asyncio.current_task():
+            match.task.cancel()
+        self.matches.pop(match.match_id, None)
+
+    def reap_if_done(self, match: Match) -> None:
+        """
+        Drop match if it is over and no connection watches it.
+        """
+        if match.is_over() and not match.watchers:
+            self.reap(match)
+
+    async def send(self, writer: asyncio.StreamWriter,
+                   message: Dict[str, Any]) -> None:
+        """
+        Send message to the connection of writer as a JSON line.
+        """
+        if writer.is_closing():
+            return
+        writer.write(json.dumps(message).encode() + b'\n')
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def dispatch(self, request: Dict[str, Any],
+                       writer: asyncio.StreamWriter) -> Dict[str, Any]:
+        """
+        Return the response to request, sent by the connection of writer.
+        """
+        op = request.get('op')
+        if op == 'metrics':
+            return {'ok': True, 'cache': None if self.cache is None else
+                    self.cache.metrics()}
+        if op == 'new':
+            match = self.new_match(request)
+            match.watchers.add(writer)
+            self.advance(match)
+            return dict(match.describe(), ok=True)
+        match = self.matches.get(request.get('match'))
+        if match is None:
+            raise ValueError('No match {!r}'.format(request.get('match')))
+        if op == 'move':
+            async with match.lock:
+                self.make_move(match, request.get('move'), human=True)
+            await self.broadcast(match, match.moves[-1])
+            self.advance(match)
+            self.reap_if_done(match)
+            return dict(match.describe(), ok=True)
+        if op == 'state':
+            return dict(match.describe(), ok=True)
+        if op == 'watch':
+            match.watchers.add(writer)
+            return dict(match.describe(), ok=True)
+        if op == 'close':
+            self.reap(match)
+            return {'ok': True, 'match': match.match_id}
+        raise ValueError('Unknown op {!r}'.format(op))
+
+    def new_match(self, request: Dict[str, Any]) -> Match:
+        """
+        Return a new Match set up as request asks.
+        """
+        key = request.get('game')
+        if key not in playable_games:
+            raise ValueError('Unknown game {!r}'.format(key))
+        players = {'p1': request.get('p1', HUMAN),
+                   'p2': request.get('p2', HUMAN)}
+        for player in players.values():
+            if player != HUMAN and (player not in usable_strategies or
+                                    player == 'i'):
+                raise ValueError('Unknown player {!r}'.format(player))
+            if player != HUMAN and key not in strategy_games[player]:
+                raise ValueError('{!r} cannot play {!r}'.format(player, key))
+        options = dict(request.get('options') or {})
+        for name, value in options.items():
+            if name not in SERVER_OPTIONS:
+                raise ValueError('Unknown option {!r}'.format(name))
+            if value is not None and (isinstance(value, bool) or
+                                      not isinstance(value, (int, float))):
+                raise ValueError('Option {!r} must be a number, not '
+                                 '{!r}'.format(name, value))
+        if request.get('first', 'p1') not in ('p1', 'p2'):
+            raise ValueError("first must be 'p1' or 'p2'")
+        size = request['size']
+        size = [int(pile) for pile in size] if isinstance(size, list) \
+            else int(size)
+        game = playable_games[key](request.get('first', 'p1') == 'p1', **{
+            game_size_options[key]: size})
+        match = Match(self._next_id, key, game, players, options)
+        self.matches[match.match_id] = match
+        self._next_id += 1
+        return match
+
+    def make_move(self, match: Match, move: Any, human: bool) -> None:
+        """
+        Make move in match for the player to move, who must be human if
+        human is true.
+        """
+        if match.is_over():
+            raise ValueError('Match {} is over'.format(match.match_id))
+        player = match.to_move()
+        if human and match.players[player] != HUMAN:
+            raise ValueError("It is not a human player's turn")
+        if human:
+            move = match.game.str_to_move(str(move))
+        if not match.game.current_state.is_valid_move(move):
+            raise ValueError('{!r} is not a legal move'.format(move))
+        match.game.current_state = match.game.current_state.make_move(move)
+        match.moves.append(move)
+
+    async def broadcast(self, match: Match, move: Any) -> None:
+        """
+        Send the event of move, just made in match, to its watchers.
+        """
+        event = dict(match.describe(), event='move', move=move)
+        await asyncio.gather(*[self.send(writer, event)
+                               for writer in list(match.watchers)])
+
+    def advance(self, match: Match) -> None:
+        """
+        Start the strategies of match moving, unless they already are.
+        """
+        if match.task is None or match.task.done():
+            match.task = asyncio.get_running_loop().create_task(
+                self.play_strategies(match))
+
+    async def play_strategies(self, match: Match) -> None:
+        """
+        Make the strategies' moves in match until it is over or a human
+        player is to move. An error of a strategy is sent to the watchers of
+        match as an {"event": "error"} line.
+        """
+        while not match.is_over() and \
+                match.players[match.to_move()] != HUMAN:
+            try:
+                move = await self.strategy_move(match)
+                async with match.lock:
+                    self.make_move(match, move, human=False)
+            except Exception as error:  # pylint: disable=broad-except
+                event = {'event': 'error', 'match': match.match_id,
+                         'error': '{}: {}'.format(type(error).__name__,
+                                                  error)}
+                await asyncio.gather(*[self.send(writer, event)
+                                       for writer in list(match.watchers)])
+                return
+            await self.broadcast(match, move)
+        self.reap_if_done(match)
+
+    async def strategy_move(self, match: Match) -> Any:
+        """
+        Return the move the strategy to move in match picks, from the cache
+        if it is kept there.
+        """
+        state = match.game.current_state
+        strategy = match.players[match.to_move()]
+
+        def compute() -> Awaitable:
+            """
+            Return a future of the move, computed in the executor.
+            """
+            return asyncio.get_running_loop().run_in_executor(
+                self.executor, choose_move, match.key, encode_state(state),
+                strategy, match.options)
+        if self.cache is None:
+            return await compute()
+        return await self.cache.get_or_compute_async(
+            self.cache.key(state, strategy, match.options), compute)
+
+
+def main(argv: List[str] = None) -> None:
+    """
+    Serve matches from the command line until interrupted.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int,
+                        help='processes that run strategies')
+    parser.add_argument('--cache-size', type=int, default=0,
+                        metavar='MOVES',
+                        help='strategy moves to cache (0 for no cache)')
+    parser.add_argument('--cache-ttl', type=float, metavar='SECONDS',
+                        help='how long a cached move is kept')
+    args = parser.parse_args(argv)
+
+    async def serve() -> None:
+        """
+        Serve until cancelled.
+        """
+        cache = None
+        if args.cache_size:
+            cache = StrategyCache(args.cache_size, args.cache_ttl)
+        game_server = GameServer(workers=args.workers, cache=cache)
+        server = await game_server.start(args.host, args.port)
+        print('Serving on {}'.format(', '.join(
+            str(sock.getsockname()) for sock in server.sockets)))
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            game_server.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
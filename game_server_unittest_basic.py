@@ -0,0 +1,226 @@
+"""
+Unittests for the asyncio game server.
+"""
+import asyncio
+import json
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from game_server import GameServer
+from strategy_cache import StrategyCache
+
+
+class Client:
+    """
+    A test connection to a GameServer that sends requests and reads the
+    lines sent back.
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    async def send(self, **request):
+        self.writer.write(json.dumps(request).encode() + b'\n')
+        await self.writer.drain()
+
+    async def receive(self):
+        line = await asyncio.wait_for(self.reader.readline(), 30)
+        return json.loads(line)
+
+    async def response(self, **request):
+        """
+        Send request and return its response, skipping events.
+        """
+        await self.send(**request)
+        while True:
+            message = await self.receive()
+            if 'event' not in message:
+                return message
+
+
+class GameServerUnitTests(unittest.TestCase):
+    def run_with_server(self, test, cache=None, processes=False):
+        async def run():
+            executor = None if processes else ThreadPoolExecutor(max_workers=4)
+            game_server = GameServer(executor, workers=2, cache=cache)
+            self.game_server = game_server
+            server = await game_server.start()
+            port = server.sockets[0].getsockname()[1]
+            try:
+                async with server:
+                    await test(lambda: asyncio.open_connection(
+                        '127.0.0.1', port))
+            finally:
+                game_server.close()
+        asyncio.run(run())
+
+    def test_human_against_strategy(self):
+        """
+        Test that a human move is answered by the strategy's move as an
+        event, and that illegal moves and turns are refused.
+        """
+        async def test(connect):
+            client = Client(*await connect())
+            match = await client.response(op='new', game='s', size=20,
+                                          p1='human', p2='mr', id=7)
+            self.assertTrue(match['ok'])
+            self.assertEqual(match['id'], 7)
+            self.assertEqual(match['to_move'], 'p1')
+            refused = await client.response(op='move', match=match['match'],
+                                            move=3)
+            self.assertFalse(refused['ok'])
+            moved = await client.response(op='move', match=match['match'],
+                                          move=1)
+            self.assertEqual(moved['moves'], [1])
+            event = await client.receive()
+            while len(event['moves']) < 2:
+                event = await client.receive()
+            self.assertEqual(event['event'], 'move')
+            self.assertEqual(event['moves'][1], event['move'])
+            self.assertEqual(event['to_move'], 'p1')
+            reply = await client.response(op='move', match=match['match'],
+                                          move=event['legal'][0], id=8)
+            self.assertEqual(reply['id'], 8)
+            self.assertTrue(reply['ok'])
+        self.run_with_server(test)
+
+    def test_concurrent_strategy_matches(self):
+        """
+        Test that several strategy-only matches on different connections
+        all play to the end.
+        """
+        async def play(connect, size):
+            client = Client(*await connect())
+            match = await client.response(op='new', game='h', size=size,
+                                          p1='ro', p2='md',
+                                          options={'depth': 2})
+            event = match
+            while not event['over']:
+                event = await client.receive()
+            state = await client.response(op='state', match=match['match'])
+            self.assertTrue(state['over'])
+            self.assertIn(state['winner'], ('p1', 'p2'))
+            self.assertEqual(state['moves'], event['moves'])
+
+        async def test(connect):
+            await asyncio.gather(*[play(connect, size)
+                                   for size in (1, 2, 2, 3)])
+        self.run_with_server(test)
+
+    def test_matches_share_cached_moves(self):
+        """
+        Test that identical matches share the strategy moves of the cache.
+        """
+        async def play(connect):
+            client = Client(*await connect())
+            match = await client.response(op='new', game='s', size=40,
+                                          p1='md', p2='md',
+                                          options={'depth': 3})
+            event = match
+            while not event['over']:
+                event = await client.receive()
+            return event['moves']
+
+        async def test(connect):
+            games = await asyncio.gather(*[play(connect) for _ in range(4)])
+            self.assertEqual(games, [games[0]] * 4)
+            client = Client(*await connect())
+            metrics = (await client.response(op='metrics'))['cache']
+            self.assertEqual(metrics['misses'], len(games[0]))
+            self.assertEqual(metrics['hits'] + metrics['coalesced'],
+                             3 * len(games[0]))
+        self.run_with_server(test, StrategyCache())
+
+    def test_match_in_worker_processes(self):
+        """
+        Test that a strategy-only match plays to the end with its moves
+        chosen in the server's own pool of worker processes.
+        """
+        async def test(connect):
+            client = Client(*await connect())
+            match = await client.response(op='new', game='h', size=2,
+                                          p1='md', p2='ro',
+                                          options={'depth': 2})
+            event = match
+            while not event['over']:
+                event = await client.receive()
+            self.assertIn(event['winner'], ('p1', 'p2'))
+            metrics = (await client.response(op='metrics'))['cache']
+            self.assertEqual(metrics['misses'], len(event['moves']))
+        self.run_with_server(test, StrategyCache(), processes=True)
+
+    def test_bad_requests(self):
+        """
+        Test that malformed requests are answered with errors without
+        closing the connection.
+        """
+        async def test(connect):
+            client = Client(*await connect())
+            client.writer.write(b'not json\n')
+            self.assertFalse((await client.receive())['ok'])
+            for request in [{'op': 'move', 'match': 99, 'move': 'A'},
+                            {'op': 'new', 'game': 'x', 'size': 2},
+                            {'op': 'new', 'game': 'h', 'size': 2,
+                             'p1': 'i'},
+                            {'op': 'new', 'game': 'h', 'size': 2,
+                             'p1': 'g'},
+                            {'op': 'new', 'game': 'h', 'size': 2,
+                             'options': {'workers': 4}},
+                            {'op': 'new', 'game': 'h', 'size': 2,
+                             'p2': 'md', 'options': {'depth': [2]}},
+                            {'op': 'new', 'game': 'h', 'size': 2,
+                             'p2': 'md', 'options': {'depth': '2'}}]:
+                self.assertFalse((await client.response(**request))['ok'])
+            state = await client.response(op='new', game='h', size=1)
+            self.assertTrue(state['ok'])
+
+            match = await client.response(op='new', game='m', size=[3, 4])
+            with patch.object(GameServer, 'make_move',
+                              side_effect=AttributeError('no piles')):
+                failed = await client.response(op='move',
+                                               match=match['match'],
+                                               move='1:1')
+            self.assertFalse(failed['ok'])
+            self.assertEqual(failed['error'], 'AttributeError: no piles')
+            state = await client.response(op='move', match=match['match'],
+                                          move='1:1')
+            self.assertTrue(state['ok'])
+        self.run_with_server(test)
+
+    def test_matches_are_dropped(self):
+        """
+        Test that a match is dropped when the last connection watching it
+        closes, and that a finished match is kept while it is watched.
+        """
+        async def closed(client):
+            client.writer.close()
+            await client.writer.wait_closed()
+            await asyncio.sleep(0.1)
+
+        async def test(connect):
+            client = Client(*await connect())
+            match = await client.response(op='new', game='s', size=20,
+                                          p2='mr')
+            watcher = Client(*await connect())
+            await watcher.response(op='watch', match=match['match'])
+            await closed(client)
+            self.assertIn(match['match'], self.game_server.matches)
+            await closed(watcher)
+            self.assertEqual(self.game_server.matches, {})
+
+            client = Client(*await connect())
+            match = await client.response(op='new', game='s', size=9,
+                                          p1='mr', p2='mr')
+            event = match
+            while not event['over']:
+                event = await client.receive()
+            self.assertIn(match['match'], self.game_server.matches)
+            await closed(client)
+            self.assertEqual(self.game_server.matches, {})
+        self.run_with_server(test)
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
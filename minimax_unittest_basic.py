@@ -23,7 +23,11 @@ from unittest.mock import patch
 import inspect
 
 # Import the student solution
-from game_interface import playable_games, usable_strategies
+from game_interface import playable_games, usable_strategies, GameInterface
+from strategy import SearchStats, Deadline, MemoryMeter
+from time_control import TimeControl
+import time
+import tracemalloc
 minimax_iterative_strategy = usable_strategies['mi']
 minimax_recursive_strategy = usable_strategies['mr']
 StonehengeGame = playable_games['h']
@@ -232,5 +236,158 @@ class MinimaxUnitTests(unittest.TestCase):
                              expected_move, move_chosen, str(new_state)
                          ))
 
+    def test_quiet_game_interface(self):
+        """
+        Test a quiet GameInterface between the two minimax strategies, which
+        should neither prompt nor print and should return the winner and the
+        moves made.
+        """
+        with patch('builtins.input', side_effect=AssertionError), \
+                patch('builtins.print', side_effect=AssertionError):
+            interface = GameInterface(SubtractSquareGame,
+                                      minimax_recursive_strategy,
+                                      minimax_iterative_strategy,
+                                      p1_starts=True, quiet=True,
+                                      current_total=18)
+            winner, moves = interface.play()
+
+        self.assertEqual(winner, 'p1',
+                         "Player 1 moves first from 18 and should win.")
+        self.assertEqual(sum(moves), 18)
+        self.assertIn(moves[0], [1, 16])
+
+    def test_search_stats(self):
+        """
+        Test that both minimax strategies record the same full search of a
+        game of SubtractSquare with a value of 18.
+        """
+        game = SubtractSquareGame(True, current_total=18)
+        recursive_stats = SearchStats()
+        iterative_stats = SearchStats()
+        minimax_recursive_strategy(game, stats=recursive_stats)
+        minimax_iterative_strategy(game, stats=iterative_stats)
+
+        for stats in [recursive_stats, iterative_stats]:
+            self.assertGreater(stats.nodes, 0)
+            self.assertGreater(stats.elapsed, 0)
+            self.assertEqual(stats.children + 1,
+                             stats.nodes + stats.terminal)
+        self.assertEqual(recursive_stats.nodes, iterative_stats.nodes)
+        self.assertEqual(recursive_stats.terminal, iterative_stats.terminal)
+        self.assertEqual(recursive_stats.max_depth, iterative_stats.max_depth)
+
+    def test_search_options_agree(self):
+        """
+        Test that splitting the moves across workers and caching positions
+        does not change the scores minimax finds, and that the cache is
+        used.
+        """
+        game = SubtractSquareGame(True, current_total=30)
+        plain = SearchStats()
+        split = SearchStats()
+        move = minimax_recursive_strategy(game, stats=plain)
+        self.assertEqual(minimax_recursive_strategy(
+            game, stats=split, workers=2, cache_size=10000), move)
+        self.assertEqual(split.value, plain.value)
+        self.assertGreater(split.cache_hits, 0)
+        self.assertLess(split.nodes, plain.nodes)
+
+        timed = SearchStats()
+        usable_strategies['md'](game, stats=timed, time_limit=60)
+        self.assertEqual(timed.value, plain.value)
+
+    def test_iterative_memory_limit(self):
+        """
+        Test that iterative minimax falls back to a depth-limited search
+        when its tree outgrows the memory limit, and still picks a move
+        within its deadline.
+        """
+        game = StonehengeGame(True, side_length=3)
+        for move in ['A', 'L', 'F']:
+            game.current_state = game.current_state.make_move(move)
+
+        stats = SearchStats(track_memory=True)
+        move_chosen = minimax_iterative_strategy(game, stats=stats,
+                                                 memory_limit=200000)
+
+        self.assertIn(move_chosen, game.current_state.get_possible_moves())
+        self.assertTrue(stats.memory_limited,
+                        "A search of a board with 9 empty cells should not "
+                        "fit in 200000 bytes.")
+        self.assertGreater(stats.peak_bytes, 200000)
+        self.assertGreater(stats.bytes_per_node, 0)
+
+        game = StonehengeGame(True, side_length=4)
+        stats = SearchStats(track_memory=True)
+        start = time.perf_counter()
+        move_chosen = minimax_iterative_strategy(
+            game, stats=stats, memory_limit=200000, fallback_depth=20,
+            deadline=Deadline(0.5))
+        self.assertLess(time.perf_counter() - start, 2.0,
+                        "The fallback search should keep to the deadline.")
+        self.assertIn(move_chosen, game.current_state.get_possible_moves())
+        self.assertTrue(stats.memory_limited)
+
+    def test_memory_meter_keeps_outer_peak(self):
+        """
+        Test that a memory meter inside someone else's tracemalloc session
+        leaves their peak alone and still measures its own allocations.
+        """
+        tracemalloc.start()
+        try:
+            block = bytearray(1 << 20)
+            del block
+            outer_peak = tracemalloc.get_traced_memory()[1]
+            meter = MemoryMeter()
+            block = bytearray(1 << 16)
+            self.assertGreaterEqual(meter.peak(), 1 << 16)
+            self.assertLess(meter.peak(), 1 << 20)
+            del block
+            meter.close()
+            self.assertTrue(tracemalloc.is_tracing())
+            self.assertGreaterEqual(tracemalloc.get_traced_memory()[1],
+                                    outer_peak)
+            meter = MemoryMeter()
+            block = bytearray(1 << 21)
+            del block
+            self.assertGreater(meter.peak(), 1 << 20)
+            meter.close()
+        finally:
+            tracemalloc.stop()
+
+    def test_deadline(self):
+        """
+        Test that each minimax strategy stops searching an empty side 4
+        Stonehenge board soon after its deadline with a legal move.
+        """
+        game = StonehengeGame(True, side_length=4)
+        for key in ['mr', 'mi', 'md']:
+            stats = SearchStats()
+            start = time.perf_counter()
+            move = usable_strategies[key](game, stats=stats,
+                                          deadline=Deadline(0.2))
+            self.assertLess(time.perf_counter() - start, 1.0, key)
+            self.assertIn(move, game.current_state.get_possible_moves())
+            self.assertTrue(stats.cancelled, key)
+
+    def test_time_control_game_interface(self):
+        """
+        Test that a GameInterface under a time control charges each player's
+        moves to their clock.
+        """
+        interface = GameInterface(SubtractSquareGame,
+                                  minimax_recursive_strategy,
+                                  usable_strategies['md'], p1_starts=True,
+                                  quiet=True, current_total=30,
+                                  time_control=TimeControl(total=10,
+                                                           increment=1))
+        winner, moves = interface.play()
+
+        self.assertEqual(sum(moves), 30)
+        clocks = interface.clocks
+        self.assertEqual(clocks['p1'].moves + clocks['p2'].moves, len(moves))
+        self.assertFalse(clocks['p1'].flagged or clocks['p2'].flagged)
+        self.assertGreater(clocks['p1'].remaining, 10)
+
 if __name__ == "__main__":
     unittest.main()
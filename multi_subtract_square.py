@@ -0,0 +1,256 @@
+"""
+An implementation of game and state for Subtract Square with several piles.
+
+Players take turns subtracting a square number from any one pile, and the
+player who empties the last pile wins. A move is (pile, square), piles
+counted from 1.
+
+The game is the sum of one single-pile Subtract Square per pile, so by the
+Sprague-Grundy theorem the player to move wins exactly when the XOR of the
+Grundy numbers of the piles is not 0. grundy_strategy plays from those
+numbers instead of searching the game tree, whose size is the product of
+the piles'. The Grundy numbers found are kept for the rest of the process,
+and save_grundy_numbers and load_grundy_numbers keep them for later runs.
+"""
+import os
+import struct
+import time
+from math import isqrt
+from typing import Any, List, Sequence, Tuple
+from strategy import SearchStats
+from subtract_square_game import SubtractSquareGame
+from subtract_square_state import SubtractSquareState
+
+# The Grundy numbers of the single piles of 0, 1, 2, ... found so far, kept
+# for every later game of this process.
+_GRUNDY = [0]
+
+
+def grundy_number(size: int) -> int:
+    """
+    Return the Grundy number of a single pile of size.
+
+    >>> [grundy_number(size) for size in range(10)]
+    [0, 1, 0, 1, 2, 0, 1, 0, 1, 2]
+    """
+    for n in range(len(_GRUNDY), size + 1):
+        reachable = {_GRUNDY[n - k * k] for k in range(1, isqrt(n) + 1)}
+        mex = 0
+        while mex in reachable:
+            mex += 1
+        _GRUNDY.append(mex)
+    return _GRUNDY[size]
+
+
+def load_grundy_numbers(path: str) -> None:
+    """
+    Add the Grundy numbers saved at path by save_grundy_numbers to those
+    found so far. Do nothing if there is no file at path.
+    """
+    try:
+        with open(path, 'rb') as saved:
+            data = saved.read()
+    except FileNotFoundError:
+        return
+    numbers = [number for number, in struct.iter_unpack(
+        '<H', data[:len(data) - len(data) % 2])]
+    _GRUNDY.extend(numbers[len(_GRUNDY):])
+
+
+def save_grundy_numbers(path: str) -> None:
+    """
+    Write every Grundy number found so far to path as little-endian
+    unsigned 16-bit integers, replacing the file at path only once the new
+    one is complete.
+    """
+    with open(path + '.tmp', 'wb') as saved:
+        saved.write(struct.pack('<{}H'.format(len(_GRUNDY)), *_GRUNDY))
+    os.replace(path + '.tmp', path)
+
+
+def parse_piles(text: str) -> Tuple[int, ...]:
+    """
+    Return the pile sizes written in text, separated by spaces or commas.
+
+    >>> parse_piles('3, 10 4')
+    (3, 10, 4)
+    """
+    return tuple(int(size) for size in text.replace(',', ' ').split())
+
+
+def parse_move(string: str) -> Any:
+    """
+    Return the move written as pile:square in string, or -1 (an invalid
+    move) if string is not one.
+
+    >>> parse_move(' 2:9'), parse_move('9')
+    ((2, 9), -1)
+    """
+    pile, _, square = string.strip().partition(':')
+    if not (pile.strip().isdigit() and square.strip().isdigit()):
+        return -1
+    return int(pile), int(square)
+
+
+class MultiSubtractSquareState(SubtractSquareState):
+    """
+    The state of a game of Subtract Square with several piles.
+
+    piles - the size of every pile
+    current_total - the sum of the piles
+    """
+    piles: Tuple[int, ...]
+
+    def __init__(self, is_p1_turn: bool, piles: Sequence[int]) -> None:
+        """
+        Initialize this game state and set the current player based on
+        is_p1_turn.
+
+        >>> MultiSubtractSquareState(True, [3, 10]).current_total
+        13
+        """
+        super().__init__(is_p1_turn, sum(piles))
+        self.piles = tuple(piles)
+
+    def __str__(self) -> str:
+        """
+        Return a string representation of the current state of the game.
+        """
+        return "Piles: {}".format(', '.join(
+            '{}: {}'.format(pile, size)
+            for pile, size in enumerate(self.piles, 1)))
+
+    def get_possible_moves(self) -> List[Tuple[int, int]]:
+        """
+        Return all possible moves that can be applied to this state.
+
+        >>> MultiSubtractSquareState(True, [1, 4]).get_possible_moves()
+        [(1, 1), (2, 1), (2, 4)]
+        """
+        return [(pile, k * k) for pile, size in enumerate(self.piles, 1)
+                for k in range(1, isqrt(size) + 1)]
+
+    def make_move(self, move: Any) -> 'MultiSubtractSquareState':
+        """
+        Return the MultiSubtractSquareState that results from applying move
+        to this MultiSubtractSquareState.
+
+        >>> MultiSubtractSquareState(True, [3, 10]).make_move((2, 9))
+        P1's Turn: False - Piles: (3, 1)
+        """
+        if isinstance(move, str):
+            move = parse_move(move)
+        pile, square = move
+        piles = list(self.piles)
+        piles[pile - 1] -= square
+        return MultiSubtractSquareState(not self.p1_turn, piles)
+
+    def __repr__(self) -> str:
+        """
+        Return a representation of this state (which can be used for
+        equality testing).
+        """
+        return "P1's Turn: {} - Piles: {}".format(self.p1_turn, self.piles)
+
+    def grundy_number(self) -> int:
+        """
+        Return the Grundy number of this state: the XOR of those of its
+        piles.
+
+        >>> MultiSubtractSquareState(True, [2, 4, 7]).grundy_number()
+        2
+        """
+        value = 0
+        for size in self.piles:
+            value ^= grundy_number(size)
+        return value
+
+    def rough_outcome(self) -> float:
+        """
+        Return the outcome the current player can guarantee from state self,
+        which the Grundy numbers of the piles tell exactly.
+        """
+        return self.WIN if self.grundy_number() else self.LOSE
+
+
+class MultiSubtractSquareGame(SubtractSquareGame):
+    """
+    Subtract Square with several piles, to be played with two players.
+    """
+
+    def __init__(self, p1_starts: bool, piles: Sequence[int] = None) -> None:
+        """
+        Initialize this Game, using p1_starts to find who the first player
+        is. The pile sizes are asked for interactively unless piles is
+        given; a single size is one pile.
+        """
+        if isinstance(piles, int):
+            piles = (piles,)
+        if piles is None:
+            piles = ()
+            while not piles:
+                try:
+                    piles = parse_piles(input(
+                        "Enter the pile sizes, separated by spaces: "))
+                except ValueError:
+                    piles = ()
+        if not piles or min(piles) < 0:
+            raise ValueError("There must be at least one pile and no pile "
+                             "may be negative, not {}".format(list(piles)))
+        self.current_state = MultiSubtractSquareState(p1_starts, piles)
+
+    def get_instructions(self) -> str:
+        """
+        Return the instructions for this Game.
+        """
+        return "Players take turns subtracting a square number from any " \
+               "one pile, entered as pile:square (piles count from 1). The " \
+               "winner is the person who empties the last pile."
+
+    def str_to_move(self, string: str) -> Any:
+        """
+        Return the move that string, written as pile:square, represents. If
+        string is not a move, return an invalid move.
+        """
+        return parse_move(string)
+
+
+def grundy_strategy(game: Any, stats: SearchStats = None) -> Any:
+    """
+    Return a winning move for the player to move in a game of Subtract
+    Square, with one pile or several, if there is one, and otherwise the
+    move that takes the least.
+
+    >>> grundy_strategy(MultiSubtractSquareGame(True, [2, 4, 7]))
+    (2, 4)
+    >>> grundy_strategy(SubtractSquareGame(True, 18))
+    1
+    """
+    start = time.perf_counter()
+    state = game.current_state
+    single = not isinstance(state, MultiSubtractSquareState)
+    if single and not isinstance(state, SubtractSquareState):
+        raise TypeError('The Grundy strategy only plays Subtract Square')
+    piles = (state.current_total,) if single else state.piles
+    total = 0
+    for size in piles:
+        total ^= grundy_number(size)
+    moves = [(pile, k * k) for pile, size in enumerate(piles, 1)
+             for k in range(1, isqrt(size) + 1)]
+    move = moves[0]
+    for pile, square in moves:
+        size = piles[pile - 1]
+        if grundy_number(size - square) == total ^ grundy_number(size):
+            move = pile, square
+            break
+    if stats is not None:
+        stats.visit(0, len(moves))
+        stats.value = state.WIN if total else state.LOSE
+        stats.exact = True
+        stats.elapsed = time.perf_counter() - start
+    return move[1] if single else move
+
+
+if __name__ == "__main__":
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
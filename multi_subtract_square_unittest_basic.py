@@ -0,0 +1,119 @@
+"""
+Unittests for Subtract Square with several piles and the Grundy strategy.
+"""
+import itertools
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from codec import encode_state
+from analyze import make_game
+from game_interface import playable_games, usable_strategies, \
+    strategy_games, game_size_options, GameInterface
+import multi_subtract_square
+from multi_subtract_square import MultiSubtractSquareState, grundy_number, \
+    load_grundy_numbers, save_grundy_numbers
+from strategy import SearchStats
+MultiSubtractSquareGame = playable_games['m']
+grundy_strategy = usable_strategies['g']
+
+
+class MultiSubtractSquareUnitTests(unittest.TestCase):
+    def test_grundy_agrees_with_minimax(self):
+        """
+        Test that the Grundy strategy finds the value minimax does for every
+        position of up to three small piles, and a move that keeps it.
+        """
+        for piles in itertools.product(range(7), range(1, 7), range(4)):
+            game = MultiSubtractSquareGame(True, piles)
+            stats, grundy_stats = SearchStats(), SearchStats()
+            usable_strategies['mr'](game, stats=stats, cache_size=10000)
+            move = grundy_strategy(game, stats=grundy_stats)
+            self.assertEqual(grundy_stats.value, stats.value, piles)
+            if stats.value == game.current_state.WIN:
+                after = game.current_state.make_move(move)
+                self.assertEqual(after.rough_outcome(), after.LOSE, piles)
+
+    def test_large_piles(self):
+        """
+        Test that the Grundy strategy wins a game of large piles from a
+        winning position, against a strategy that also plays perfectly here
+        because rough_outcome is exact for several piles.
+        """
+        with patch('builtins.input', side_effect=AssertionError):
+            interface = GameInterface(
+                MultiSubtractSquareGame, grundy_strategy,
+                usable_strategies['ro'], p1_starts=True, quiet=True,
+                piles=[2000, 3000, 5])
+            winner, moves = interface.play()
+
+        self.assertEqual(winner, 'p1')
+        self.assertEqual(sum(square for _, square in moves), 5005)
+
+    def test_saved_grundy_numbers(self):
+        """
+        Test that saved Grundy numbers are loaded by a later run instead of
+        being found again, and that loading a missing file does nothing.
+        """
+        expected = [grundy_number(size) for size in range(300)]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'grundy')
+            load_grundy_numbers(path)
+            save_grundy_numbers(path)
+            with patch('multi_subtract_square._GRUNDY', [0]):
+                load_grundy_numbers(path)
+                self.assertGreaterEqual(len(multi_subtract_square._GRUNDY),
+                                        300)
+                with patch('multi_subtract_square.isqrt',
+                           side_effect=AssertionError):
+                    self.assertEqual([grundy_number(size)
+                                      for size in range(300)], expected)
+            self.assertEqual(os.listdir(directory), ['grundy'])
+
+    def test_strategies_play_their_games(self):
+        """
+        Test that every strategy makes a legal move in every game it is
+        registered for, and that the Grundy strategy is not registered for
+        Stonehenge.
+        """
+        sizes = {'s': 10, 'h': 2, 'm': [3, 4]}
+        typed = {'s': '1', 'h': 'A', 'm': '1:1'}
+        self.assertEqual(set(strategy_games), set(usable_strategies))
+        self.assertNotIn('h', strategy_games['g'])
+        for key, games in strategy_games.items():
+            for game_key in games:
+                game = playable_games[game_key](
+                    True, **{game_size_options[game_key]: sizes[game_key]})
+                state = game.current_state
+                with patch('builtins.input', return_value=typed[game_key]):
+                    move = usable_strategies[key](game)
+                self.assertTrue(state.is_valid_move(move), (key, game_key))
+
+    def test_encoding(self):
+        """
+        Test that positions with several piles round-trip through the codec
+        and do not share encodings with single piles.
+        """
+        state = MultiSubtractSquareState(False, [0, 130, 7])
+        game = make_game('m', encode_state(state))
+        self.assertEqual(repr(game.current_state), repr(state))
+        self.assertNotEqual(
+            encode_state(MultiSubtractSquareState(True, [18])),
+            encode_state(playable_games['s'](True, 18).current_state))
+
+    def test_str_to_move(self):
+        """
+        Test that moves are read as pile:square.
+        """
+        game = MultiSubtractSquareGame(True, [5, 9])
+        move = game.str_to_move('2:9')
+        self.assertTrue(game.current_state.is_valid_move(move))
+        self.assertFalse(game.current_state.is_valid_move(
+            game.str_to_move('9')))
+        self.assertFalse(game.current_state.is_valid_move(
+            game.str_to_move('1:9')))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,213 @@
+"""
+Perft-style move-generation counters for StonehengeState and
+SubtractSquareState.
+
+perft counts, for every depth, the move sequences of that length from a
+state (its leaf nodes) and how many of them end the game. The counts can be
+computed by plain recursion or with a hash table of already counted states;
+both must agree, which makes them a check for faster engines. count_reachable
+counts the distinct states reachable at every depth next to the size of the
+tree, which tells ahead of time whether a full solve is feasible.
+
+Example:
+    python perft.py h 2 --depth 7 --hashed
+"""
+import argparse
+import time
+from typing import Any, Dict, List, Tuple
+from stonehenge import StonehengeState
+from subtract_square_state import SubtractSquareState
+
+
+class PerftCount:
+    """
+    The counts of perft at one depth.
+
+    depth - the number of moves made
+    nodes - the number of move sequences of length depth
+    terminal - how many of those sequences end the game
+    """
+    depth: int
+    nodes: int
+    terminal: int
+
+    def __init__(self, depth: int, nodes: int = 0, terminal: int = 0) -> None:
+        """
+        Create a new PerftCount.
+        """
+        self.depth = depth
+        self.nodes = nodes
+        self.terminal = terminal
+
+    def __eq__(self, other: Any) -> bool:
+        """
+        Return whether self and other have the same counts.
+        """
+        return (type(other) == type(self) and self.depth == other.depth and
+                self.nodes == other.nodes and self.terminal == other.terminal)
+
+    def __repr__(self) -> str:
+        """
+        Return a representation of this PerftCount.
+        """
+        return 'PerftCount({}, {}, {})'.format(self.depth, self.nodes,
+                                               self.terminal)
+
+
+def state_key(state: Any) -> Any:
+    """
+    Return a hashable key that equal states share.
+    """
+    return repr(state)
+
+
+def perft(state: Any, depth: int) -> List[PerftCount]:
+    """
+    Return the perft counts of state for depths 0 to depth, by plain
+    recursion.
+
+    >>> perft(StonehengeState(True, 1), 2)
+    [PerftCount(0, 1, 0), PerftCount(1, 3, 3), PerftCount(2, 0, 0)]
+    >>> perft(SubtractSquareState(True, 5), 2)
+    [PerftCount(0, 1, 0), PerftCount(1, 2, 0), PerftCount(2, 3, 2)]
+    """
+    counts = [PerftCount(d) for d in range(depth + 1)]
+    help_perft(state, depth, counts, 0)
+    return counts
+
+
+def help_perft(state: Any, depth: int, counts: List[PerftCount],
+               ply: int) -> None:
+    """
+    Add the leaves of state, which is ply moves from the root, to counts.
+    """
+    moves = state.get_possible_moves()
+    counts[ply].nodes += 1
+    if not moves:
+        counts[ply].terminal += 1
+    elif ply < depth:
+        for move in moves:
+            help_perft(state.make_move(move), depth, counts, ply + 1)
+
+
+def perft_hashed(state: Any, depth: int,
+                 table: Dict[Tuple[Any, int], List[Tuple[int, int]]] = None) \
+        -> List[PerftCount]:
+    """
+    Return the perft counts of state for depths 0 to depth, counting the
+    subtree of every (state, remaining depth) only once.
+
+    >>> perft_hashed(SubtractSquareState(True, 5), 2) == \\
+    ...     perft(SubtractSquareState(True, 5), 2)
+    True
+    """
+    if table is None:
+        table = {}
+    rows = help_perft_hashed(state, depth, table)
+    return [PerftCount(d, nodes, terminal)
+            for d, (nodes, terminal) in enumerate(rows)]
+
+
+def help_perft_hashed(state: Any, depth: int,
+                      table: Dict[Tuple[Any, int], List[Tuple[int, int]]]) \
+        -> List[Tuple[int, int]]:
+    """
+    Return the (nodes, terminal) counts of state for depths 0 to depth,
+    looking them up in and adding them to table.
+    """
+    key = (state_key(state), depth)
+    if key in table:
+        return table[key]
+    moves = state.get_possible_moves()
+    rows = [(1, 0 if moves else 1)] + [(0, 0)] * depth
+    if moves and depth:
+        for move in moves:
+            child = help_perft_hashed(state.make_move(move), depth - 1, table)
+            for d, (nodes, terminal) in enumerate(child, 1):
+                rows[d] = (rows[d][0] + nodes, rows[d][1] + terminal)
+    table[key] = rows
+    return rows
+
+
+def count_reachable(state: Any, depth: int = None) -> List[Dict[str, int]]:
+    """
+    Return, for every depth up to depth (or until no moves are left), the
+    number of move sequences ('tree'), the number of distinct states
+    ('distinct') and the number of distinct states where the game is over
+    ('terminal').
+
+    >>> count_reachable(SubtractSquareState(True, 5))[-2:]
+    [{'depth': 4, 'tree': 1, 'distinct': 1, 'terminal': 0}, \
+{'depth': 5, 'tree': 1, 'distinct': 1, 'terminal': 1}]
+    """
+    level = {state_key(state): (state, 1)}
+    rows = []
+    ply = 0
+    while level and (depth is None or ply <= depth):
+        following = {}
+        terminal = 0
+        for current, paths in level.values():
+            moves = current.get_possible_moves()
+            if not moves:
+                terminal += 1
+            for move in moves:
+                child = current.make_move(move)
+                key = state_key(child)
+                known = following.get(key)
+                following[key] = (child, paths + (known[1] if known else 0))
+        rows.append({'depth': ply,
+                     'tree': sum(paths for _, paths in level.values()),
+                     'distinct': len(level), 'terminal': terminal})
+        level = following
+        ply += 1
+    return rows
+
+
+def make_state(game: str, size: int, p1_starts: bool = True) -> Any:
+    """
+    Return the starting state of game ('h' or 's') with size.
+    """
+    if game == 'h':
+        return StonehengeState(p1_starts, size)
+    return SubtractSquareState(p1_starts, size)
+
+
+def main(argv: List[str] = None) -> None:
+    """
+    Print the perft counts of a starting position from the command line.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('game', choices=['h', 's'])
+    parser.add_argument('size', type=int,
+                        help='the side length or starting total')
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--hashed', action='store_true',
+                        help='count with a hash table of counted states')
+    parser.add_argument('--reachable', action='store_true',
+                        help='also count the distinct reachable states')
+    args = parser.parse_args(argv)
+
+    state = make_state(args.game, args.size)
+    start = time.perf_counter()
+    counts = (perft_hashed if args.hashed else perft)(state, args.depth)
+    elapsed = time.perf_counter() - start
+    for count in counts:
+        print('depth {:3} {:16,} nodes {:16,} terminal'.format(
+            count.depth, count.nodes, count.terminal))
+    total = sum(count.nodes for count in counts)
+    print('{:,} nodes in {:.3f}s ({:,.0f} nodes/s)'.format(
+        total, elapsed, total / elapsed if elapsed else 0))
+
+    if args.reachable:
+        rows = count_reachable(state, args.depth)
+        for row in rows:
+            print('depth {depth:3} {tree:16,} tree {distinct:16,} distinct '
+                  '{terminal:16,} terminal'.format(**row))
+        tree = sum(row['tree'] for row in rows)
+        distinct = sum(row['distinct'] for row in rows)
+        print('{:,} tree nodes, {:,} distinct states ({:.1f}x '
+              'transpositions)'.format(tree, distinct, tree / distinct))
+
+
+if __name__ == "__main__":
+    main()
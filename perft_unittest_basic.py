@@ -0,0 +1,64 @@
+"""
+Unittests for the perft move-generation counters.
+"""
+import unittest
+
+from perft import count_reachable, make_state, perft, perft_hashed
+
+
+def brute_force(state, depth):
+    """
+    Return (nodes, terminal) for depths 0 to depth, from every state at
+    each depth listed out.
+    """
+    levels = [[state]]
+    for _ in range(depth):
+        levels.append([current.make_move(move) for current in levels[-1]
+                       for move in current.get_possible_moves()])
+    return [(len(level),
+             sum(1 for current in level if not current.get_possible_moves()))
+            for level in levels]
+
+
+class PerftUnitTests(unittest.TestCase):
+    def test_counts_agree_with_brute_force(self):
+        """
+        Test that both perft counters agree with a brute-force count at
+        small depths.
+        """
+        for game, size, depth in [('h', 1, 3), ('h', 2, 4), ('h', 3, 3),
+                                  ('s', 10, 6), ('s', 17, 5)]:
+            for p1_starts in [True, False]:
+                state = make_state(game, size, p1_starts)
+                expected = brute_force(state, depth)
+                for counter in [perft, perft_hashed]:
+                    counts = counter(state, depth)
+                    self.assertEqual([c.depth for c in counts],
+                                     list(range(depth + 1)))
+                    self.assertEqual([(c.nodes, c.terminal) for c in counts],
+                                     expected, (counter.__name__, game, size))
+
+    def test_count_reachable(self):
+        """
+        Test that the distinct states counted at every depth are those of
+        the tree, whose size perft counts.
+        """
+        state = make_state('h', 2)
+        rows = count_reachable(state)
+        counts = perft(state, len(rows) - 1)
+        self.assertEqual([row['tree'] for row in rows],
+                         [count.nodes for count in counts])
+        level = {repr(state): state}
+        for row in rows:
+            self.assertEqual(row['distinct'], len(level))
+            self.assertEqual(row['terminal'], sum(
+                1 for current in level.values()
+                if not current.get_possible_moves()))
+            level = {repr(child): child for current in level.values()
+                     for child in (current.make_move(move) for move in
+                                   current.get_possible_moves())}
+        self.assertEqual(level, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+"""
+Pondering: searching during the opponent's turn.
+
+A PonderingStrategy wraps a strategy. While the opponent thinks, a
+background thread searches the positions the opponent's likely replies
+lead to, most likely first, and keeps the moves found in a StrategyCache.
+When the opponent's actual move arrives, the move is taken from the cache
+if it was already searched, or joined if it is being searched; a search of
+any other position is cancelled.
+
+GameInterface calls ponder with its game whenever the opponent is to move,
+and stop when the game is over.
+"""
+import copy
+import threading
+from typing import Any, Callable, List
+from strategy import Deadline, SearchStats, accepts_option
+from strategy_cache import StrategyCache, cached_strategy
+
+
+def likely_replies(state: Any) -> List[Any]:
+    """
+    Return the states the replies of the player to move in state lead to,
+    the replies that look best for that player (by rough_outcome) first.
+    """
+    children = [state.make_move(move) for move in state.get_possible_moves()]
+    return sorted(children, key=lambda child: child.rough_outcome())
+
+
+class PonderingStrategy:
+    """
+    A strategy that searches during the opponent's turn.
+
+    strategy - the strategy that picks the moves
+    name - the key strategy's moves are cached under
+    cache - where moves found while pondering are kept
+    pondered - the number of positions searched while pondering
+    """
+    strategy: Callable
+    name: str
+    cache: StrategyCache
+    pondered: int
+
+    def __init__(self, strategy: Callable, name: str,
+                 cache: StrategyCache = None) -> None:
+        """
+        Create a new PonderingStrategy that is not pondering.
+        """
+        self.strategy = strategy
+        self.name = name
+        self.cache = cache if cache is not None else StrategyCache()
+        self.pondered = 0
+        self._cached = cached_strategy(strategy, name, self.cache)
+        self._stop = threading.Event()
+        self._deadline = Deadline()
+        self._searching = None
+        self._thread = None
+
+    def __call__(self, game: Any, stats: SearchStats = None,
+                 deadline: Deadline = None) -> Any:
+        """
+        Return the move strategy picks for game by deadline, stopping any
+        pondering first.
+        """
+        self._stop.set()
+        if self._searching != self.cache.key(game.current_state, self.name):
+            self._deadline.cancel()
+        options = {}
+        if stats is not None:
+            options['stats'] = stats
+        if deadline is not None and accepts_option(self.strategy,
+                                                   'deadline'):
+            options['deadline'] = deadline
+        try:
+            return self._cached(game, **options)
+        finally:
+            self._deadline.cancel()
+
+    def ponder(self, game: Any) -> None:
+        """
+        Start searching, in the background, the replies to the current
+        state of game, where the opponent is to move.
+        """
+        self.stop()
+        self._stop = threading.Event()
+        self._deadline = Deadline()
+        self._thread = threading.Thread(
+            target=self._ponder,
+            args=(copy.copy(game), self._stop, self._deadline), daemon=True)
+        self._thread.start()
+
+    def _ponder(self, game: Any, stop: threading.Event,
+                deadline: Deadline) -> None:
+        """
+        Search the likely replies to the state of game until stop is set or
+        deadline is cancelled.
+        """
+        options = {}
+        if accepts_option(self.strategy, 'deadline'):
+            options['deadline'] = deadline
+        try:
+            for child in likely_replies(game.current_state):
+                if stop.is_set():
+                    return
+                if game.is_over(child):
+                    continue
+                self._searching = self.cache.key(child, self.name)
+                game.current_state = child
+                self._cached(game, **options)
+                if deadline.reached:
+                    return
+                self.pondered += 1
+        finally:
+            self._searching = None
+
+    def stop(self) -> None:
+        """
+        Stop pondering, cancelling the search under way if the strategy
+        takes a deadline.
+        """
+        self._stop.set()
+        self._deadline.cancel()
+
+    def join(self, timeout: float = None) -> None:
+        """
+        Wait for pondering to finish or stop.
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def pondering(self) -> bool:
+        """
+        Return whether a background search is running.
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+
+if __name__ == "__main__":
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
@@ -0,0 +1,57 @@
+"""
+Unittests for pondering during the opponent's turn.
+"""
+import unittest
+
+from game_interface import playable_games, usable_strategies, GameInterface
+from pondering import PonderingStrategy, likely_replies
+from strategy import SearchStats
+from subtract_square_state import SubtractSquareState
+
+
+class PonderingUnitTests(unittest.TestCase):
+    def test_likely_replies_order(self):
+        """
+        Test that the replies that look lost for the player left to move
+        come first, in move order among equals.
+        """
+        replies = likely_replies(SubtractSquareState(True, 9))
+        self.assertEqual([reply.current_total for reply in replies],
+                         [5, 0, 8])
+
+    def test_pondered_moves_come_from_cache(self):
+        """
+        Test that after pondering every reply, the move for the reply made
+        is found in the cache and matches the strategy's own move.
+        """
+        ponderer = PonderingStrategy(usable_strategies['mr'], 'mr')
+        seen = []
+
+        def opponent(game):
+            # Wait, like a human thinking, until every reply is searched.
+            ponderer.join(60)
+            seen.append(ponderer.pondering)
+            return game.current_state.get_possible_moves()[-1]
+
+        interface = GameInterface(playable_games['s'], opponent, ponderer,
+                                  p1_starts=True, quiet=True,
+                                  current_total=30)
+        winner, moves = interface.play()
+        self.assertFalse(any(seen))
+        self.assertGreater(ponderer.pondered, 0)
+        self.assertEqual(ponderer.cache.misses, ponderer.pondered)
+        self.assertEqual(ponderer.cache.hits, len(moves) // 2)
+
+        game = playable_games['s'](True, current_total=30)
+        for i, move in enumerate(moves):
+            if i % 2:
+                stats = SearchStats()
+                self.assertEqual(ponderer(game, stats=stats), move)
+                self.assertEqual(stats.cache_hits, 1)
+                self.assertEqual(move, usable_strategies['mr'](game))
+            game.current_state = game.current_state.make_move(move)
+        self.assertFalse(ponderer.pondering)
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
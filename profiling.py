@@ -0,0 +1,192 @@
+"""
+Profilers that record whole call stacks in the collapsed-stack format read
+by flamegraph tools (e.g. flamegraph.pl or speedscope): one line per
+distinct stack, with its frames separated by ';' and followed by a count.
+
+Two profilers are available:
+    'sample' - a background thread samples the profiled thread's stack every
+               interval seconds; counts are numbers of samples
+    'trace' - every call and return is traced with sys.setprofile; counts
+              are microseconds spent with exactly that stack
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, List, Tuple
+
+# The engine functions the summary reports on.
+ENGINE_FUNCTIONS = ['make_move', 'help_complete_ley_mark', 'help_add_ley_mark',
+                    'get_possible_moves', 'is_over', 'is_winner',
+                    'state_over', 'rough_outcome']
+
+
+def frame_label(code: Any) -> str:
+    """
+    Return the label of the function whose code object is code, such as
+    'stonehenge:StonehengeState.make_move'.
+    """
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    name = getattr(code, 'co_qualname', code.co_name)
+    return '{}:{}'.format(module, name).replace(';', ',').replace(' ', '_')
+
+
+def frame_stack(frame: Any) -> Tuple[str, ...]:
+    """
+    Return the labels of frame and its callers, outermost first.
+    """
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return tuple(labels)
+
+
+class Profiler:
+    """
+    A profiler that collects collapsed stacks of the thread that starts it.
+
+    mode - 'sample' or 'trace'
+    interval - the seconds between samples in 'sample' mode
+    stacks - the count of every stack seen
+    """
+    mode: str
+    interval: float
+    stacks: Counter
+
+    def __init__(self, mode: str = 'sample', interval: float = 0.001) -> None:
+        """
+        Create a new Profiler, which is not yet running.
+        """
+        if mode not in ('sample', 'trace'):
+            raise ValueError("mode must be 'sample' or 'trace', not "
+                             "{!r}".format(mode))
+        self.mode = mode
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+        self._switch_interval = None
+        self._stack = []
+        self._last = 0.0
+
+    def __enter__(self) -> 'Profiler':
+        """
+        Start profiling the current thread.
+        """
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """
+        Stop profiling.
+        """
+        self.stop()
+
+    def start(self) -> None:
+        """
+        Start profiling the current thread.
+        """
+        if self.mode == 'trace':
+            self._stack = list(frame_stack(sys._getframe()))
+            self._last = time.perf_counter()
+            sys.setprofile(self._trace)
+            return
+        # Let the sampler thread take the GIL about as often as it samples.
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self._switch_interval, self.interval))
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._sample, args=(threading.get_ident(),), daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop profiling.
+        """
+        if self.mode == 'trace':
+            sys.setprofile(None)
+            self._charge()
+            return
+        self._stop.set()
+        self._thread.join()
+        sys.setswitchinterval(self._switch_interval)
+
+    def _sample(self, thread_id: int) -> None:
+        """
+        Sample the stack of thread thread_id until stopped.
+        """
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                self.stacks[frame_stack(frame)] += 1
+
+    def _charge(self) -> None:
+        """
+        Charge the time since the last event to the current stack.
+        """
+        now = time.perf_counter()
+        if self._stack:
+            self.stacks[tuple(self._stack)] += round((now - self._last) * 1e6)
+        self._last = now
+
+    def _trace(self, frame: Any, event: str, arg: Any) -> None:
+        """
+        Update the current stack on a call or return event.
+        """
+        if event == 'call':
+            self._charge()
+            self._stack.append(frame_label(frame.f_code))
+        elif event == 'return':
+            self._charge()
+            if self._stack:
+                self._stack.pop()
+
+    def collapsed(self) -> List[str]:
+        """
+        Return the collapsed-stack lines of this profile.
+        """
+        return ['{} {}'.format(';'.join(stack), count)
+                for stack, count in sorted(self.stacks.items()) if count]
+
+    def write_collapsed(self, path: str) -> None:
+        """
+        Write the collapsed stacks of this profile to the file at path.
+        """
+        with open(path, 'w') as output:
+            for line in self.collapsed():
+                output.write(line + '\n')
+
+    def engine_summary(self) -> List[Tuple[str, float]]:
+        """
+        Return (function, share) for every function in ENGINE_FUNCTIONS,
+        where share is the fraction of the profile spent inside it
+        (including the functions it calls), largest first.
+        """
+        total = sum(self.stacks.values())
+        shares = []
+        for function in ENGINE_FUNCTIONS:
+            inside = sum(count for stack, count in self.stacks.items()
+                         if any(label.endswith('.' + function)
+                                or label.endswith(':' + function)
+                                for label in stack))
+            shares.append((function, inside / total if total else 0.0))
+        return sorted(shares, key=lambda share: -share[1])
+
+
+def profile_call(function: Callable[[], Any], mode: str = 'sample',
+                 interval: float = 0.001) -> Tuple[Any, Profiler]:
+    """
+    Return the result of calling function and the Profiler of the call.
+    """
+    profiler = Profiler(mode, interval)
+    with profiler:
+        result = function()
+    return result, profiler
+
+
+if __name__ == "__main__":
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
@@ -0,0 +1,59 @@
+"""
+Unittests for the flamegraph profilers.
+"""
+import os
+import tempfile
+import unittest
+
+from game_interface import playable_games, usable_strategies
+from profiling import Profiler, profile_call
+
+
+def search():
+    """
+    Return the move recursive minimax picks on a small Stonehenge board.
+    """
+    game = playable_games['h'](True, side_length=2)
+    return usable_strategies['mr'](game)
+
+
+class ProfilingUnitTests(unittest.TestCase):
+    def test_profile_call(self):
+        """
+        Test that both profilers return the function's result and a
+        non-empty profile of collapsed stacks through the engine.
+        """
+        expected = search()
+        for mode in ['sample', 'trace']:
+            result, profiler = profile_call(search, mode, interval=0.0005)
+            self.assertEqual(result, expected)
+            lines = profiler.collapsed()
+            self.assertTrue(lines, mode)
+            for line in lines:
+                self.assertRegex(line, r'^\S+ \d+$')
+            self.assertTrue(any('stonehenge:StonehengeState.make_move' in line
+                                for line in lines), mode)
+            shares = dict(profiler.engine_summary())
+            self.assertGreater(shares['make_move'], 0, mode)
+            self.assertTrue(all(0 <= share <= 1
+                                for share in shares.values()))
+
+    def test_write_collapsed(self):
+        """
+        Test that the collapsed stacks written to a file are those of the
+        profile, and that unknown modes are refused.
+        """
+        _, profiler = profile_call(search, 'trace')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'stacks.txt')
+            profiler.write_collapsed(path)
+            with open(path) as stacks:
+                written = stacks.read().splitlines()
+        self.assertEqual(written, profiler.collapsed())
+        total = sum(int(line.rsplit(' ', 1)[1]) for line in written)
+        self.assertEqual(total, sum(profiler.stacks.values()))
+        self.assertRaises(ValueError, Profiler, 'wall')
+
+
+if __name__ == "__main__":
+    unittest.main()
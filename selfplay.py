@@ -0,0 +1,251 @@
+"""
+A self-play pipeline that writes labelled Stonehenge positions to NumPy
+shards, as training data for evaluation functions.
+
+Games are played by worker processes: each move is a random one with
+probability explore and the move of rough_outcome_strategy otherwise, from
+a random generator seeded by the run's seed and the game's number, so that
+any game can be played again identically. Every position a game reaches
+before it is over is labelled with its value for the player to move: the
+exact value found by solver.Solver on boards with side length up to
+exact_side, and the value of depth_limited_minimax_strategy otherwise.
+
+Positions are written, in game order, to compressed .npz shards of
+shard_size positions each (the last may be smaller) holding the arrays of
+stonehenge_batch (boards, leys, p1_turn) and value, exact, game and ply.
+No more than a shard and the window of games being played is ever held in
+memory. An index.json file records the run's settings and, after each
+shard, the shards written and where the next begins, so that running again
+in the same directory carries on from there.
+
+Example:
+    python selfplay.py data/ --side 3 --games 10000 --workers 8
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Tuple
+import numpy as np
+from solver import Solver
+from stonehenge import StonehengeGame
+from stonehenge_batch import encode_states
+from strategy import DEFAULT_DEPTH, SearchStats, \
+    depth_limited_minimax_strategy, rough_outcome_strategy
+
+INDEX = 'index.json'
+# The settings a run keeps; resuming with different ones is refused.
+SETTINGS = ['side', 'games', 'shard_size', 'seed', 'explore', 'exact_side',
+            'depth']
+
+
+def label(game: Any, settings: Dict[str, Any]) -> Tuple[float, bool]:
+    """
+    Return the value of the current state of game for the player to move,
+    and whether it is exact.
+    """
+    if settings['side'] <= settings['exact_side']:
+        solver = Solver(game)
+        solver.run()
+        return solver.result()[1], True
+    stats = SearchStats()
+    depth_limited_minimax_strategy(game, settings['depth'], stats)
+    return stats.value, stats.exact
+
+
+def play_game(job: Tuple[int, Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    Return the labelled positions of game number index of a run with
+    settings, as the arrays of a shard.
+    """
+    index, settings = job
+    rng = np.random.default_rng([settings['seed'], index])
+    game = StonehengeGame(bool(rng.integers(2)), settings['side'])
+    states, values, exact = [], [], []
+    while not game.is_over(game.current_state):
+        value, solved = label(game, settings)
+        states.append(game.current_state)
+        values.append(value)
+        exact.append(solved)
+        moves = game.current_state.get_possible_moves()
+        if rng.random() < settings['explore']:
+            move = moves[rng.integers(len(moves))]
+        else:
+            move = rough_outcome_strategy(game)
+        game.current_state = game.current_state.make_move(move)
+    boards, leys, p1_turn = encode_states(states)
+    return {'boards': boards, 'leys': leys, 'p1_turn': p1_turn,
+            'value': np.array(values, dtype=np.float32),
+            'exact': np.array(exact, dtype=bool),
+            'game': np.full(len(states), index, dtype=np.int32),
+            'ply': np.arange(len(states), dtype=np.int16)}
+
+
+def played_games(settings: Dict[str, Any], start: int, workers: int = None,
+                 window: int = None) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Yield the positions of games start, start + 1, ... of a run with
+    settings in order, played across a pool of workers processes with at
+    most window games (by default four per worker) in flight.
+    """
+    window = window or 4 * (workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        index = start
+        while pending or index < settings['games']:
+            while index < settings['games'] and len(pending) < window:
+                pending.append(pool.submit(play_game, (index, settings)))
+                index += 1
+            yield pending.pop(0).result()
+
+
+class ShardWriter:
+    """
+    Writes positions to shards in a directory and keeps its index.
+
+    directory - where the shards and the index are written
+    settings - the settings of the run
+    shards - the file name and number of positions of every shard written
+    next_game - the first game not wholly in the shards written
+    skip - how many positions of next_game are in the shards written
+    """
+    directory: str
+    settings: Dict[str, Any]
+    shards: List[Dict[str, Any]]
+    next_game: int
+    skip: int
+
+    def __init__(self, directory: str, settings: Dict[str, Any]) -> None:
+        """
+        Open the run in directory with settings, carrying on from its index
+        if it has one. Raise ValueError if the index has other settings.
+        """
+        self.directory = directory
+        self.settings = settings
+        self.shards, self.next_game, self.skip = [], 0, 0
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, INDEX)
+        if os.path.exists(path):
+            with open(path) as index:
+                saved = json.load(index)
+            if saved['settings'] != settings:
+                raise ValueError('{} was made with other settings: '
+                                 '{}'.format(directory, saved['settings']))
+            self.shards = saved['shards']
+            self.next_game, self.skip = saved['next_game'], saved['skip']
+        # The game the next positions added belong to, and how many of its
+        # positions are buffered or written.
+        self._game, self._offset = self.next_game, self.skip
+        self._buffer = []
+        self._rows = 0
+
+    @property
+    def finished(self) -> bool:
+        """
+        Return whether every game of the run is in the shards written.
+        """
+        return self.next_game >= self.settings['games']
+
+    def add(self, positions: Dict[str, np.ndarray]) -> None:
+        """
+        Add every position of the next game (but those already written),
+        writing each shard they fill.
+        """
+        total = len(positions['value'])
+        while self._offset < total:
+            room = self.settings['shard_size'] - self._rows
+            end = min(total, self._offset + room)
+            self._buffer.append({name: array[self._offset:end]
+                                 for name, array in positions.items()})
+            self._rows += end - self._offset
+            self._offset = end
+            if self._rows == self.settings['shard_size']:
+                if end == total:
+                    self._write(self._game + 1, 0)
+                else:
+                    self._write(self._game, end)
+        self._game, self._offset = self._game + 1, 0
+
+    def close(self) -> None:
+        """
+        Write the positions not in a shard yet as a last, smaller shard.
+        """
+        if self._rows:
+            self._write(self._game, self._offset)
+
+    def _write(self, next_game: int, skip: int) -> None:
+        """
+        Write the buffered positions as a shard, after which the shards
+        written hold skip positions of next_game.
+        """
+        name = 'shard-{:05d}.npz'.format(len(self.shards))
+        arrays = {key: np.concatenate([part[key] for part in self._buffer])
+                  for key in self._buffer[0]}
+        temporary = os.path.join(self.directory, name + '.tmp')
+        with open(temporary, 'wb') as shard:
+            np.savez_compressed(shard, **arrays)
+        os.replace(temporary, os.path.join(self.directory, name))
+        self.shards.append({'file': name, 'positions': self._rows})
+        self._buffer, self._rows = [], 0
+        self.next_game, self.skip = next_game, skip
+        path = os.path.join(self.directory, INDEX)
+        with open(path + '.tmp', 'w') as index:
+            json.dump({'settings': self.settings, 'shards': self.shards,
+                       'next_game': self.next_game, 'skip': self.skip},
+                      index, indent=1)
+        os.replace(path + '.tmp', path)
+
+
+def selfplay(directory: str, settings: Dict[str, Any], workers: int = None,
+             window: int = None) -> ShardWriter:
+    """
+    Play the games of the run with settings in directory not yet in its
+    shards, write them to shards and return the ShardWriter.
+    """
+    writer = ShardWriter(directory, settings)
+    if writer.finished:
+        return writer
+    for positions in played_games(settings, writer.next_game, workers,
+                                  window):
+        writer.add(positions)
+    writer.close()
+    return writer
+
+
+def main(argv: List[str] = None) -> None:
+    """
+    Run self-play from the command line, printing the index when done.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('directory',
+                        help='where the shards and index.json are written')
+    parser.add_argument('--side', type=int, default=3,
+                        help='the side length of the boards')
+    parser.add_argument('--games', type=int, default=1000,
+                        help='the number of games the run plays')
+    parser.add_argument('--shard-size', type=int, default=65536,
+                        help='the number of positions in a shard')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--explore', type=float, default=0.25,
+                        help='the chance that a move is random')
+    parser.add_argument('--exact-side', type=int, default=2,
+                        help='the largest side length labelled exactly')
+    parser.add_argument('--depth', type=int, default=DEFAULT_DEPTH,
+                        help='how many moves ahead larger boards are '
+                             'searched to label them')
+    parser.add_argument('--workers', type=int)
+    args = parser.parse_args(argv)
+
+    settings = {name: getattr(args, name) for name in SETTINGS}
+    try:
+        writer = selfplay(args.directory, settings, args.workers)
+    except ValueError as error:
+        parser.error(str(error))
+    print(json.dumps({'shards': len(writer.shards),
+                      'positions': sum(shard['positions']
+                                       for shard in writer.shards),
+                      'games': writer.next_game}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Unittests for the self-play pipeline.
+"""
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from game_interface import playable_games, usable_strategies
+from selfplay import ShardWriter, play_game, selfplay
+from stonehenge_batch import decode_state
+from strategy import SearchStats
+
+SETTINGS = {'side': 2, 'games': 12, 'shard_size': 10, 'seed': 3,
+            'explore': 0.5, 'exact_side': 2, 'depth': 3}
+
+
+def read_shards(writer: ShardWriter) -> dict:
+    """
+    Return the arrays of every shard of writer, joined.
+    """
+    shards = [np.load(os.path.join(writer.directory, shard['file']))
+              for shard in writer.shards]
+    return {name: np.concatenate([shard[name] for shard in shards])
+            for name in shards[0].files}
+
+
+class SelfPlayUnitTests(unittest.TestCase):
+    def test_shards_and_labels(self):
+        """
+        Test that shards hold shard_size positions but the last, and that
+        each position is labelled with the value minimax finds for it.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            writer = selfplay(directory, SETTINGS, workers=2)
+            sizes = [shard['positions'] for shard in writer.shards]
+            arrays = read_shards(writer)
+        self.assertTrue(writer.finished)
+        self.assertEqual(set(sizes[:-1]), {SETTINGS['shard_size']})
+        self.assertEqual(sorted(set(arrays['game'].tolist())),
+                         list(range(SETTINGS['games'])))
+        self.assertTrue(arrays['exact'].all())
+        for row in range(len(arrays['value'])):
+            game = playable_games['h'](True, side_length=2)
+            game.current_state = decode_state(
+                arrays['boards'][row], arrays['leys'][row],
+                arrays['p1_turn'][row], 2)
+            stats = SearchStats()
+            usable_strategies['mr'](game, stats=stats)
+            self.assertEqual(arrays['value'][row], stats.value)
+
+    def test_resume(self):
+        """
+        Test that a run stopped part way through a game carries on to write
+        the same positions, once each, as a run that was not stopped.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            whole = read_shards(selfplay(directory, SETTINGS, workers=1))
+        with tempfile.TemporaryDirectory() as directory:
+            stopped = ShardWriter(directory, SETTINGS)
+            for index in range(5):
+                stopped.add(play_game((index, SETTINGS)))
+            self.assertGreater(stopped.skip, 0)
+            resumed = selfplay(directory, SETTINGS, workers=1)
+            self.assertEqual(resumed.next_game, SETTINGS['games'])
+            arrays = read_shards(resumed)
+            self.assertRaises(ValueError, ShardWriter, directory,
+                              dict(SETTINGS, seed=4))
+        for name in whole:
+            np.testing.assert_array_equal(arrays[name], whole[name])
+
+
+if __name__ == "__main__":
+    unittest.main()
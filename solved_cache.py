@@ -0,0 +1,203 @@
+"""
+An on-disk cache of solved positions, shared across runs and processes.
+
+A SolvedCache keeps, for every position a strategy solved exactly, its
+value for the player to move and the best move, in an SQLite database in
+WAL mode: any number of processes can read it while one writes, and
+writes are batched into one transaction per batch_size positions.
+Positions are keyed by their canonical encoding (see strategy_cache), so a
+position solved for one player is solved for the other too.
+
+solved_strategy wraps any minimax-family strategy of strategy to answer
+from the cache, and to add the positions it solves to it.
+
+Example:
+    python analyze.py positions.txt --strategy mr --solved solved.db
+"""
+import json
+import sqlite3
+import threading
+from functools import wraps
+from typing import Any, Callable, Dict, Optional, Tuple
+from strategy import SearchStats
+from strategy_cache import canonical_position
+
+SCHEMA = '''CREATE TABLE IF NOT EXISTS solved (
+    position BLOB PRIMARY KEY,
+    value NUMERIC NOT NULL,
+    move TEXT NOT NULL
+) WITHOUT ROWID'''
+
+
+def load_move(text: str) -> Any:
+    """
+    Return the move stored as the JSON text, with the tuple moves JSON
+    writes as lists (such as those of several piles) made tuples again.
+
+    >>> load_move(json.dumps((2, 9))), load_move(json.dumps('A'))
+    ((2, 9), 'A')
+    """
+    move = json.loads(text)
+    return tuple(move) if isinstance(move, list) else move
+
+
+class SolvedCache:
+    """
+    A cache of solved positions in an SQLite database.
+
+    path - the file of the database
+    batch_size - how many solved positions are written at once
+    hits - the number of lookups that found a solved position
+    misses - the number of lookups that did not
+    writes - the number of solved positions written to the database
+    """
+    path: str
+    batch_size: int
+    hits: int
+    misses: int
+    writes: int
+
+    def __init__(self, path: str, batch_size: int = 100,
+                 timeout: float = 30.0) -> None:
+        """
+        Open the SolvedCache in the database at path, creating it if needed.
+        A write waits up to timeout seconds for other processes' writes.
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.hits = self.misses = self.writes = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=timeout,
+                                           check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        with self._connection:
+            self._connection.execute(SCHEMA)
+
+    def __len__(self) -> int:
+        """
+        Return the number of solved positions in the database, including
+        those not written yet.
+        """
+        with self._lock:
+            self._write()
+            return self._connection.execute(
+                'SELECT COUNT(*) FROM solved').fetchone()[0]
+
+    def __enter__(self) -> 'SolvedCache':
+        """
+        Return this SolvedCache.
+        """
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """
+        Close this SolvedCache.
+        """
+        self.close()
+
+    def get(self, state: Any) -> Optional[Tuple[float, Any]]:
+        """
+        Return the value and best move of state if it was solved, or None.
+        """
+        key = canonical_position(state)
+        with self._lock:
+            found = self._pending.get(key)
+            if found is None:
+                row = self._connection.execute(
+                    'SELECT value, move FROM solved WHERE position = ?',
+                    (key,)).fetchone()
+                if row is not None:
+                    found = row[0], load_move(row[1])
+            if found is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return found
+
+    def put(self, state: Any, value: float, move: Any) -> None:
+        """
+        Record that state is solved with value and best move, writing the
+        batch of positions solved so far once it is full.
+        """
+        with self._lock:
+            self._pending[canonical_position(state)] = (value, move)
+            if len(self._pending) >= self.batch_size:
+                self._write()
+
+    def flush(self) -> None:
+        """
+        Write every solved position not written yet.
+        """
+        with self._lock:
+            self._write()
+
+    def _write(self) -> None:
+        """
+        Write the pending solved positions in one transaction. The lock must
+        be held.
+        """
+        if not self._pending:
+            return
+        with self._connection:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO solved VALUES (?, ?, ?)',
+                [(key, value, json.dumps(move))
+                 for key, (value, move) in self._pending.items()])
+        self.writes += len(self._pending)
+        self._pending.clear()
+
+    def close(self) -> None:
+        """
+        Write every solved position not written yet and close the database.
+        """
+        with self._lock:
+            self._write()
+            self._connection.close()
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Return the counters of this cache as a dictionary.
+        """
+        return {'hits': self.hits, 'misses': self.misses,
+                'writes': self.writes}
+
+
+def solved_strategy(strategy: Callable, cache: SolvedCache) -> Callable:
+    """
+    Return strategy, which must take a stats argument, answering from
+    cache the positions it holds and adding to it the positions strategy
+    solves exactly (see SearchStats.exact).
+
+    >>> from subtract_square_game import SubtractSquareGame
+    >>> from strategy import recursive_minimax_strategy
+    >>> cache = SolvedCache(':memory:')
+    >>> solved = solved_strategy(recursive_minimax_strategy, cache)
+    >>> game = SubtractSquareGame(True, current_total=18)
+    >>> solved(game), solved(game), cache.metrics()
+    (1, 1, {'hits': 1, 'misses': 1, 'writes': 0})
+    """
+    @wraps(strategy)
+    def solved(game: Any, stats: SearchStats = None, **options: Any) -> Any:
+        """
+        Return the move of strategy for game, from cache if it is solved.
+        """
+        found = cache.get(game.current_state)
+        if found is not None:
+            if stats is not None:
+                stats.cache_hits += 1
+                stats.value, stats.exact = found[0], True
+            return found[1]
+        search = stats if stats is not None else SearchStats()
+        search.cache_misses += 1
+        move = strategy(game, stats=search, **options)
+        if search.exact:
+            cache.put(game.current_state, search.value, move)
+        return move
+    return solved
+
+
+if __name__ == "__main__":
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
@@ -0,0 +1,96 @@
+"""
+Unittests for the on-disk cache of solved positions.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from codec import encode_state
+from game_interface import playable_games, usable_strategies
+from solved_cache import SolvedCache, solved_strategy
+from stonehenge import StonehengeState
+from strategy import SearchStats
+
+
+class SolvedCacheUnitTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'solved.db')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_batches_persist_across_processes(self):
+        """
+        Test that solved positions are written a batch at a time, and that
+        another process reads them while this one keeps the database open.
+        """
+        game = playable_games['h'](True, side_length=2)
+        states = [game.current_state.make_move(move)
+                  for move in game.current_state.get_possible_moves()]
+        cache = SolvedCache(self.path, batch_size=3)
+        for state in states[:4]:
+            cache.put(state, 1, 'B')
+        self.assertEqual(cache.writes, 3)
+        self.assertEqual(cache.get(states[3]), (1, 'B'))
+
+        reader = ('from solved_cache import SolvedCache\n'
+                  'from codec import decode_stonehenge\n'
+                  'cache = SolvedCache({!r})\n'
+                  'print(len(cache), cache.get(decode_stonehenge('
+                  'bytes.fromhex({!r}))))').format(
+                      self.path, encode_state(states[0]).hex())
+        output = subprocess.run([sys.executable, '-c', reader],
+                                capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(
+                                    __file__))).stdout
+        self.assertEqual(output.split(), ['3', '(1,', "'B')"])
+        cache.close()
+
+        with SolvedCache(self.path) as cache:
+            self.assertEqual(len(cache), 4)
+
+    def test_solved_strategy(self):
+        """
+        Test that a position solved for one player is answered from the cache
+        for the other, and that estimated results are not kept.
+        """
+        with SolvedCache(self.path) as cache:
+            solve = solved_strategy(usable_strategies['mr'], cache)
+            game = playable_games['h'](True, side_length=2)
+            game.current_state = game.current_state.make_move('A')
+            move = solve(game)
+
+            game = playable_games['h'](False, side_length=2)
+            game.current_state = game.current_state.make_move('A')
+            stats = SearchStats()
+            self.assertEqual(solve(game, stats=stats), move)
+            self.assertEqual((stats.cache_hits, stats.nodes), (1, 0))
+            self.assertTrue(stats.exact)
+
+            estimate = solved_strategy(usable_strategies['md'], cache)
+            game.current_state = StonehengeState(True, 3)
+            estimate(game, depth=1)
+            self.assertEqual(len(cache), 1)
+
+    def test_tuple_moves(self):
+        """
+        Test that the tuple moves of several piles are read back as legal
+        moves, not lists.
+        """
+        game = playable_games['m'](True, [3, 4])
+        with SolvedCache(self.path) as cache:
+            move = solved_strategy(usable_strategies['mr'], cache)(game)
+        with SolvedCache(self.path) as cache:
+            stats = SearchStats()
+            cached = solved_strategy(usable_strategies['mr'], cache)(
+                game, stats=stats)
+        self.assertEqual(stats.cache_hits, 1)
+        self.assertEqual(cached, move)
+        self.assertTrue(game.current_state.is_valid_move(cached))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,270 @@
+"""
+A full solver that checkpoints its progress and resumes after a crash.
+
+Solver searches every line of play like iterative_minimax_strategy, with
+an explicit stack, but depth first: the stack holds one Frame per move
+ahead, with the scores of the moves searched so far, and solved positions
+are kept in a TranspositionTable. Every interval seconds the stack, the
+table and the statistics are pickled to a checkpoint file, written to a
+temporary file first and renamed over the old one so that a crash never
+leaves a partial checkpoint. A Solver loaded from the checkpoint carries on
+where it stopped and finds the same move and value.
+
+Example:
+    python solver.py --game h --size 3 --moves A,L --checkpoint solve.ckpt
+    (run it again after a crash or SIGTERM to resume)
+"""
+import argparse
+import json
+import os
+import pickle
+import signal
+import sys
+import time
+from typing import Any, List, Tuple
+from analyze import make_game
+from codec import encode_state
+from game_interface import playable_games, game_size_options
+from strategy import SearchStats, TranspositionTable, help_score_over
+from strategy_cache import canonical_position
+
+CHECKPOINT_VERSION = 1
+# How many positions are searched between looks at the clock.
+CHECK_STEPS = 4096
+
+
+class Frame:
+    """
+    A position on the stack of a Solver.
+
+    state - the position
+    moves - the moves of the player to move in state
+    scores - the scores for that player of the first moves searched so far
+    """
+    state: Any
+    moves: list
+    scores: List[float]
+
+    def __init__(self, state: Any) -> None:
+        """
+        Create a new Frame of state with no moves searched.
+        """
+        self.state = state
+        self.moves = state.get_possible_moves()
+        self.scores = []
+
+    def done(self) -> bool:
+        """
+        Return whether the score of state is known: every move has been
+        searched, or one wins.
+        """
+        return len(self.scores) == len(self.moves) or (
+            bool(self.scores) and self.scores[-1] == self.state.WIN)
+
+
+class Solver:
+    """
+    A depth-first solver of the current state of a game.
+
+    game - the game whose current state is solved
+    table - the scores of the positions solved so far, by canonical position
+    stats - the record of the search, including the part before a resume
+    resumed - whether this Solver was loaded from a checkpoint
+    """
+    game: Any
+    table: TranspositionTable
+    stats: SearchStats
+    resumed: bool
+
+    def __init__(self, game: Any, cache_size: int = 1000000) -> None:
+        """
+        Create a new Solver of game that keeps the scores of up to cache_size
+        positions.
+        """
+        self.game = game
+        self.table = TranspositionTable(cache_size)
+        self.stats = SearchStats()
+        self.resumed = False
+        self._root = encode_state(game.current_state)
+        self._stack = [Frame(game.current_state)]
+        if game.is_over(game.current_state):
+            self.stats.visit(0)
+        else:
+            self.stats.visit(0, len(self._stack[0].moves))
+
+    @property
+    def finished(self) -> bool:
+        """
+        Return whether the current state of game is solved.
+        """
+        return self._stack[0].done()
+
+    def result(self) -> Tuple[Any, float]:
+        """
+        Return the best move and its score for the player to move, once
+        finished, or None and the score if the game is already over.
+        """
+        root = self._stack[0]
+        if self.game.is_over(root.state):
+            return None, help_score_over(self.game, root.state)
+        value = max(root.scores)
+        return root.moves[root.scores.index(value)], value
+
+    def run(self, steps: int = None) -> bool:
+        """
+        Search for at most steps positions (without limit if steps is None)
+        and return whether the current state of game is solved.
+        """
+        stack = self._stack
+        while steps is None or steps > 0:
+            frame = stack[-1]
+            if frame.done():
+                if len(stack) == 1:
+                    return True
+                stack.pop()
+                score = max(frame.scores)
+                self.table.put(canonical_position(frame.state), score)
+                stack[-1].scores.append(-score)
+                continue
+            if steps is not None:
+                steps -= 1
+            child = frame.state.make_move(frame.moves[len(frame.scores)])
+            score = self.table.get(canonical_position(child), self.stats)
+            if score is None and self.game.is_over(child):
+                self.stats.visit(len(stack))
+                score = help_score_over(self.game, child)
+            if score is not None:
+                frame.scores.append(-score)
+            else:
+                stack.append(Frame(child))
+                self.stats.visit(len(stack) - 1, len(stack[-1].moves))
+        return self.finished
+
+    def save(self, path: str) -> None:
+        """
+        Write a checkpoint of this Solver to path atomically.
+        """
+        temporary = path + '.tmp'
+        with open(temporary, 'wb') as checkpoint:
+            pickle.dump({'version': CHECKPOINT_VERSION, 'root': self._root,
+                         'stack': self._stack, 'table': self.table,
+                         'stats': self.stats}, checkpoint,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+            checkpoint.flush()
+            os.fsync(checkpoint.fileno())
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, game: Any, path: str) -> 'Solver':
+        """
+        Return the Solver of game checkpointed at path. Raise ValueError if
+        the checkpoint is of another position.
+        """
+        with open(path, 'rb') as checkpoint:
+            saved = pickle.load(checkpoint)
+        if saved.get('version') != CHECKPOINT_VERSION:
+            raise ValueError('{} is not a version {} checkpoint'.format(
+                path, CHECKPOINT_VERSION))
+        if saved['root'] != encode_state(game.current_state):
+            raise ValueError('{} is a checkpoint of another position'.format(
+                path))
+        solver = cls.__new__(cls)
+        solver.game = game
+        solver.table = saved['table']
+        solver.stats = saved['stats']
+        solver.resumed = True
+        solver._root = saved['root']
+        solver._stack = saved['stack']
+        return solver
+
+
+def solve(game: Any, checkpoint: str = None, interval: float = 60.0,
+          cache_size: int = 1000000) -> Solver:
+    """
+    Return a finished Solver of the current state of game.
+
+    If checkpoint is given, the solve resumes from it if it exists, is
+    saved to it every interval seconds and when interrupted, and it is
+    removed once the solve finishes.
+    """
+    if checkpoint is not None and os.path.exists(checkpoint):
+        solver = Solver.load(game, checkpoint)
+    else:
+        solver = Solver(game, cache_size)
+    start = time.perf_counter()
+    elapsed = solver.stats.elapsed
+    saved_at = start
+    try:
+        while not solver.run(CHECK_STEPS):
+            now = time.perf_counter()
+            solver.stats.elapsed = elapsed + now - start
+            if checkpoint is not None and now - saved_at >= interval:
+                solver.save(checkpoint)
+                saved_at = now
+    except KeyboardInterrupt:
+        if checkpoint is not None:
+            solver.stats.elapsed = elapsed + time.perf_counter() - start
+            solver.save(checkpoint)
+        raise
+    solver.stats.elapsed = elapsed + time.perf_counter() - start
+    solver.stats.value = solver.result()[1]
+    solver.stats.exact = True
+    if checkpoint is not None and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return solver
+
+
+def main(argv: List[str] = None) -> None:
+    """
+    Solve a position from the command line and print the result as JSON.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--game', choices=list(playable_games), default='h')
+    parser.add_argument('--size', type=int,
+                        help='the side length or starting total of the game')
+    parser.add_argument('--first', choices=['p1', 'p2'], default='p1')
+    parser.add_argument('--moves', default='',
+                        help='comma-separated moves made before the '
+                             'position to solve')
+    parser.add_argument('--position', metavar='HEX',
+                        help='the codec encoding of the position to solve, '
+                             'instead of --size, --first and --moves')
+    parser.add_argument('--checkpoint', metavar='PATH',
+                        help='resume from and save progress to PATH')
+    parser.add_argument('--interval', type=float, default=60.0,
+                        metavar='SECONDS', help='time between checkpoints')
+    parser.add_argument('--cache-size', type=int, default=1000000,
+                        metavar='POSITIONS')
+    args = parser.parse_args(argv)
+
+    if args.position:
+        game = make_game(args.game, bytes.fromhex(args.position))
+    elif args.size is None:
+        parser.error('--size or --position is needed')
+    else:
+        game = playable_games[args.game](
+            args.first == 'p1', **{game_size_options[args.game]: args.size})
+        for move in filter(None, args.moves.split(',')):
+            game.current_state = game.current_state.make_move(
+                game.str_to_move(move.strip()))
+
+    def interrupt(*_: Any) -> None:
+        """
+        Stop the solve as if interrupted from the keyboard.
+        """
+        raise KeyboardInterrupt()
+    signal.signal(signal.SIGTERM, interrupt)
+    try:
+        solver = solve(game, args.checkpoint, args.interval, args.cache_size)
+    except KeyboardInterrupt:
+        sys.exit('Interrupted{}'.format(
+            '; saved to ' + args.checkpoint if args.checkpoint else ''))
+    move, value = solver.result()
+    print(json.dumps({'position': encode_state(game.current_state).hex(),
+                      'move': move, 'value': value,
+                      'resumed': solver.resumed,
+                      'stats': solver.stats.as_dict()}))
+
+
+if __name__ == "__main__":
+    main()
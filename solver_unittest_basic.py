@@ -0,0 +1,72 @@
+"""
+Unittests for the checkpointed solver.
+"""
+import os
+import tempfile
+import unittest
+
+from game_interface import playable_games, usable_strategies
+from solver import Solver, solve
+from strategy import SearchStats
+
+
+class SolverUnitTests(unittest.TestCase):
+    def test_solve_agrees_with_minimax(self):
+        """
+        Test that the solver finds the move and value recursive minimax
+        does.
+        """
+        games = [playable_games['s'](True, current_total=total)
+                 for total in [12, 18, 25, 30]]
+        game = playable_games['h'](False, side_length=2)
+        game.current_state = game.current_state.make_move('C')
+        games.append(game)
+        for game in games:
+            stats = SearchStats()
+            move = usable_strategies['mr'](game, stats=stats)
+            self.assertEqual(solve(game).result(), (move, stats.value))
+
+    def test_game_over(self):
+        """
+        Test that solving a position where the game is already over gives
+        no move and the score of the player to move (who has already won
+        the Stonehenge board).
+        """
+        game = playable_games['s'](True, current_total=0)
+        self.assertEqual(solve(game).result(), (None, game.current_state.LOSE))
+        game = playable_games['h'](True, side_length=1)
+        game.current_state = game.current_state.make_move('A').make_move('B')
+        solver = solve(game)
+        self.assertEqual(solver.result(), (None, game.current_state.WIN))
+        self.assertEqual(solver.stats.terminal, 1)
+
+    def test_resume_from_checkpoint(self):
+        """
+        Test that a solve stopped part way, saved and loaded finds the same
+        result after searching the same positions as an unstopped one.
+        """
+        game = playable_games['h'](True, side_length=3)
+        for move in ['A', 'L', 'F']:
+            game.current_state = game.current_state.make_move(move)
+        whole = solve(game)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'solve.ckpt')
+            stopped = Solver(game)
+            self.assertFalse(stopped.run(300))
+            stopped.save(path)
+            self.assertEqual(os.listdir(directory), ['solve.ckpt'])
+
+            other = playable_games['h'](True, side_length=3)
+            self.assertRaises(ValueError, Solver.load, other, path)
+
+            resumed = solve(game, checkpoint=path)
+            self.assertTrue(resumed.resumed)
+            self.assertFalse(os.path.exists(path))
+        self.assertEqual(resumed.result(), whole.result())
+        self.assertEqual(resumed.stats.nodes, whole.stats.nodes)
+        self.assertEqual(resumed.stats.terminal, whole.stats.terminal)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,26 +1,46 @@
 """
 An implementation of game and state for Stonehenge.
+
+The states make_move returns are interned: equal positions reached by
+different move orders are the same object for as long as anything holds
+them, so search trees keep one copy of each position and transpositions
+can be found by identity. Interned states must not be changed.
 """
-from typing import Any
+import re
+import weakref
+from typing import Any, Iterable, Iterator, List, Tuple
 from game import Game
 from game_state import GameState
 
+# The cells and ley-line markers of a board drawn like StonehengeState.__str__
+BOARD_TOKEN = re.compile(r'[A-Z12@]')
+
 
 class StonehengeGame(Game):
     """
     StonehengeGame to be played with two players.
     """
 
-    def __init__(self, p1_starts: bool) -> None:
+    def __init__(self, p1_starts: bool, side_length: int = None) -> None:
         """
         Initialize this StonehengeGame, using p1_starts to find
         who the first player is.
+
+        The side length of the board is asked for interactively unless
+        side_length is given.
+
+        >>> StonehengeGame(True, side_length=1).current_state.lines
+        ['AB', 'C']
         """
-        side = ''
-        while not (side.isdigit() and 6 > int(side) > 0):
-            side = input("Enter the side length of board:")
-        side = int(side)
-        self.current_state = StonehengeState(p1_starts, side)
+        if side_length is None:
+            side = ''
+            while not (side.isdigit() and 6 > int(side) > 0):
+                side = input("Enter the side length of board:")
+            side_length = int(side)
+        elif not 6 > side_length > 0:
+            raise ValueError("The side length of the board must be between "
+                             "1 and 5, not {}".format(side_length))
+        self.current_state = StonehengeState(p1_starts, side_length)
 
     def get_instructions(self) -> str:
         """
@@ -81,10 +101,13 @@ class StonehengeState(GameState):
         LOSE - score if player is in a losing position
         DRAW - score if player is in a tied position
         p1_turn - whether it is p1's turn or not
+        interned - whether this state is the one shared by all equal states
+                   make_move returns
         """
     WIN: int = 1
     LOSE: int = -1
     DRAW: int = 0
+    interned: bool = False
     p1_turn: bool
     side_length = int
     lines: list
@@ -263,13 +286,17 @@ class StonehengeState(GameState):
 
     def make_move(self, move: Any) -> 'StonehengeState':
         """
-        Return the StonehengeState that results from applying move
+        Return the interned StonehengeState that results from applying move
         to this StonehengeState.
 
         >>> a = StonehengeState(True, 1)
         >>> b = a.make_move('A')
         >>> b.lines == ['1B', 'C']
         True
+        >>> c = StonehengeState(True, 2)
+        >>> c.make_move('A').make_move('G').make_move('B') is \\
+        ...     c.make_move('B').make_move('G').make_move('A')
+        True
         """
         new_state = StonehengeState(not self.p1_turn, self.side_length)
         new_state.lines = []
@@ -285,7 +312,25 @@ class StonehengeState(GameState):
                     nline += '2'
             new_state.lines.append(nline)
         new_state.ley_line = self.help_complete_ley_mark(new_state.lines)
-        return new_state
+        return intern_state(new_state)
+
+    def __getstate__(self) -> dict:
+        """
+        Return the attributes of this state to pickle or copy. A copy is
+        never interned.
+        """
+        attributes = self.__dict__.copy()
+        attributes.pop('interned', None)
+        return attributes
+
+    def position_key(self) -> Tuple[bool, str, str]:
+        """
+        Return a key equal for exactly the states equal to this one.
+
+        >>> StonehengeState(False, 1).make_move('B').position_key()
+        (True, 'A2C', '2@@2@2')
+        """
+        return self.p1_turn, ''.join(self.lines), ''.join(self.ley_line)
 
     def help_complete_ley_mark(self, lines: list) -> list:
         """
@@ -416,6 +461,170 @@ class StonehengeState(GameState):
             return self.LOSE
 
 
+# The interned states, by position_key. An entry goes once no search holds
+# its state any more.
+_INTERNED = weakref.WeakValueDictionary()
+
+
+def intern_state(state: StonehengeState) -> StonehengeState:
+    """
+    Return the interned state equal to state, interning state if there is
+    none. state must not be changed afterwards.
+
+    >>> a = StonehengeState(True, 1)
+    >>> intern_state(a) is a, intern_state(StonehengeState(True, 1)) is a
+    (True, True)
+    """
+    key = state.position_key()
+    shared = _INTERNED.get(key)
+    if shared is None:
+        state.interned = True
+        shared = _INTERNED.setdefault(key, state)
+    return shared
+
+
+def interned_count() -> int:
+    """
+    Return the number of interned states alive.
+    """
+    return len(_INTERNED)
+
+
+_LEY_ORDER = {}
+
+
+def board_ley_order(side_length: int) -> List[int]:
+    """
+    Return the index in ley_line of each ley-line marker of a drawn board
+    with side_length, in the order the markers are read (row by row, left to
+    right).
+
+    >>> board_ley_order(1)
+    [2, 3, 0, 1, 5, 4]
+    """
+    if side_length not in _LEY_ORDER:
+        state = StonehengeState(True, side_length)
+        # Draw each marker as the lowercase letter of its index.
+        state.ley_line = [chr(ord('a') + i)
+                          for i in range(len(state.ley_line))]
+        order = [ord(token) - ord('a')
+                 for token in re.findall(r'[a-z]', str(state))]
+        _LEY_ORDER[side_length] = order
+    return _LEY_ORDER[side_length]
+
+
+def parse_board(text: str, p1_turn: bool = None,
+                p1_starts: bool = True) -> StonehengeState:
+    """
+    Return the StonehengeState drawn in text, laid out like
+    StonehengeState.__str__ (or the boards of the unittests) for any side
+    length.
+
+    Unless p1_turn is given, whose turn it is comes from the number of cells
+    each player holds, and p1_starts breaks a tie. Raise ValueError if text
+    is not a board or its ley-line markers do not match its cells.
+
+    >>> a = StonehengeState(False, 2).make_move('A').make_move('G')
+    >>> repr(parse_board(str(a), p1_starts=False)) == repr(a)
+    True
+    """
+    rows = [BOARD_TOKEN.findall(line) for line in text.split('\n')]
+    rows = [row for row in rows if row]
+    side_length = len(rows) - 3
+    if not 1 <= side_length <= 5:
+        raise ValueError('A board has 4 to 8 rows of markers and cells, '
+                         'not {}'.format(len(rows)))
+    markers = list(rows[0])
+    cells = []
+    for i in range(1, len(rows) - 1):
+        markers.append(rows[i][0])
+        if i != side_length:
+            markers.append(rows[i][-1])
+            cells.extend(rows[i][1:-1])
+        else:
+            cells.extend(rows[i][1:])
+    markers.extend(rows[-1])
+
+    state = StonehengeState(True, side_length)
+    letters = ''.join(state.lines)
+    order = board_ley_order(side_length)
+    if len(cells) != len(letters) or len(markers) != len(order):
+        raise ValueError('A board with side length {} has {} cells and {} '
+                         'ley-lines'.format(side_length, len(letters),
+                                            len(order)))
+    for cell, letter in zip(cells, letters):
+        if cell not in (letter, '1', '2'):
+            raise ValueError('Cell {} cannot be {}'.format(letter, cell))
+    for marker in markers:
+        if marker not in '@12':
+            raise ValueError('{} is not a ley-line marker'.format(marker))
+
+    claimed = ''.join(cells)
+    state.lines = []
+    for line in StonehengeState(True, side_length).lines:
+        state.lines.append(claimed[:len(line)])
+        claimed = claimed[len(line):]
+    ley_line = [''] * len(order)
+    for marker, index in zip(markers, order):
+        ley_line[index] = marker
+    check_ley_lines(state, ley_line)
+    state.ley_line = ley_line
+
+    if p1_turn is None:
+        difference = cells.count('1') - cells.count('2')
+        if abs(difference) > 1:
+            raise ValueError('Player 1 holds {} cells more than Player '
+                             '2'.format(difference))
+        p1_turn = p1_starts if difference == 0 else difference < 0
+    state.p1_turn = p1_turn
+    return state
+
+
+def check_ley_lines(state: StonehengeState, ley_line: List[str]) -> None:
+    """
+    Raise ValueError unless every ley-line claimed in ley_line holds at least
+    half of its cells for its owner, and every unclaimed one holds less than
+    half for both players, on the board of state.
+    """
+    holds = {}
+    for player, other in [('1', '2'), ('2', '1')]:
+        lines = [line.replace(other, '.') for line in state.lines]
+        holds[player] = state.help_complete_ley_mark(lines)
+    for index, marker in enumerate(ley_line):
+        if marker == '@':
+            wrong = holds['1'][index] != '@' or holds['2'][index] != '@'
+        else:
+            wrong = holds[marker][index] != marker
+        if wrong:
+            raise ValueError('Ley-line {} cannot be {} with these '
+                             'cells'.format(index, marker))
+
+
+def iter_boards(lines: Iterable[str], p1_starts: bool = True) \
+        -> Iterator[StonehengeState]:
+    """
+    Yield the StonehengeState of every board in lines, such as an open file,
+    one at a time. Boards are separated by blank lines; lines starting with
+    '#' are skipped.
+
+    >>> text = str(StonehengeState(True, 1)) + '\\n\\n' + \\
+    ...     str(StonehengeState(True, 2))
+    >>> [s.side_length for s in iter_boards(text.split('\\n'))]
+    [1, 2]
+    """
+    board = []
+    for line in lines:
+        if line.startswith('#'):
+            continue
+        if line.strip():
+            board.append(line)
+        elif board:
+            yield parse_board('\n'.join(board), p1_starts=p1_starts)
+            board = []
+    if board:
+        yield parse_board('\n'.join(board), p1_starts=p1_starts)
+
+
 if __name__ == "__main__":
     from python_ta import check_all
     # import doctest
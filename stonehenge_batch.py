@@ -0,0 +1,216 @@
+"""
+Batched NumPy evaluation of many Stonehenge positions.
+
+A batch holds N positions with the same side length as three arrays:
+    boards - an (N x cells) int8 array of cell owners (EMPTY, P1 or P2),
+             with cells in the order 'A', 'B', 'C', ...
+    leys - an (N x ley-lines) int8 array of ley-line owners in the same
+           order as StonehengeState.ley_line
+    p1_turn - a length N bool array of whose turn it is
+
+Ley-line counts for every position are computed at once through a
+precomputed cell x ley-line incidence matrix.
+"""
+from functools import lru_cache
+from typing import Iterable, Tuple
+import numpy as np
+from stonehenge import StonehengeState
+
+EMPTY = 0
+P1 = 1
+P2 = 2
+# The ley-line marker (or cell claim) used by StonehengeState for each code.
+MARKERS = '@12'
+
+
+@lru_cache(maxsize=None)
+def ley_line_cells(side_length: int) -> Tuple[Tuple[int, ...], ...]:
+    """
+    Return the cell indices of every ley-line of a board with side_length,
+    in the same order as StonehengeState.ley_line.
+
+    >>> ley_line_cells(1)
+    ((0, 1), (2,), (0,), (1, 2), (0, 2), (1,))
+    """
+    rows = []
+    start = 0
+    for line in StonehengeState(True, side_length).lines:
+        rows.append(list(range(start, start + len(line))))
+        start += len(line)
+    groups = [tuple(row) for row in rows]
+    # Down-right ley-lines: the last row is shifted right by one cell.
+    shifted = rows[:-1] + [[None] + rows[-1]]
+    for a in range(side_length + 1):
+        groups.append(tuple(row[a] for row in shifted
+                            if a < len(row) and row[a] is not None))
+    # Down-left ley-lines: every row but the last is padded on the left.
+    padded = [[None] * (side_length - 1 - b) + rows[b]
+              for b in range(side_length)] + [rows[-1] + [None]]
+    for c in range(side_length + 1):
+        groups.append(tuple(row[c] for row in padded
+                            if row[c] is not None))
+    return tuple(groups)
+
+
+@lru_cache(maxsize=None)
+def incidence_matrix(side_length: int) -> np.ndarray:
+    """
+    Return the (cells x ley-lines) float32 matrix whose entry is 1 when the
+    cell lies on the ley-line.
+
+    >>> incidence_matrix(1).astype(int).tolist()
+    [[1, 0, 1, 0, 1, 0], [1, 0, 0, 1, 0, 1], [0, 1, 0, 1, 1, 0]]
+    """
+    groups = ley_line_cells(side_length)
+    cells = sum(len(line) for line in StonehengeState(True,
+                                                      side_length).lines)
+    matrix = np.zeros((cells, len(groups)), dtype=np.float32)
+    for ley, group in enumerate(groups):
+        matrix[list(group), ley] = 1
+    matrix.setflags(write=False)
+    return matrix
+
+
+@lru_cache(maxsize=None)
+def ley_line_lengths(side_length: int) -> np.ndarray:
+    """
+    Return the number of cells on each ley-line of a board with
+    side_length.
+
+    >>> ley_line_lengths(1).tolist()
+    [2, 1, 1, 2, 2, 1]
+    """
+    lengths = incidence_matrix(side_length).sum(axis=0).astype(np.int16)
+    lengths.setflags(write=False)
+    return lengths
+
+
+def encode_states(states: Iterable[StonehengeState]) \
+        -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Return the (boards, leys, p1_turn) arrays of states, which must all have
+    the same side length.
+
+    >>> a = StonehengeState(True, 1).make_move('A')
+    >>> boards, leys, p1_turn = encode_states([a])
+    >>> boards.tolist(), leys.tolist(), p1_turn.tolist()
+    ([[1, 0, 0]], [[1, 0, 1, 0, 1, 0]], [False])
+    """
+    states = list(states)
+    if not states:
+        raise ValueError('Cannot encode an empty batch of states')
+    side_length = states[0].side_length
+    codes = {MARKERS[P1]: P1, MARKERS[P2]: P2}
+    cells = ''.join(states[0].lines)
+    boards = np.zeros((len(states), len(cells)), dtype=np.int8)
+    leys = np.zeros((len(states), len(states[0].ley_line)), dtype=np.int8)
+    p1_turn = np.zeros(len(states), dtype=bool)
+    for i, state in enumerate(states):
+        if state.side_length != side_length:
+            raise ValueError('All states in a batch need the same side '
+                             'length')
+        boards[i] = [codes.get(cell, EMPTY) for cell in ''.join(state.lines)]
+        leys[i] = [codes.get(mark, EMPTY) for mark in state.ley_line]
+        p1_turn[i] = state.p1_turn
+    return boards, leys, p1_turn
+
+
+def decode_state(board: np.ndarray, leys: np.ndarray, p1_turn: bool,
+                 side_length: int) -> StonehengeState:
+    """
+    Return the StonehengeState for one row of a batch.
+
+    >>> a = StonehengeState(False, 2).make_move('D')
+    >>> repr(decode_state(*[x[0] for x in encode_states([a])], 2)) == repr(a)
+    True
+    """
+    state = StonehengeState(bool(p1_turn), side_length)
+    letters = ''.join(state.lines)
+    cells = ''.join(letter if code == EMPTY else MARKERS[code]
+                    for letter, code in zip(letters, board.tolist()))
+    state.lines = []
+    for line in StonehengeState(True, side_length).lines:
+        state.lines.append(cells[:len(line)])
+        cells = cells[len(line):]
+    state.ley_line = [MARKERS[code] for code in leys.tolist()]
+    return state
+
+
+def ley_line_counts(boards: np.ndarray, side_length: int) \
+        -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return the number of cells each player holds on every ley-line of
+    every board, as two (N x ley-lines) arrays.
+    """
+    matrix = incidence_matrix(side_length)
+    p1_counts = (boards == P1).astype(np.float32) @ matrix
+    p2_counts = (boards == P2).astype(np.float32) @ matrix
+    return p1_counts.astype(np.int16), p2_counts.astype(np.int16)
+
+
+def ley_line_owners(boards: np.ndarray, side_length: int,
+                    leys: np.ndarray = None) -> np.ndarray:
+    """
+    Return the owner of every ley-line of every board.
+
+    Ley-lines already claimed in leys keep their owner, exactly like
+    StonehengeState.help_add_ley_mark. Without leys, a ley-line where both
+    players hold at least half of the cells goes to Player 1.
+
+    >>> a = StonehengeState(True, 1).make_move('A')
+    >>> boards, leys, _ = encode_states([a])
+    >>> ley_line_owners(boards, 1).tolist()
+    [[1, 0, 1, 0, 1, 0]]
+    """
+    p1_counts, p2_counts = ley_line_counts(boards, side_length)
+    lengths = ley_line_lengths(side_length)
+    owners = np.where(2 * p1_counts >= lengths, P1,
+                      np.where(2 * p2_counts >= lengths, P2, EMPTY))
+    owners = owners.astype(np.int8)
+    if leys is not None:
+        owners = np.where(leys != EMPTY, leys, owners).astype(np.int8)
+    return owners
+
+
+def evaluate(boards: np.ndarray, side_length: int, leys: np.ndarray = None,
+             p1_turn: np.ndarray = None) \
+        -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Return the (terminal, winners, scores) arrays of a batch of positions.
+
+    terminal - whether the game is over at each position
+    winners - P1 or P2 for positions that are over, EMPTY otherwise
+    scores - a heuristic in [LOSE, WIN] for the player to move: the
+             difference in claimed ley-lines as a fraction of the ley-lines
+             needed to win, or WIN/LOSE for positions that are over
+
+    Without p1_turn, the scores are from Player 1's point of view.
+
+    >>> a = StonehengeState(True, 1).make_move('A')
+    >>> boards, leys, p1_turn = encode_states([a])
+    >>> terminal, winners, scores = evaluate(boards, 1, leys, p1_turn)
+    >>> terminal.tolist(), winners.tolist(), scores.tolist()
+    ([True], [1], [-1.0])
+    """
+    owners = ley_line_owners(boards, side_length, leys)
+    total = owners.shape[1]
+    p1_lines = np.count_nonzero(owners == P1, axis=1)
+    p2_lines = np.count_nonzero(owners == P2, axis=1)
+    p1_won = 2 * p1_lines >= total
+    p2_won = 2 * p2_lines >= total
+    terminal = p1_won | p2_won
+    winners = np.where(p1_won, P1, np.where(p2_won, P2, EMPTY))
+    winners = winners.astype(np.int8)
+
+    needed = (total + 1) // 2
+    scores = (p1_lines - p2_lines) / needed
+    scores = np.where(p1_won, StonehengeState.WIN,
+                      np.where(p2_won, StonehengeState.LOSE, scores))
+    if p1_turn is not None:
+        scores = np.where(p1_turn, scores, -scores)
+    return terminal, winners, scores.astype(np.float64)
+
+
+if __name__ == "__main__":
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
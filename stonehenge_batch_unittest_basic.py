@@ -0,0 +1,100 @@
+"""
+Unittests for the batched NumPy evaluation of Stonehenge positions.
+
+Every batched result is checked against the one-state-at-a-time
+StonehengeState/StonehengeGame implementation on random games.
+"""
+import random
+import unittest
+
+import numpy as np
+
+from game_interface import playable_games
+from stonehenge import StonehengeState
+import stonehenge_batch
+StonehengeGame = playable_games['h']
+
+
+def random_positions(side_length, games, seed):
+    """
+    Return every position reached in games random games of Stonehenge.
+    """
+    rng = random.Random(seed)
+    positions = []
+    for _ in range(games):
+        state = StonehengeState(rng.random() < 0.5, side_length)
+        positions.append(state)
+        while state.get_possible_moves():
+            state = state.make_move(rng.choice(state.get_possible_moves()))
+            positions.append(state)
+    return positions
+
+
+class StonehengeBatchUnitTests(unittest.TestCase):
+    def test_owners_match_engine(self):
+        """
+        Test that recomputing ley-line owners from the boards and the
+        previous markers gives the markers make_move produced.
+        """
+        for side in range(1, 6):
+            positions = random_positions(side, 20, side)
+            boards, leys, _ = stonehenge_batch.encode_states(positions)
+            owners = stonehenge_batch.ley_line_owners(boards, side, leys)
+            self.assertTrue(np.array_equal(owners, leys),
+                            "Ley-line owners should match the markers of "
+                            "side length {}.".format(side))
+
+    def test_owners_from_previous_markers(self):
+        """
+        Test that the owners of a board after a move, computed from the
+        markers before the move, match help_complete_ley_mark.
+        """
+        for side in range(1, 6):
+            for state in random_positions(side, 5, 10 + side):
+                for move in state.get_possible_moves():
+                    after = state.make_move(move)
+                    boards, _, _ = stonehenge_batch.encode_states([after])
+                    _, before, _ = stonehenge_batch.encode_states([state])
+                    owners = stonehenge_batch.ley_line_owners(boards, side,
+                                                              before)
+                    markers = [stonehenge_batch.MARKERS[code]
+                               for code in owners[0].tolist()]
+                    self.assertEqual(markers, after.ley_line)
+
+    def test_terminal_and_winners_match_game(self):
+        """
+        Test that the terminal flags and winners match StonehengeGame.
+        """
+        for side in range(1, 6):
+            game = StonehengeGame(True, side_length=side)
+            positions = random_positions(side, 20, 20 + side)
+            boards, leys, p1_turn = stonehenge_batch.encode_states(positions)
+            terminal, winners, scores = stonehenge_batch.evaluate(
+                boards, side, leys, p1_turn)
+            for i, state in enumerate(positions):
+                game.current_state = state
+                self.assertEqual(bool(terminal[i]), game.is_over(state))
+                if terminal[i]:
+                    expected = stonehenge_batch.P1 if game.is_winner('p1') \
+                        else stonehenge_batch.P2
+                    self.assertEqual(winners[i], expected)
+                    self.assertEqual(scores[i], state.LOSE)
+                else:
+                    self.assertEqual(winners[i], stonehenge_batch.EMPTY)
+                    self.assertTrue(state.LOSE < scores[i] < state.WIN)
+
+    def test_decode_round_trip(self):
+        """
+        Test that decoding an encoded batch gives back equal states.
+        """
+        positions = random_positions(3, 5, 99)
+        boards, leys, p1_turn = stonehenge_batch.encode_states(positions)
+        for i, state in enumerate(positions):
+            decoded = stonehenge_batch.decode_state(boards[i], leys[i],
+                                                    p1_turn[i], 3)
+            self.assertEqual(repr(decoded), repr(state))
+            self.assertEqual(str(decoded), str(state))
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
@@ -0,0 +1,93 @@
+"""
+A vectorized random-playout engine for Stonehenge.
+
+Thousands of random games are played at once, one board row per game,
+using the batch encoding of stonehenge_batch: every ply picks a random
+empty cell for each unfinished game and claims ley-lines for the whole
+batch with one incidence-matrix product.
+"""
+from typing import Iterable, Tuple
+import numpy as np
+from stonehenge import StonehengeState
+from stonehenge_batch import EMPTY, P1, P2, encode_states, evaluate, \
+    ley_line_owners
+
+
+def random_playouts(boards: np.ndarray, leys: np.ndarray,
+                    p1_turn: np.ndarray, side_length: int,
+                    rng: np.random.Generator = None) -> np.ndarray:
+    """
+    Play every position of a batch to the end with uniformly random moves
+    and return the winner (P1 or P2) of each game.
+
+    The arrays passed in are not modified.
+
+    >>> boards, leys, p1_turn = encode_states([StonehengeState(True, 1)])
+    >>> random_playouts(boards, leys, p1_turn, 1).tolist()
+    [1]
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    boards = boards.copy()
+    leys = leys.copy()
+    p1_turn = p1_turn.copy()
+    terminal, winners, _ = evaluate(boards, side_length, leys)
+    rows = np.flatnonzero(~terminal)
+    while rows.size:
+        legal = boards[rows] == EMPTY
+        keys = rng.random(legal.shape)
+        keys[~legal] = -1.0
+        cells = keys.argmax(axis=1)
+        boards[rows, cells] = np.where(p1_turn[rows], P1, P2)
+        leys[rows] = ley_line_owners(boards[rows], side_length, leys[rows])
+        p1_turn[rows] = ~p1_turn[rows]
+        terminal, winners[rows], _ = evaluate(boards[rows], side_length,
+                                              leys[rows])
+        rows = rows[~terminal]
+    return winners
+
+
+def playout_win_rates(states: Iterable[StonehengeState], playouts: int = 1000,
+                      seed: int = None, chunk_size: int = 1 << 16) \
+        -> np.ndarray:
+    """
+    Return, for each of states, the fraction of playouts random playouts
+    won by the player to move in that state.
+
+    All states must have the same side length. At most chunk_size games
+    are held in memory at once.
+
+    >>> playout_win_rates([StonehengeState(True, 1)], 10).tolist()
+    [1.0]
+    """
+    states = list(states)
+    boards, leys, p1_turn = encode_states(states)
+    side_length = states[0].side_length
+    rng = np.random.default_rng(seed)
+    total = len(boards) * playouts
+    wins = np.zeros(total, dtype=bool)
+    for start in range(0, total, chunk_size):
+        stop = min(start + chunk_size, total)
+        index = np.arange(start, stop) // playouts
+        winners = random_playouts(boards[index], leys[index], p1_turn[index],
+                                  side_length, rng)
+        wins[start:stop] = winners == np.where(p1_turn[index], P1, P2)
+    return wins.reshape(len(boards), playouts).mean(axis=1)
+
+
+def playout_outcomes(states: Iterable[StonehengeState], playouts: int = 1000,
+                     seed: int = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return the fraction of playouts won by Player 1 and by Player 2 for
+    each of states.
+    """
+    states = list(states)
+    rates = playout_win_rates(states, playouts, seed)
+    p1_turn = np.array([state.p1_turn for state in states])
+    p1_rates = np.where(p1_turn, rates, 1 - rates)
+    return p1_rates, 1 - p1_rates
+
+
+if __name__ == "__main__":
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
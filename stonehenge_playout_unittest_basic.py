@@ -0,0 +1,51 @@
+"""
+Unittests for the vectorized random-playout engine for Stonehenge.
+"""
+import random
+import unittest
+
+import numpy as np
+
+from stonehenge import StonehengeState
+import stonehenge_batch
+import stonehenge_playout
+from stonehenge_batch_unittest_basic import random_positions
+
+
+class StonehengePlayoutUnitTests(unittest.TestCase):
+    def test_playouts_match_engine_playouts(self):
+        """
+        Test that vectorized random playouts win about as often as random
+        games played through make_move.
+        """
+        rng = random.Random(5)
+        start = StonehengeState(True, 2).make_move('D')
+        wins = 0
+        games = 2000
+        for _ in range(games):
+            state = start
+            while state.get_possible_moves():
+                state = state.make_move(
+                    rng.choice(state.get_possible_moves()))
+            # The player who cannot move has lost.
+            wins += state.p1_turn == start.p1_turn
+        expected = 1 - wins / games
+        actual = stonehenge_playout.playout_win_rates([start], 20000,
+                                                      seed=5)[0]
+        self.assertAlmostEqual(actual, expected, delta=0.05)
+
+    def test_playouts_end_in_terminal_positions(self):
+        """
+        Test that every random playout ends with a winner.
+        """
+        positions = random_positions(4, 3, 7)
+        positions = [p for p in positions if p.get_possible_moves()]
+        boards, leys, p1_turn = stonehenge_batch.encode_states(positions)
+        winners = stonehenge_playout.random_playouts(
+            boards, leys, p1_turn, 4, np.random.default_rng(1))
+        self.assertTrue(np.isin(winners, [stonehenge_batch.P1,
+                                          stonehenge_batch.P2]).all())
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
@@ -11,11 +11,16 @@ the unittests can properly read. i.e. The ley-lines and cells are in the right
 spots and order; yours **do not** have to be formatted in exactly the same
 way.
 """
+import copy
+import gc
 import unittest
 from unittest.mock import patch
 
 # Import the student solution
 from game_interface import playable_games
+from stonehenge import StonehengeState, parse_board, iter_boards, \
+    interned_count
+from minimax_unittest_basic import STONEHENGE_MINIMAX_BOARD
 StonehengeGame = playable_games['h']
 
 # Below are some sample Stonehenge boards for use in the unittests
@@ -542,6 +547,23 @@ class StonehengeUnitTests(unittest.TestCase):
                          "After calling make_move, the current_state of a " +
                          "game should not be changed.")
 
+    def test_make_move_interns_states(self):
+        """
+        Test that make_move returns the same object for equal states reached
+        by different move orders, and lets it go once nothing holds it.
+        """
+        state = StonehengeState(True, 3)
+        state_1 = state.make_move('A').make_move('G').make_move('B')
+        state_2 = state.make_move('B').make_move('G').make_move('A')
+
+        self.assertIs(state_1, state_2)
+        self.assertTrue(state_1.interned)
+        self.assertFalse(copy.copy(state_1).interned)
+        count = interned_count()
+        del state_1, state_2
+        gc.collect()
+        self.assertLess(interned_count(), count)
+
     @patch('builtins.input', side_effect=['1'])
     def test_stonehenge_is_valid_move_false(self, input):
         """
@@ -740,5 +762,65 @@ class StonehengeUnitTests(unittest.TestCase):
                           "player can immediately win but {} was returned " +
                           "instead.").format(ro))
 
+    def test_stonehenge_init_without_input(self):
+        """
+        Test to make sure Stonehenge can be initialized with a side length
+        and without asking for input.
+        """
+        with patch('builtins.input', side_effect=AssertionError):
+            game = StonehengeGame(False, side_length=2)
+
+        self.assertEqual(game.current_state.side_length, 2,
+                         "A game initialized with side_length=2 should have " +
+                         "a board with side length 2.")
+        self.assertEqual(game.current_state.get_current_player_name(), 'p2')
+
+        with self.assertRaises(ValueError):
+            StonehengeGame(True, side_length=6)
+
+    def test_parse_boards(self):
+        """
+        Test that parse_board reads back the sample boards, including the
+        minimax board.
+        """
+        game = StonehengeGame(True, side_length=2)
+        state = game.current_state
+        boards = [BOARD_LENGTH_2, BOARD_LENGTH_2_AFTER_A,
+                  BOARD_LENGTH_2_AFTER_AG, BOARD_LENGTH_2_AFTER_AGD,
+                  BOARD_LENGTH_2_AFTER_AGDE, BOARD_LENGTH_2_AFTER_AGDEF]
+        for board, move in zip(boards, 'AGDEF '):
+            parsed = parse_board(board)
+            self.assertEqual(repr(parsed), repr(state),
+                             "Parsing\n{}\nshould give {!r}".format(board,
+                                                                     state))
+            if move != ' ':
+                state = state.make_move(move)
+
+        state = StonehengeState(False, 3)
+        for move in ['K', 'A', 'C', 'B', 'F', 'E', 'G', 'D', 'I']:
+            state = state.make_move(move)
+        self.assertEqual(repr(parse_board(STONEHENGE_MINIMAX_BOARD)),
+                         repr(state))
+
+    def test_parse_rejects_inconsistent_ley_lines(self):
+        """
+        Test that parse_board rejects boards whose ley-line markers do not
+        match their cells.
+        """
+        with self.assertRaises(ValueError):
+            parse_board(BOARD_LENGTH_2_AFTER_A.replace('  1 - 1', '  @ - 1'))
+        with self.assertRaises(ValueError):
+            parse_board(BOARD_LENGTH_2.replace('@ - C', '1 - C'))
+
+    def test_iter_boards(self):
+        """
+        Test that iter_boards reads every board of a multi-board text.
+        """
+        text = "\n\n".join([BOARD_LENGTH_1, "# a comment", BOARD_LENGTH_2,
+                             BOARD_LENGTH_1_OVER])
+        states = list(iter_boards(text.split("\n")))
+        self.assertEqual([state.side_length for state in states], [1, 2, 1])
+        self.assertTrue(states[2].state_over())
+
 if __name__ == "__main__":
     unittest.main()
@@ -5,11 +5,486 @@ NOTE: Make sure this file adheres to python-ta.
 Adjust the type annotations as needed, and implement both a recursive
 and an iterative version of minimax.
 """
-from typing import Any
+import inspect
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from game_state import GameState
 
 # TODO: Adjust the type annotation as needed.
 
+# How many new search-tree nodes a search makes between memory checks.
+MEMORY_CHECK_NODES = 1024
+# How many moves ahead depth_limited_minimax_strategy looks by default
+# without a time limit.
+DEFAULT_DEPTH = 3
+
+
+class SearchStats:
+    """
+    Statistics about the work one strategy call did to pick a move.
+
+    nodes - the number of states whose moves were generated
+    terminal - the number of leaves of the search: states where the game is
+               over, or that were estimated instead of searched
+    children - the number of states generated from expanded states
+    max_depth - the most moves ahead of the current state that were looked at
+    cache_hits - the number of positions whose result came from a cache
+    cache_misses - the number of positions looked up in a cache but not found
+    elapsed - the number of seconds the search took
+    track_memory - whether searches measure their memory with tracemalloc
+    peak_bytes - the most memory the search had allocated at once
+    live_nodes - the most search-tree nodes the search held at once
+    memory_limited - whether the search ran into its memory limit and fell
+                     back to a depth-limited search
+    value - the score of the chosen move for the player who makes it, or
+            None before the search finishes
+    cancelled - whether the search was stopped by its Deadline before it
+                finished, so that the move is the best found so far
+    exact - whether value is the true score of the position, with nothing
+            estimated or cut short
+    """
+    nodes: int
+    terminal: int
+    children: int
+    max_depth: int
+    cache_hits: int
+    cache_misses: int
+    elapsed: float
+    track_memory: bool
+    peak_bytes: int
+    live_nodes: int
+    memory_limited: bool
+    value: float
+    cancelled: bool
+    exact: bool
+
+    def __init__(self, track_memory: bool = False) -> None:
+        """
+        Create a new SearchStats with every count at zero, which asks
+        searches to measure their memory if track_memory.
+        """
+        self.nodes = 0
+        self.terminal = 0
+        self.children = 0
+        self.max_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.elapsed = 0.0
+        self.track_memory = track_memory
+        self.peak_bytes = 0
+        self.live_nodes = 0
+        self.memory_limited = False
+        self.value = None
+        self.cancelled = False
+        self.exact = False
+
+    @property
+    def branching_factor(self) -> float:
+        """
+        Return the average number of children of an expanded state.
+
+        >>> stats = SearchStats()
+        >>> stats.nodes, stats.children = 2, 5
+        >>> stats.branching_factor
+        2.5
+        """
+        return self.children / self.nodes if self.nodes else 0.0
+
+    @property
+    def nodes_per_sec(self) -> float:
+        """
+        Return the number of states visited (expanded or terminal) per
+        second.
+        """
+        if not self.elapsed:
+            return 0.0
+        return (self.nodes + self.terminal) / self.elapsed
+
+    @property
+    def bytes_per_node(self) -> float:
+        """
+        Return the peak memory of the search per live search-tree node.
+
+        >>> stats = SearchStats()
+        >>> stats.peak_bytes, stats.live_nodes = 1000, 8
+        >>> stats.bytes_per_node
+        125.0
+        """
+        return self.peak_bytes / self.live_nodes if self.live_nodes else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        Return these statistics as a dictionary.
+        """
+        return {'nodes': self.nodes, 'terminal': self.terminal,
+                'children': self.children, 'max_depth': self.max_depth,
+                'branching_factor': self.branching_factor,
+                'cache_hits': self.cache_hits,
+                'cache_misses': self.cache_misses, 'elapsed': self.elapsed,
+                'nodes_per_sec': self.nodes_per_sec,
+                'peak_bytes': self.peak_bytes, 'live_nodes': self.live_nodes,
+                'bytes_per_node': self.bytes_per_node,
+                'memory_limited': self.memory_limited, 'value': self.value,
+                'cancelled': self.cancelled, 'exact': self.exact}
+
+    def visit(self, depth: int, children: int = None) -> None:
+        """
+        Record a visit to a state depth moves ahead, which was expanded into
+        children states, or which was terminal if children is None.
+        """
+        if children is None:
+            self.terminal += 1
+        else:
+            self.nodes += 1
+            self.children += children
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def merge(self, other: 'SearchStats') -> None:
+        """
+        Add the counts of other, the statistics of part of the same search,
+        to these statistics.
+
+        >>> stats, other = SearchStats(), SearchStats()
+        >>> stats.nodes, other.nodes, other.max_depth = 2, 3, 4
+        >>> stats.merge(other)
+        >>> stats.nodes, stats.max_depth
+        (5, 4)
+        """
+        self.nodes += other.nodes
+        self.terminal += other.terminal
+        self.children += other.children
+        self.cache_hits += other.cache_hits
+        self.cache_misses += other.cache_misses
+        self.max_depth = max(self.max_depth, other.max_depth)
+        self.peak_bytes = max(self.peak_bytes, other.peak_bytes)
+        self.live_nodes = max(self.live_nodes, other.live_nodes)
+        self.memory_limited = self.memory_limited or other.memory_limited
+        self.cancelled = self.cancelled or other.cancelled
+
+    def __str__(self) -> str:
+        """
+        Return a one-line summary of these statistics.
+        """
+        summary = ('{} nodes, {} terminal, depth {}, branching {:.2f}, '
+                   'cache {}/{} hits, {:.3f}s ({:,.0f} nodes/s)').format(
+                       self.nodes, self.terminal, self.max_depth,
+                       self.branching_factor, self.cache_hits,
+                       self.cache_hits + self.cache_misses, self.elapsed,
+                       self.nodes_per_sec)
+        if self.peak_bytes:
+            summary += ', {:,} bytes peak ({:,.0f} per node)'.format(
+                self.peak_bytes, self.bytes_per_node)
+        if self.memory_limited:
+            summary += ', memory limited'
+        if self.cancelled:
+            summary += ', cancelled'
+        return summary
+
+
+class Deadline:
+    """
+    A time by which a search must stop, which can also be cancelled early.
+
+    Strategies that take a deadline check it as they search, and once it
+    has expired return the best move found so far.
+
+    at - the time.perf_counter() time of the deadline, or None for no time
+    parent - a Deadline this one also expires with, or None
+    reached - whether a search found this deadline expired
+    """
+    at: Optional[float]
+    parent: Optional['Deadline']
+    reached: bool
+
+    def __init__(self, seconds: float = None,
+                 parent: 'Deadline' = None) -> None:
+        """
+        Create a new Deadline seconds from now (never, if seconds is None),
+        or at the deadline of parent if that is sooner.
+
+        >>> Deadline(60, Deadline(1)).remaining() <= 1
+        True
+        """
+        self.at = None if seconds is None else time.perf_counter() + seconds
+        if parent is not None and parent.at is not None and \
+                (self.at is None or parent.at < self.at):
+            self.at = parent.at
+        self.parent = parent
+        self.reached = False
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        """
+        Expire this deadline now. This is safe to call from another thread.
+        """
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """
+        Return whether this deadline or its parent was cancelled.
+        """
+        return self._cancelled.is_set() or (self.parent is not None and
+                                            self.parent.cancelled)
+
+    def remaining(self) -> Optional[float]:
+        """
+        Return the seconds left before this deadline, or None if it has no
+        time.
+        """
+        if self.at is None:
+            return None
+        return max(0.0, self.at - time.perf_counter())
+
+    def expired(self) -> bool:
+        """
+        Return whether this deadline has passed or was cancelled, and
+        remember that it was reached if so.
+
+        >>> deadline = Deadline()
+        >>> deadline.expired()
+        False
+        >>> deadline.cancel()
+        >>> deadline.expired(), deadline.reached
+        (True, True)
+        """
+        if self.cancelled or (self.at is not None and
+                              time.perf_counter() >= self.at):
+            self.reached = True
+            return True
+        return False
+
+
+class SearchCancelled(Exception):
+    """
+    Raised inside a search whose Deadline expired.
+
+    move - the best move found before the search stopped, or None
+    """
+    move: Any
+
+    def __init__(self, move: Any = None) -> None:
+        """
+        Create a new SearchCancelled with the best move so far.
+        """
+        super().__init__(move)
+        self.move = move
+
+
+class MemoryMeter:
+    """
+    A tracemalloc measurement of the memory allocated since it was created.
+
+    The peak of tracemalloc is only reset if this meter started tracing, so
+    that whoever else is tracing keeps theirs. Until their peak is passed,
+    the peak of this meter is then the memory allocated now.
+
+    limit - the number of bytes the measured search may allocate, or None
+    """
+    limit: int
+
+    def __init__(self, limit: int = None) -> None:
+        """
+        Start measuring, starting tracemalloc if it is not already tracing.
+        """
+        self.limit = limit
+        self._started = not tracemalloc.is_tracing()
+        if self._started:
+            tracemalloc.start()
+        self._base, self._base_peak = tracemalloc.get_traced_memory()
+
+    def current(self) -> int:
+        """
+        Return the number of bytes allocated since this meter was created
+        that are still allocated.
+        """
+        return tracemalloc.get_traced_memory()[0] - self._base
+
+    def peak(self) -> int:
+        """
+        Return the most bytes allocated at once since this meter was
+        created.
+        """
+        current, peak = tracemalloc.get_traced_memory()
+        if peak > self._base_peak:
+            return peak - self._base
+        return max(0, current - self._base)
+
+    def exceeded(self) -> bool:
+        """
+        Return whether the memory allocated is over this meter's limit.
+        """
+        return self.limit is not None and self.current() > self.limit
+
+    def close(self) -> None:
+        """
+        Stop tracemalloc if this meter started it.
+        """
+        if self._started:
+            tracemalloc.stop()
+
+
+class TranspositionTable:
+    """
+    A cache of the scores of searched positions that keeps the capacity
+    most recently used ones.
+
+    capacity - the most positions kept
+    """
+    capacity: int
+
+    def __init__(self, capacity: int) -> None:
+        """
+        Create a new, empty TranspositionTable.
+        """
+        self.capacity = capacity
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        """
+        Return the number of positions kept.
+        """
+        return len(self._entries)
+
+    def get(self, key: Any, stats: SearchStats = None) -> Optional[float]:
+        """
+        Return the score kept for key, or None, recording the lookup in
+        stats if given.
+
+        >>> table = TranspositionTable(1)
+        >>> table.put('a', 1)
+        >>> table.put('b', -1)
+        >>> table.get('a') is None, table.get('b')
+        (True, -1)
+        """
+        score = self._entries.get(key)
+        if score is None:
+            if stats is not None:
+                stats.cache_misses += 1
+            return None
+        self._entries.move_to_end(key)
+        if stats is not None:
+            stats.cache_hits += 1
+        return score
+
+    def put(self, key: Any, score: float) -> None:
+        """
+        Keep score for key, dropping the least recently used position if
+        this table is full.
+        """
+        self._entries[key] = score
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+
+def score_children(game: Any, states: List[GameState], search: Callable,
+                   options: Dict[str, Any], stats: SearchStats = None,
+                   workers: int = None, cache_size: int = None,
+                   deadline: Deadline = None) -> List[float]:
+    """
+    Return the scores search(game, state, **options) gives every state of
+    states, one move ahead of the current state of game.
+
+    If workers is more than 1, the states are searched in that many
+    processes at once. If cache_size is given, every process keeps the
+    scores of up to cache_size positions in a TranspositionTable. If
+    deadline expires, only the scores of the states searched before it
+    did are returned. Worker processes get the time left on deadline, but
+    do not see it cancelled.
+    """
+    scores = []
+    if not workers or workers <= 1:
+        table = TranspositionTable(cache_size) if cache_size else None
+        try:
+            for state in states:
+                scores.append(search(game, state, stats=stats, table=table,
+                                     deadline=deadline, **options))
+        except SearchCancelled:
+            pass
+        return scores
+    seconds = None if deadline is None else deadline.remaining()
+    jobs = [(search, game, state, options, stats is not None, cache_size,
+             seconds) for state in states]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        try:
+            for score, child_stats in pool.map(help_score_child, jobs):
+                scores.append(score)
+                if stats is not None:
+                    stats.merge(child_stats)
+        except SearchCancelled:
+            if deadline is not None:
+                deadline.reached = True
+            pool.shutdown(wait=False, cancel_futures=True)
+    return scores
+
+
+def help_score_child(job: Tuple[Callable, Any, GameState, Dict[str, Any],
+                                bool, Optional[int], Optional[float]]) \
+        -> Tuple[float, Optional[SearchStats]]:
+    """
+    Return the score and the SearchStats (if collected) of one search of
+    score_children, in a worker process.
+    """
+    search, game, state, options, collect, cache_size, seconds = job
+    stats = SearchStats() if collect else None
+    table = TranspositionTable(cache_size) if cache_size else None
+    deadline = None if seconds is None else Deadline(seconds)
+    return search(game, state, stats=stats, table=table, deadline=deadline,
+                  **options), stats
+
+
+def position_key(state: GameState) -> Any:
+    """
+    Return the key of state in a TranspositionTable: state itself if it is
+    interned, so that equal states are found by identity, and its repr
+    otherwise.
+    """
+    if getattr(state, 'interned', False):
+        return state
+    return repr(state)
+
+
+def check_deadline(deadline: Optional[Deadline]) -> None:
+    """
+    Raise SearchCancelled if deadline is given and has expired.
+    """
+    if deadline is not None and deadline.expired():
+        raise SearchCancelled()
+
+
+def accepts_option(strategy: Callable, name: str) -> bool:
+    """
+    Return whether strategy can be called with the keyword argument name.
+
+    >>> accepts_option(recursive_minimax_strategy, 'stats')
+    True
+    >>> accepts_option(interactive_strategy, 'stats')
+    False
+    """
+    try:
+        parameters = inspect.signature(strategy).parameters
+    except (TypeError, ValueError):
+        return False
+    return name in parameters or any(
+        p.kind == inspect.Parameter.VAR_KEYWORD for p in parameters.values())
+
+
+def search_with_stats(strategy: Callable, game: Any) -> Any:
+    """
+    Return the move strategy picks for game, and the SearchStats of the
+    search (None if strategy does not collect statistics).
+    """
+    if not accepts_option(strategy, 'stats'):
+        return strategy(game), None
+    stats = SearchStats()
+    return strategy(game, stats=stats), stats
+
 
 def interactive_strategy(game: Any) -> Any:
     """
@@ -19,11 +494,13 @@ def interactive_strategy(game: Any) -> Any:
     return game.str_to_move(move)
 
 
-def rough_outcome_strategy(game: Any) -> Any:
+def rough_outcome_strategy(game: Any, stats: SearchStats = None) -> Any:
     """
     Return a move for game by picking a move which results in a state with
     the lowest rough_outcome() for the opponent.
 
+    If stats is given, the search is recorded in it.
+
     NOTE: game.rough_outcome() should do the following:
         - For a state that's over, it returns the score for the current
           player of that state.
@@ -39,12 +516,16 @@ def rough_outcome_strategy(game: Any) -> Any:
         'guess' the outcome of the game, but no further. It's better than
         random, but worse than minimax.
     """
+    start = time.perf_counter()
     current_state = game.current_state
     best_move = None
     best_outcome = -2  # Temporarily -- just so we can replace this easily later
 
     # Get the move that results in the lowest rough_outcome for the opponent
-    for move in current_state.get_possible_moves():
+    moves = current_state.get_possible_moves()
+    if stats is not None:
+        stats.visit(0, len(moves))
+    for move in moves:
         new_state = current_state.make_move(move)
 
         # We multiply the below by -1 since a state that's bad for the opponent
@@ -55,71 +536,148 @@ def rough_outcome_strategy(game: Any) -> Any:
             best_move = move
 
     # Return the move that resulted in the best rough_outcome
+    if stats is not None:
+        stats.max_depth = max(stats.max_depth, 1)
+        stats.value = best_outcome
+        stats.elapsed = time.perf_counter() - start
     return best_move
 
 
-def recursive_minimax_strategy(game: Any) -> Any:
+def recursive_minimax_strategy(game: Any, stats: SearchStats = None,
+                               workers: int = None, cache_size: int = None,
+                               deadline: Deadline = None) -> Any:
     """
     Return a move that minimizes the possible loss for a player recursively.
+
+    If stats is given, the search is recorded in it. If workers is more than
+    1, the moves are searched in that many processes at once. If cache_size
+    is given, the scores of up to cache_size positions are cached. If
+    deadline expires, the best of the moves searched so far is returned.
     """
+    start = time.perf_counter()
     state = game.current_state
-    list_score = [help_recu_min(game, state.make_move(c)) * -1
-                  for c in state.get_possible_moves()]
+    moves = state.get_possible_moves()
+    if stats is not None:
+        stats.visit(0, len(moves))
+    list_score = [score * -1 for score in score_children(
+        game, [state.make_move(c) for c in moves], help_recu_min, {}, stats,
+        workers, cache_size, deadline)]
+    if len(list_score) < len(moves):
+        return help_cancelled(game, moves, list_score, stats, start)
     highest_score = max(list_score)
     move = list_score.index(highest_score)
+    if stats is not None:
+        stats.value = highest_score
+        stats.exact = True
+        stats.elapsed = time.perf_counter() - start
     return game.current_state.get_possible_moves()[move]
 
 
-def help_recu_min(game: Any, state: GameState)-> int:
+def help_cancelled(game: Any, moves: list, scores: List[float],
+                   stats: SearchStats, start: float) -> Any:
     """
-    Return the highest guaranteed score for the state.
+    Return the best move of a search of game that was cancelled after
+    scoring the first of moves with scores, or the first legal move if none
+    was scored, as there is no time left to estimate the others.
     """
-    old_state = game.current_state
+    if scores:
+        value = max(scores)
+        move = moves[scores.index(value)]
+    else:
+        value = None
+        move = game.current_state.get_possible_moves()[0]
+    if stats is not None:
+        stats.value = value
+        stats.cancelled = True
+        stats.elapsed = time.perf_counter() - start
+    return move
+
+
+def help_recu_min(game: Any, state: GameState, stats: SearchStats = None,
+                  depth: int = 1, table: TranspositionTable = None,
+                  deadline: Deadline = None) -> int:
+    """
+    Return the highest guaranteed score for the state, which is depth moves
+    ahead of the current state of game.
+
+    If stats is given, every state visited is recorded in it. If table is
+    given, scores are looked up in and kept in it. Raise SearchCancelled if
+    deadline expires.
+    """
+    check_deadline(deadline)
+    if table is not None:
+        key = position_key(state)
+        score = table.get(key, stats)
+        if score is not None:
+            return score
     if game.is_over(state):
-        game.current_state = state
-        if game.is_winner(state.get_current_player_name()):
-            game.current_state = old_state
-            return state.WIN
-        elif game.is_winner('p1') or game.is_winner('p2'):
-            game.current_state = old_state
-            return state.LOSE
-        game.current_state = old_state
-        return state.DRAW
+        if stats is not None:
+            stats.visit(depth)
+        score = help_score_over(game, state)
     else:
         new_state = [state.make_move(c) for c in state.get_possible_moves()]
-        return max([help_recu_min(game, s) * -1 for s in new_state])
+        if stats is not None:
+            stats.visit(depth, len(new_state))
+        score = max([help_recu_min(game, s, stats, depth + 1, table,
+                                   deadline) * -1 for s in new_state])
+    if table is not None:
+        table.put(key, score)
+    return score
 
 
 class Equip:
     """
-    A Equip that containers information like state, score and children.
+    A Equip that containers information like state, score and children,
+    depth moves ahead of the state the search started from.
     """
     state: GameState
     score: int
     children: list
+    depth: int
 
     def __init__(self, state: GameState, score: int = None,
-                 children: list = None):
+                 children: list = None, depth: int = 0):
         """
-        Create a new Equip self which has state, score and children.
+        Create a new Equip self which has state, score, children and depth.
         """
         self.state = state
         self.score = score
         self.children = children.copy() if children else []
+        self.depth = depth
 
 
-def iterative_minimax_strategy(game: Any) -> Any:
+def iterative_minimax_strategy(game: Any, stats: SearchStats = None,
+                               memory_limit: int = None,
+                               fallback_depth: int = 3,
+                               deadline: Deadline = None) -> Any:
     """
     Return a move that minimizes the possible loss for a player iteratively.
+
+    If stats is given, the search is recorded in it. If memory_limit is
+    given and the search tree grows past memory_limit bytes, the tree is
+    dropped and the move of depth_limited_minimax_strategy with
+    fallback_depth is returned instead. If deadline expires, the best of
+    the moves searched so far is returned.
     """
+    begin = time.perf_counter()
+    meter = None
+    if memory_limit is not None or (stats is not None and stats.track_memory):
+        meter = MemoryMeter(memory_limit)
+    live = 1
+    check_at = MEMORY_CHECK_NODES
+    limited = False
     old_state = game.current_state
     start = Equip(game.current_state)
     process = [start]
     while process:
+        if deadline is not None and deadline.expired():
+            break
         deal = process.pop()
         if deal.children:
             deal.score = max([s.score * -1 for s in deal.children])
         elif game.is_over(deal.state):
+            if stats is not None:
+                stats.visit(deal.depth)
             game.current_state = deal.state
             if game.is_winner(deal.state.get_current_player_name()):
                 game.current_state = old_state
@@ -131,17 +689,182 @@ def iterative_minimax_strategy(game: Any) -> Any:
                 game.current_state = old_state
                 deal.score = deal.state.LOSE
         else:
-            new_state = [Equip(deal.state.make_move(c))
+            new_state = [Equip(deal.state.make_move(c), depth=deal.depth + 1)
                          for c in deal.state.get_possible_moves()]
+            if stats is not None:
+                stats.visit(deal.depth, len(new_state))
             process.append(deal)
             for a in new_state:
                 deal.children.append(a)
                 process.append(a)
+            live += len(new_state)
+            if meter is not None and live >= check_at:
+                check_at = live + MEMORY_CHECK_NODES
+                if meter.exceeded():
+                    limited = True
+                    break
+    if meter is not None:
+        if stats is not None:
+            stats.peak_bytes = max(stats.peak_bytes, meter.peak())
+            stats.live_nodes = max(stats.live_nodes, live)
+        if limited:
+            # Drop the whole tree before searching again.
+            start = process = deal = new_state = None
+            meter.close()
+            move = depth_limited_minimax_strategy(game, fallback_depth, stats,
+                                                  deadline=deadline)
+            if stats is not None:
+                stats.memory_limited = True
+                stats.elapsed = time.perf_counter() - begin
+            return move
+        meter.close()
+    if process:
+        # The deadline expired; children with a score are fully searched.
+        moves = game.current_state.get_possible_moves()
+        scored = [i for i, c in enumerate(start.children)
+                  if c.score is not None]
+        return help_cancelled(game, [moves[i] for i in scored],
+                              [start.children[i].score * -1 for i in scored],
+                              stats, begin)
     choies = [c.score * -1 for c in start.children]
     move = choies.index(max(choies))
+    if stats is not None:
+        stats.value = max(choies)
+        stats.exact = True
+        stats.elapsed = time.perf_counter() - begin
     return game.current_state.get_possible_moves()[move]
 
 
+def depth_limited_minimax_strategy(game: Any, depth: int = None,
+                                   stats: SearchStats = None,
+                                   time_limit: float = None,
+                                   workers: int = None,
+                                   cache_size: int = None,
+                                   deadline: Deadline = None) -> Any:
+    """
+    Return a move that minimizes the possible loss for a player, looking at
+    most depth (by default DEFAULT_DEPTH) moves ahead and estimating deeper
+    states with rough_outcome.
+
+    If time_limit or deadline is given, searches 1, 2, ... moves ahead are
+    made until one reaches depth (if given) or sees the end of every line,
+    or until time_limit seconds pass or deadline expires, and the move of
+    the last finished search is returned. If stats is given, the search is
+    recorded in it. workers and cache_size are as for
+    recursive_minimax_strategy.
+    """
+    begin = time.perf_counter()
+    if time_limit is not None:
+        deadline = Deadline(time_limit, deadline)
+    if deadline is None:
+        # A search that never reaches depth has estimated nothing.
+        search = SearchStats()
+        move, value, _ = help_depth_root(game, depth or DEFAULT_DEPTH, search,
+                                         workers, cache_size)
+        exact = search.max_depth < (depth or DEFAULT_DEPTH)
+        if stats is not None:
+            stats.merge(search)
+    else:
+        best = None
+        iteration = 1
+        while True:
+            search = SearchStats()
+            move, value, finished = help_depth_root(
+                game, iteration, search, workers, cache_size, deadline)
+            if stats is not None:
+                stats.merge(search)
+            if finished or (best is None and move is not None):
+                best = move, value
+                exact = finished and search.max_depth < iteration
+            if not finished or search.max_depth < iteration or \
+                    iteration == depth:
+                break
+            iteration += 1
+        if best is None:
+            return help_cancelled(game, [], [], stats, begin)
+        move, value = best
+        if stats is not None:
+            stats.cancelled = not finished
+    if stats is not None:
+        stats.value = value
+        stats.exact = exact
+        stats.elapsed = time.perf_counter() - begin
+    return move
+
+
+def help_depth_root(game: Any, depth: int, stats: SearchStats = None,
+                    workers: int = None, cache_size: int = None,
+                    deadline: Deadline = None) -> Tuple[Any, float, bool]:
+    """
+    Return the best move for the current state of game, looking at most
+    depth moves ahead, its score, and whether every move was searched before
+    deadline expired. The move and score are None if none was.
+    """
+    state = game.current_state
+    moves = state.get_possible_moves()
+    if stats is not None:
+        stats.visit(0, len(moves))
+    list_score = [score * -1 for score in score_children(
+        game, [state.make_move(c) for c in moves], help_depth_min,
+        {'depth': depth - 1}, stats, workers, cache_size, deadline)]
+    if not list_score:
+        return None, None, False
+    best = max(list_score)
+    return (moves[list_score.index(best)], best,
+            len(list_score) == len(moves))
+
+
+def help_depth_min(game: Any, state: GameState, depth: int,
+                   stats: SearchStats = None, ply: int = 1,
+                   table: TranspositionTable = None,
+                   deadline: Deadline = None) -> float:
+    """
+    Return the highest guaranteed score for the state, which is ply moves
+    ahead of the current state of game, searching depth more moves ahead.
+    If table is given, scores are looked up in and kept in it. Raise
+    SearchCancelled if deadline expires.
+    """
+    check_deadline(deadline)
+    if table is not None:
+        key = (position_key(state), depth)
+        score = table.get(key, stats)
+        if score is not None:
+            return score
+    if game.is_over(state):
+        if stats is not None:
+            stats.visit(ply)
+        score = help_score_over(game, state)
+    elif depth <= 0:
+        if stats is not None:
+            stats.visit(ply)
+        score = state.rough_outcome()
+    else:
+        new_state = [state.make_move(c) for c in state.get_possible_moves()]
+        if stats is not None:
+            stats.visit(ply, len(new_state))
+        score = max([help_depth_min(game, s, depth - 1, stats, ply + 1, table,
+                                    deadline) * -1 for s in new_state])
+    if table is not None:
+        table.put(key, score)
+    return score
+
+
+def help_score_over(game: Any, state: GameState) -> int:
+    """
+    Return the score of the player to move in state, where game is over.
+    """
+    old_state = game.current_state
+    game.current_state = state
+    try:
+        if game.is_winner(state.get_current_player_name()):
+            return state.WIN
+        elif game.is_winner('p1') or game.is_winner('p2'):
+            return state.LOSE
+        return state.DRAW
+    finally:
+        game.current_state = old_state
+
+
 # TODO: Implement a recursive version of the minimax strategy.
 
 # TODO: Implement an iterative version of the minimax strategy.
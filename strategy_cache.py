@@ -0,0 +1,303 @@
+"""
+A shared cache of the moves strategies pick.
+
+Moves are kept by canonical position, strategy and strategy options. The
+canonical position of a state is its codec encoding with the players'
+colours swapped if needed, so that it is always Player 1's turn: both
+players reach the same positions, and the strategies pick the same move
+for either colour. Entries expire after a time to live and the least
+recently used are dropped once the cache is full. Concurrent requests for
+the same key share a single computation.
+"""
+import asyncio
+import copy
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+from codec import encode_state
+from strategy import Deadline, SearchCancelled
+from stonehenge import StonehengeState
+from subtract_square_state import SubtractSquareState
+
+
+def canonical_position(state: Any) -> bytes:
+    """
+    Return the encoding of state as seen by the player to move, as if they
+    were Player 1.
+
+    >>> a = StonehengeState(True, 1).make_move('A')
+    >>> b = StonehengeState(False, 1).make_move('A')
+    >>> canonical_position(a) == canonical_position(b)
+    True
+    >>> canonical_position(SubtractSquareState(False, 18)).hex()
+    '25'
+    """
+    if isinstance(state, SubtractSquareState):
+        # Subtract Square is the same game for both players.
+        state = copy.copy(state)
+        state.p1_turn = True
+        return encode_state(state)
+    data = encode_state(state)
+    if isinstance(state, StonehengeState) and not state.p1_turn:
+        # Swap the 2-bit codes of Player 1 (01) and Player 2 (10).
+        data = bytes([data[0] | 8]) + bytes(
+            (byte & 0x55) << 1 | (byte >> 1) & 0x55 for byte in data[1:])
+    return data
+
+
+class StrategyCache:
+    """
+    A thread-safe LRU cache of strategy moves whose entries expire.
+
+    capacity - the most moves kept
+    ttl - the seconds a move is kept for, or None to keep it until evicted
+    hits - the number of lookups answered from the cache
+    misses - the number of lookups that had to compute a move
+    coalesced - the number of lookups that waited on a computation another
+                lookup had already started
+    evictions - the number of moves dropped because the cache was full
+    expirations - the number of moves dropped because they were too old
+    """
+    capacity: int
+    ttl: Optional[float]
+    hits: int
+    misses: int
+    coalesced: int
+    evictions: int
+    expirations: int
+
+    def __init__(self, capacity: int = 100000, ttl: float = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        Create a new, empty StrategyCache timed by clock.
+        """
+        self.capacity = capacity
+        self.ttl = ttl
+        self.hits = self.misses = self.coalesced = 0
+        self.evictions = self.expirations = 0
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """
+        Return the number of moves kept.
+        """
+        return len(self._entries)
+
+    @staticmethod
+    def key(state: Any, strategy: str, options: Dict[str, Any] = None) \
+            -> Tuple[bytes, str, Tuple]:
+        """
+        Return the key of the move strategy picks with options in state.
+        """
+        return (canonical_position(state), strategy,
+                tuple(sorted((options or {}).items())))
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        Return the fraction of lookups answered without a new computation.
+
+        >>> cache = StrategyCache()
+        >>> cache.hits, cache.coalesced, cache.misses = 2, 1, 1
+        >>> cache.hit_rate
+        0.75
+        """
+        lookups = self.hits + self.coalesced + self.misses
+        return (self.hits + self.coalesced) / lookups if lookups else 0.0
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Return the counters of this cache as a dictionary.
+        """
+        return {'size': len(self), 'capacity': self.capacity,
+                'hits': self.hits, 'misses': self.misses,
+                'coalesced': self.coalesced, 'evictions': self.evictions,
+                'expirations': self.expirations, 'hit_rate': self.hit_rate}
+
+    def _lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        Return (True, move) if a move that has not expired is kept for key,
+        and (False, None) otherwise. The lock must be held.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        move, stored = entry
+        if self.ttl is not None and self._clock() - stored > self.ttl:
+            del self._entries[key]
+            self.expirations += 1
+            return False, None
+        self._entries.move_to_end(key)
+        return True, move
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Return the move kept for key, or default, without counting the
+        lookup.
+        """
+        with self._lock:
+            found, move = self._lookup(key)
+        return move if found else default
+
+    def put(self, key: Hashable, move: Any) -> None:
+        """
+        Keep move for key, evicting the least recently used move if this
+        cache is full.
+
+        >>> cache = StrategyCache(capacity=1)
+        >>> cache.put('a', 1)
+        >>> cache.put('b', 4)
+        >>> cache.get('a'), cache.get('b'), cache.evictions
+        (None, 4, 1)
+        """
+        with self._lock:
+            self._store(key, move)
+
+    def _store(self, key: Hashable, move: Any) -> None:
+        """
+        Keep move for key. The lock must be held.
+        """
+        self._entries[key] = (move, self._clock())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _begin(self, key: Hashable) -> Tuple[Future, bool]:
+        """
+        Return a future of the move for key and whether the caller must
+        compute it.
+        """
+        with self._lock:
+            found, move = self._lookup(key)
+            if found:
+                self.hits += 1
+                future = Future()
+                future.set_result(move)
+                return future, False
+            if key in self._pending:
+                self.coalesced += 1
+                return self._pending[key], False
+            self.misses += 1
+            future = Future()
+            self._pending[key] = future
+            return future, True
+
+    def _finish(self, key: Hashable, future: Future, move: Any = None,
+                error: BaseException = None) -> None:
+        """
+        Complete the computation of the move for key, keeping it unless it
+        failed.
+        """
+        with self._lock:
+            del self._pending[key]
+            if error is None:
+                self._store(key, move)
+        if error is None:
+            future.set_result(move)
+        else:
+            future.set_exception(error)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any],
+                       timeout: float = None) -> Any:
+        """
+        Return the move kept for key, calling compute() to find it if it is
+        not kept. Callers in other threads asking for the same key meanwhile
+        wait for this computation instead of starting their own, for at
+        most timeout seconds (then TimeoutError is raised) if given.
+
+        >>> cache = StrategyCache()
+        >>> cache.get_or_compute('a', lambda: 9), cache.get_or_compute(
+        ...     'a', lambda: 16)
+        (9, 9)
+        """
+        future, owner = self._begin(key)
+        if not owner:
+            return future.result(timeout)
+        try:
+            move = compute()
+        except BaseException as error:
+            self._finish(key, future, error=error)
+            raise
+        self._finish(key, future, move)
+        return move
+
+    async def get_or_compute_async(
+            self, key: Hashable, compute: Callable[[], Awaitable]) -> Any:
+        """
+        Return the move kept for key, awaiting compute() to find it if it is
+        not kept. Tasks asking for the same key meanwhile await this
+        computation instead of starting their own.
+        """
+        future, owner = self._begin(key)
+        if not owner:
+            return await asyncio.wrap_future(future)
+        try:
+            move = await compute()
+        except BaseException as error:
+            self._finish(key, future, error=error)
+            raise
+        self._finish(key, future, move)
+        return move
+
+
+def cached_strategy(strategy: Callable, name: str,
+                    cache: StrategyCache) -> Callable:
+    """
+    Return strategy with its moves kept in cache under name, which should
+    be the strategy's key in usable_strategies. A stats argument is passed
+    on, but only computed moves record their search in it.
+
+    A deadline argument is passed on too. Moves of searches it cut short
+    are used but not kept, and waiting for another caller's computation of
+    the same move stops at the deadline.
+    """
+    @wraps(strategy)
+    def cached(game: Any, stats: Any = None, deadline: Deadline = None,
+               **options: Any) -> Any:
+        """
+        Return the move of strategy for game, from cache if it is kept.
+        """
+        key = cache.key(game.current_state, name, options)
+        computed = []
+        if stats is not None:
+            options['stats'] = stats
+        if deadline is not None:
+            options['deadline'] = deadline
+
+        def compute() -> Any:
+            """
+            Return the move strategy picks.
+            """
+            computed.append(True)
+            move = strategy(game, **options)
+            if deadline is not None and deadline.reached:
+                raise SearchCancelled(move)
+            return move
+        try:
+            move = cache.get_or_compute(
+                key, compute, None if deadline is None else
+                deadline.remaining())
+        except SearchCancelled as cut:
+            move = cut.move
+        except TimeoutError:
+            computed.append(True)
+            move = strategy(game, **options)
+        if stats is not None:
+            if computed:
+                stats.cache_misses += 1
+            else:
+                stats.cache_hits += 1
+        return move
+    return cached
+
+
+if __name__ == "__main__":
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
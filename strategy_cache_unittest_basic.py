@@ -0,0 +1,119 @@
+"""
+Unittests for the shared strategy move cache.
+"""
+import asyncio
+import threading
+import time
+import unittest
+
+from game_interface import playable_games, usable_strategies
+from strategy import SearchStats, search_with_stats
+from strategy_cache import StrategyCache, cached_strategy, canonical_position
+from stonehenge import StonehengeState
+from stonehenge_batch_unittest_basic import random_positions
+
+
+class StrategyCacheUnitTests(unittest.TestCase):
+    def test_ttl_and_lru(self):
+        """
+        Test that moves expire after their time to live and that the least
+        recently used move is evicted first.
+        """
+        now = [0.0]
+        cache = StrategyCache(capacity=2, ttl=10, clock=lambda: now[0])
+        cache.put('a', 1)
+        cache.put('b', 4)
+        self.assertEqual(cache.get('a'), 1)
+        cache.put('c', 9)
+        self.assertIsNone(cache.get('b'))
+        now[0] = 11
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.metrics()['evictions'], 1)
+        self.assertEqual(cache.metrics()['expirations'], 1)
+
+    def test_threads_coalesce(self):
+        """
+        Test that threads asking for the same key while it is computed share
+        one computation.
+        """
+        cache = StrategyCache()
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            release.wait(10)
+            return 'A'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            cache.get_or_compute('k', compute))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        while cache.misses + cache.coalesced < 4:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['A'] * 4)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.coalesced, 3)
+
+    def test_tasks_coalesce_and_errors_are_not_kept(self):
+        """
+        Test that tasks share one computation, and that a failed computation
+        is reported to every waiter without being kept.
+        """
+        async def run():
+            cache = StrategyCache()
+            calls = []
+
+            async def compute():
+                calls.append(1)
+                await asyncio.sleep(0.01)
+                return 16
+
+            moves = await asyncio.gather(*[cache.get_or_compute_async(
+                'k', compute) for _ in range(5)])
+            self.assertEqual(moves, [16] * 5)
+            self.assertEqual(len(calls), 1)
+
+            async def fail():
+                await asyncio.sleep(0.01)
+                raise ValueError('no move')
+
+            results = await asyncio.gather(*[cache.get_or_compute_async(
+                'f', fail) for _ in range(2)], return_exceptions=True)
+            self.assertTrue(all(isinstance(r, ValueError) for r in results))
+            self.assertEqual(await cache.get_or_compute_async('f', compute),
+                             16)
+        asyncio.run(run())
+
+    def test_canonical_positions_share_moves(self):
+        """
+        Test that a cached strategy answers the colour-swapped position of
+        a position it searched from the cache with the same move.
+        """
+        cache = StrategyCache()
+        strategy = cached_strategy(usable_strategies['md'], 'md', cache)
+        game = playable_games['h'](True, side_length=2)
+        for state in random_positions(2, 10, 3):
+            game.current_state = state
+            if game.is_over(state):
+                continue
+            move, stats = search_with_stats(strategy, game)
+            self.assertEqual(move, usable_strategies['md'](game))
+            self.assertEqual(stats.cache_misses + stats.cache_hits, 1)
+        swapped = playable_games['h'](False, side_length=2)
+        swapped.current_state = StonehengeState(False, 2).make_move('A')
+        game.current_state = StonehengeState(True, 2).make_move('A')
+        self.assertEqual(canonical_position(game.current_state),
+                         canonical_position(swapped.current_state))
+        move = strategy(game)
+        hits = cache.hits
+        self.assertEqual(strategy(swapped), move)
+        self.assertEqual(cache.hits, hits + 1)
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
@@ -12,16 +12,23 @@ class SubtractSquareGame(Game):
     Abstract class for a game to be played with two players.
     """
 
-    def __init__(self, p1_starts):
+    def __init__(self, p1_starts, current_total=None):
         """
         Initialize this Game, using p1_starts to find who the first player is.
 
         :param p1_starts: A boolean representing whether Player 1 is the first
                           to make a move.
         :type p1_starts: bool
+        :param current_total: The number to subtract from. It is asked for
+                              interactively when not given.
+        :type current_total: int
         """
-        count = int(input("Enter the number to subtract from: "))
-        self.current_state = SubtractSquareState(p1_starts, count)
+        if current_total is None:
+            current_total = int(input("Enter the number to subtract from: "))
+        elif current_total < 0:
+            raise ValueError("The number to subtract from must not be "
+                             "negative, not {}".format(current_total))
+        self.current_state = SubtractSquareState(p1_starts, current_total)
 
     def get_instructions(self):
         """
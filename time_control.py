@@ -0,0 +1,147 @@
+"""
+Chess-clock time control for GameInterface.
+
+A TimeControl gives each move a budget: a fixed time per move, a share of
+a total time per player that grows by an increment after every move, or
+the smaller of both. A Clock tracks one player's time under a TimeControl
+and hands out a Deadline for each move, which strategies that take a
+deadline stop searching at.
+"""
+import time
+from typing import Any, Dict, Optional
+from strategy import Deadline
+
+
+class TimeControl:
+    """
+    The time each player has for their moves.
+
+    per_move - the most seconds one move may take, or None
+    total - the seconds each player has for the whole game, or None
+    increment - the seconds added to a player's total after each move
+    moves_to_go - how many more moves a total is spread over
+    reserve - the seconds of each budget kept back for a strategy to stop
+              searching and return its move
+    """
+    per_move: Optional[float]
+    total: Optional[float]
+    increment: float
+    moves_to_go: int
+    reserve: float
+
+    def __init__(self, per_move: float = None, total: float = None,
+                 increment: float = 0.0, moves_to_go: int = 20,
+                 reserve: float = 0.05) -> None:
+        """
+        Create a new TimeControl.
+        """
+        self.per_move = per_move
+        self.total = total
+        self.increment = increment
+        self.moves_to_go = moves_to_go
+        self.reserve = reserve
+
+    @classmethod
+    def parse(cls, text: str, per_move: float = None) -> 'TimeControl':
+        """
+        Return the TimeControl written as 'TOTAL' or 'TOTAL+INCREMENT' in
+        seconds, with per_move.
+
+        >>> control = TimeControl.parse('60+0.5')
+        >>> control.total, control.increment
+        (60.0, 0.5)
+        """
+        total, _, increment = text.partition('+')
+        return cls(per_move, float(total), float(increment or 0))
+
+    def budget(self, remaining: Optional[float]) -> Optional[float]:
+        """
+        Return the seconds the next move may take with remaining seconds
+        left on the player's clock, or None if it has no limit.
+
+        >>> TimeControl(per_move=2, total=60, increment=1).budget(20)
+        2
+        >>> TimeControl(total=60, increment=1).budget(20)
+        2.0
+        """
+        limits = []
+        if self.per_move is not None:
+            limits.append(self.per_move)
+        if remaining is not None:
+            limits.append(min(remaining, remaining / self.moves_to_go +
+                              self.increment))
+        return min(limits) if limits else None
+
+
+class Clock:
+    """
+    One player's clock.
+
+    control - the TimeControl of the game, or None to only track time
+    remaining - the seconds left of the player's total, or None
+    used - the seconds the player has spent on their moves
+    moves - the number of moves the player has made
+    overruns - the number of moves that took longer than their budget
+    flagged - whether the player ever ran out of their total time
+    """
+    control: Optional[TimeControl]
+    remaining: Optional[float]
+    used: float
+    moves: int
+    overruns: int
+    flagged: bool
+
+    def __init__(self, control: TimeControl = None) -> None:
+        """
+        Create a new Clock with the full time of control.
+        """
+        self.control = control
+        self.remaining = None if control is None else control.total
+        self.used = 0.0
+        self.moves = 0
+        self.overruns = 0
+        self.flagged = False
+        self._started = None
+        self._budget = None
+
+    def start(self) -> Deadline:
+        """
+        Start timing a move and return its Deadline, which leaves the
+        reserve of the time control before the end of the move's budget.
+        """
+        self._budget = None if self.control is None else \
+            self.control.budget(self.remaining)
+        self._started = time.perf_counter()
+        if self._budget is None:
+            return Deadline()
+        return Deadline(max(0.0, self._budget - self.control.reserve))
+
+    def stop(self) -> float:
+        """
+        Stop timing a move, charge it to this clock and return the seconds
+        it took.
+        """
+        elapsed = time.perf_counter() - self._started
+        self.used += elapsed
+        self.moves += 1
+        if self._budget is not None and elapsed > self._budget:
+            self.overruns += 1
+        if self.remaining is not None:
+            self.remaining -= elapsed
+            if self.remaining < 0:
+                self.flagged = True
+            self.remaining += self.control.increment
+        return elapsed
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        Return this clock as a dictionary.
+        """
+        return {'used': self.used, 'remaining': self.remaining,
+                'moves': self.moves, 'overruns': self.overruns,
+                'flagged': self.flagged}
+
+
+if __name__ == "__main__":
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
@@ -0,0 +1,277 @@
+"""
+A round-robin self-play tournament between the strategies in
+usable_strategies.
+
+Games are spread across a process pool, every finished game is streamed to
+a JSON-lines file, and the results are summarized as pairwise win rates and
+Elo ratings with confidence intervals.
+
+Example:
+    python tournament.py --strategies ro mi mr --games h:2 s:30 --rounds 20
+"""
+import argparse
+import itertools
+import json
+import math
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+from game_interface import GameInterface, playable_games, usable_strategies, \
+    game_size_options, strategy_games
+
+# Scores for the first named player of a game.
+WIN_SCORE = 1.0
+DRAW_SCORE = 0.5
+LOSE_SCORE = 0.0
+
+
+def make_jobs(strategies: List[str], games: List[Tuple[str, int]],
+              rounds: int, openings: int = 0, seed: int = 0) \
+        -> List[Dict[str, Any]]:
+    """
+    Return the games of a round-robin tournament between strategies.
+
+    Every pair of strategies plays rounds games of every (game, size) in
+    games from each seat, alternating who moves first. Each game starts
+    with openings random moves chosen with its own seed. A strategy listed
+    twice plays once. Raise ValueError if there are fewer than two
+    strategies or a strategy cannot play one of games.
+
+    >>> len(make_jobs(['ro', 'mi', 'mr'], [('s', 10)], 2))
+    12
+    """
+    strategies = list(dict.fromkeys(strategies))
+    if len(strategies) < 2:
+        raise ValueError('A tournament needs at least two strategies')
+    for key in strategies:
+        if key not in usable_strategies or key == 'i':
+            raise ValueError("'{}' is not a usable non-interactive "
+                             "strategy".format(key))
+        for game, _ in games:
+            if game not in strategy_games[key]:
+                raise ValueError("'{}' cannot play '{}'".format(key, game))
+    jobs = []
+    for game, size in games:
+        for first, second in itertools.combinations(strategies, 2):
+            for p1, p2 in [(first, second), (second, first)]:
+                for number in range(rounds):
+                    jobs.append({'game': game, 'size': size, 'p1': p1,
+                                 'p2': p2, 'p1_starts': number % 2 == 0,
+                                 'openings': openings,
+                                 'seed': seed * 1000003 + len(jobs)})
+    return jobs
+
+
+def play_game(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Play the game described by job and return job with its 'opening',
+    'moves', 'winner' and 'seconds' filled in.
+    """
+    options = {game_size_options[job['game']]: job['size']}
+    interface = GameInterface(playable_games[job['game']],
+                              usable_strategies[job['p1']],
+                              usable_strategies[job['p2']],
+                              p1_starts=job['p1_starts'], quiet=True,
+                              **options)
+    rng = random.Random(job['seed'])
+    opening = []
+    game = interface.game
+    while len(opening) < job['openings'] and \
+            not game.is_over(game.current_state):
+        move = rng.choice(game.current_state.get_possible_moves())
+        game.current_state = game.current_state.make_move(move)
+        opening.append(move)
+
+    start = time.perf_counter()
+    winner, moves = interface.play()
+    result = dict(job)
+    result.update({'opening': opening, 'moves': moves, 'winner': winner,
+                   'seconds': time.perf_counter() - start})
+    return result
+
+
+def run_tournament(jobs: List[Dict[str, Any]], workers: int = None,
+                   output: Any = None) -> Iterator[Dict[str, Any]]:
+    """
+    Play jobs across a pool of workers processes, yielding each result as
+    it completes and writing it as a JSON line to output, if given.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(play_game, job) for job in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            if output is not None:
+                output.write(json.dumps(result) + '\n')
+                output.flush()
+            yield result
+
+
+def score_of(result: Dict[str, Any], player: str) -> float:
+    """
+    Return the score player ('p1' or 'p2') got in result.
+    """
+    if result['winner'] is None:
+        return DRAW_SCORE
+    return WIN_SCORE if result['winner'] == player else LOSE_SCORE
+
+
+def pairwise_scores(results: Iterable[Dict[str, Any]]) \
+        -> Dict[Tuple[str, str], List[float]]:
+    """
+    Return the scores each strategy got against each other strategy,
+    keyed by (strategy, opponent).
+    """
+    scores = {}
+    for result in results:
+        scores.setdefault((result['p1'], result['p2']), []).append(
+            score_of(result, 'p1'))
+        scores.setdefault((result['p2'], result['p1']), []).append(
+            score_of(result, 'p2'))
+    return scores
+
+
+def wilson_interval(score: float, games: int, z: float = 1.96) \
+        -> Tuple[float, float]:
+    """
+    Return the Wilson score interval of a win rate of score over games.
+
+    >>> low, high = wilson_interval(5, 10)
+    >>> round(low, 3), round(high, 3)
+    (0.237, 0.763)
+    """
+    if games == 0:
+        return 0.0, 1.0
+    rate = score / games
+    denominator = 1 + z * z / games
+    centre = (rate + z * z / (2 * games)) / denominator
+    spread = z * math.sqrt(rate * (1 - rate) / games
+                           + z * z / (4 * games * games)) / denominator
+    return max(0.0, centre - spread), min(1.0, centre + spread)
+
+
+def elo_ratings(matches: List[Tuple[str, str, float]],
+                iterations: int = 200) -> Dict[str, float]:
+    """
+    Return the maximum-likelihood Elo rating of every strategy in matches,
+    a list of (strategy, opponent, score of strategy), centred on 1500.
+
+    One virtual draw between every pair keeps perfect records finite.
+
+    >>> ratings = elo_ratings([('a', 'b', 1.0)] * 3)
+    >>> round(ratings['a'] - ratings['b'])
+    338
+    >>> elo_ratings([])
+    {}
+    """
+    players = sorted({name for match in matches for name in match[:2]})
+    if not players:
+        return {}
+    wins = {name: 0.0 for name in players}
+    games = {}
+    pairs = {tuple(sorted(match[:2])) for match in matches}
+    for first, second in pairs:
+        wins[first] += DRAW_SCORE
+        wins[second] += DRAW_SCORE
+        games[first, second] = games[second, first] = 1
+    for player, opponent, score in matches:
+        wins[player] += score
+        wins[opponent] += 1 - score
+        games[player, opponent] += 1
+        games[opponent, player] += 1
+
+    strength = {name: 1.0 for name in players}
+    for _ in range(iterations):
+        for name in players:
+            total = sum(count / (strength[name] + strength[other])
+                        for (first, other), count in games.items()
+                        if first == name)
+            strength[name] = wins[name] / total
+    logs = {name: 400 * math.log10(strength[name]) for name in players}
+    mean = sum(logs.values()) / len(logs)
+    return {name: 1500 + logs[name] - mean for name in players}
+
+
+def summarize(results: List[Dict[str, Any]], bootstrap: int = 200,
+              seed: int = 0) -> Dict[str, Any]:
+    """
+    Return the pairwise win rates (with Wilson intervals) and the Elo
+    ratings (with 95% bootstrap intervals) of results.
+    """
+    pairs = {}
+    for (player, opponent), scores in sorted(pairwise_scores(results).items()):
+        low, high = wilson_interval(sum(scores), len(scores))
+        pairs['{} vs {}'.format(player, opponent)] = {
+            'games': len(scores), 'win_rate': sum(scores) / len(scores),
+            'interval': [low, high]}
+
+    matches = [(result['p1'], result['p2'], score_of(result, 'p1'))
+               for result in results]
+    ratings = elo_ratings(matches)
+    rng = random.Random(seed)
+    samples = {name: [] for name in ratings}
+    for _ in range(bootstrap):
+        resampled = elo_ratings([rng.choice(matches) for _ in matches])
+        for name in samples:
+            samples[name].append(resampled.get(name, 1500.0))
+    elo = {}
+    for name, rating in sorted(ratings.items(), key=lambda x: -x[1]):
+        values = sorted(samples[name])
+        interval = [values[int(0.025 * (len(values) - 1))],
+                    values[int(0.975 * (len(values) - 1))]] if values \
+            else [rating, rating]
+        elo[name] = {'rating': rating, 'interval': interval}
+    return {'games': len(results), 'pairs': pairs, 'elo': elo}
+
+
+def parse_game(text: str) -> Tuple[str, int]:
+    """
+    Return the (game, size) that text such as 'h:2' or 's:30' names.
+
+    >>> parse_game('h:2')
+    ('h', 2)
+    """
+    game, _, size = text.partition(':')
+    if game not in playable_games or not size.isdigit():
+        raise argparse.ArgumentTypeError(
+            "'{}' should look like <game>:<size>, with game one of "
+            "{}".format(text, ', '.join(playable_games)))
+    return game, int(size)
+
+
+def main(argv: List[str] = None) -> None:
+    """
+    Run a tournament from the command line and print its summary as JSON.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--strategies', nargs='+', required=True,
+                        choices=[key for key in usable_strategies
+                                 if key != 'i'])
+    parser.add_argument('--games', nargs='+', type=parse_game,
+                        default=[('h', 2)], help='e.g. h:2 s:30')
+    parser.add_argument('--rounds', type=int, default=10,
+                        help='games per pair, seat and board')
+    parser.add_argument('--openings', type=int, default=2,
+                        help='random moves played before the strategies')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='tournament.jsonl',
+                        help='file the per-game results are streamed to')
+    args = parser.parse_args(argv)
+
+    if len(set(args.strategies)) < 2:
+        parser.error('--strategies needs at least two strategies')
+    try:
+        jobs = make_jobs(args.strategies, args.games, args.rounds,
+                         args.openings, args.seed)
+    except ValueError as error:
+        parser.error(str(error))
+    with open(args.output, 'w') as output:
+        results = list(run_tournament(jobs, args.workers, output))
+    json.dump(summarize(results, seed=args.seed), sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Unittests for the round-robin tournament runner.
+"""
+import io
+import json
+import unittest
+
+from tournament import elo_ratings, make_jobs, pairwise_scores, \
+    run_tournament, summarize, wilson_interval
+
+
+def result(p1, p2, winner):
+    """
+    Return a finished game between p1 and p2 that winner won.
+    """
+    return {'p1': p1, 'p2': p2, 'winner': winner}
+
+
+class TournamentUnitTests(unittest.TestCase):
+    def test_pairing_and_colours(self):
+        """
+        Test that every pair of strategies plays every board from both
+        seats, with who moves first alternating, that a strategy listed
+        twice plays once, and that bad line-ups are refused.
+        """
+        jobs = make_jobs(['ro', 'mr', 'md'], [('s', 10), ('h', 1)], 2,
+                         openings=1, seed=5)
+        self.assertEqual(len(jobs), 3 * 2 * 2 * 2)
+        self.assertEqual(len({job['seed'] for job in jobs}), len(jobs))
+        for game in ['s', 'h']:
+            for p1 in ['ro', 'mr', 'md']:
+                for p2 in ['ro', 'mr', 'md']:
+                    seated = [job['p1_starts'] for job in jobs
+                              if (job['game'], job['p1'], job['p2']) ==
+                              (game, p1, p2)]
+                    if p1 == p2:
+                        self.assertEqual(seated, [])
+                    else:
+                        self.assertEqual(seated, [True, False])
+        self.assertEqual(make_jobs(['ro', 'ro', 'mr'], [('s', 10)], 2),
+                         make_jobs(['ro', 'mr'], [('s', 10)], 2))
+        self.assertRaises(ValueError, make_jobs, ['ro'], [('s', 10)], 1)
+        self.assertRaises(ValueError, make_jobs, ['ro', 'ro'], [('s', 10)],
+                          1)
+        self.assertRaises(ValueError, make_jobs, ['ro', 'i'], [('s', 10)],
+                          1)
+        self.assertRaises(ValueError, make_jobs, ['ro', 'g'], [('h', 1)], 1)
+
+    def test_games_are_played_and_streamed(self):
+        """
+        Test that every game is played from its opening and written to the
+        output as a JSON line.
+        """
+        jobs = make_jobs(['ro', 'mr'], [('s', 10)], 2, openings=1)
+        output = io.StringIO()
+        results = list(run_tournament(jobs, workers=2, output=output))
+        self.assertEqual(len(results), len(jobs))
+        lines = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(sorted(line['seed'] for line in lines),
+                         sorted(job['seed'] for job in jobs))
+        for played in results:
+            self.assertEqual(len(played['opening']), 1)
+            self.assertEqual(sum(played['opening'] + played['moves']), 10)
+            self.assertIn(played['winner'], ['p1', 'p2'])
+
+    def test_summary_maths(self):
+        """
+        Test the pairwise scores, win rates, intervals and Elo ratings of a
+        known set of results.
+        """
+        results = [result('a', 'b', 'p1')] * 3 + [result('b', 'a', 'p1')] + \
+            [result('a', 'c', None)] * 2
+        scores = pairwise_scores(results)
+        self.assertEqual(scores['a', 'b'], [1.0, 1.0, 1.0, 0.0])
+        self.assertEqual(scores['b', 'a'], [0.0, 0.0, 0.0, 1.0])
+        self.assertEqual(scores['c', 'a'], [0.5, 0.5])
+
+        summary = summarize(results, bootstrap=50)
+        self.assertEqual(summary['games'], 6)
+        self.assertEqual(summary['pairs']['a vs b']['win_rate'], 0.75)
+        low, high = summary['pairs']['a vs b']['interval']
+        self.assertTrue(0 <= low < 0.75 < high <= 1)
+        elo = summary['elo']
+        self.assertEqual(list(elo), ['a', 'c', 'b'])
+        self.assertAlmostEqual(sum(e['rating'] for e in elo.values()) / 3,
+                               1500)
+        for rating in elo.values():
+            low, high = rating['interval']
+            self.assertLessEqual(low, high)
+
+        even = elo_ratings([('a', 'b', 1.0), ('b', 'a', 1.0)])
+        self.assertAlmostEqual(even['a'], 1500)
+        self.assertAlmostEqual(even['b'], 1500)
+        self.assertEqual(elo_ratings([]), {})
+        self.assertEqual(wilson_interval(0, 0), (0.0, 1.0))
+        self.assertEqual(summarize([])['elo'], {})
+
+
+if __name__ == "__main__":
+    unittest.main()